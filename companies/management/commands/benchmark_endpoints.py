@@ -0,0 +1,121 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from companies.models import Company, Task, TaskVoting
+from users.serializers import UserTokenObtainPairSerializer
+from workers.models import Worker, TaskAppointment, WorkerLogs
+
+ENDPOINTS = {
+    "task-list": "/api/company/task/",
+    "task-recommendation": "/api/company/task-recommendation/",
+    "auto-appointment": "/api/company/auto-appointment/",
+    "worker-report": "/api/company/worker-report/",
+    "worker-report-30d": "/api/company/worker-report/?days=30",
+    "logs": "/api/company/logs/",
+    "voting-results": "/api/company/voting-results/",
+}
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = "Times the key company endpoints through the DRF test client on a dataset made by seed_benchmark " \
+           "and stores the results as JSON, optionally comparing them with an earlier run."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='bench', help="Prefix of the synthetic companies of seed_benchmark.")
+        parser.add_argument('--company', type=int, default=0, help="Index of the company the requests are sent as.")
+        parser.add_argument('--repeat', type=int, default=10, help="Timed requests per endpoint.")
+        parser.add_argument('--warmup', type=int, default=1, help="Untimed requests per endpoint.")
+        parser.add_argument('--endpoint', action='append', choices=list(ENDPOINTS),
+                            help="Endpoint to benchmark, may be repeated, all by default.")
+        parser.add_argument('--output', help="Path of the JSON file the results are written to.")
+        parser.add_argument('--compare', help="Path of a JSON file of an earlier run to compare with.")
+
+    def handle(self, *args, **options):
+        username = f"{options['prefix']}-company-{options['company']}"
+        company = Company.objects.filter(username=username).first()
+        if company is None:
+            raise CommandError(f"Company '{username}' does not exist, create the dataset with seed_benchmark first")
+
+        results = {
+            "metadata": {
+                "timestamp": timezone.now().isoformat(),
+                "database": connection.vendor,
+                "company": username,
+                "repeat": options['repeat'],
+                "dataset": self.dataset(company),
+            },
+            "endpoints": {},
+        }
+        for name in options['endpoint'] or ENDPOINTS:
+            results["endpoints"][name] = self.benchmark(company, ENDPOINTS[name], options['repeat'], options['warmup'])
+
+        previous = {}
+        if options['compare']:
+            with open(options['compare']) as file:
+                previous = json.load(file)["endpoints"]
+        self.report(results["endpoints"], previous)
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(f"Results are written to {options['output']}")
+
+    def dataset(self, company):
+        return {
+            "workers": Worker.objects.filter(employer=company).count(),
+            "tasks": Task.objects.filter(company=company).count(),
+            "appointments": TaskAppointment.objects.filter(task_appointed__company=company).count(),
+            "votings": TaskVoting.objects.filter(company=company).count(),
+            "logs": WorkerLogs.objects.filter(worker__employer=company).count(),
+        }
+
+    def benchmark(self, company, url, repeat, warmup):
+        client = APIClient()
+        timings = []
+        for i in range(warmup + repeat):
+            # A new token per request, so responses cached per Authorization header are not reused
+            token = UserTokenObtainPairSerializer.get_token(company).access_token
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.get(url)
+                elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise CommandError(f"GET {url} failed with {response.status_code}: {response.content[:500]}")
+            if i >= warmup:
+                timings.append(elapsed * 1000)
+
+        return {
+            "url": url,
+            "status": response.status_code,
+            "queries": len(queries),
+            "bytes": len(response.content),
+            "min_ms": min(timings),
+            "p50_ms": statistics.median(timings),
+            "p90_ms": percentile(timings, 0.9),
+            "mean_ms": statistics.mean(timings),
+            "max_ms": max(timings),
+        }
+
+    def report(self, endpoints, previous):
+        self.stdout.write(f"\n{'endpoint':<22}{'queries':>8}{'bytes':>10}{'min ms':>10}{'p50 ms':>10}"
+                          f"{'p90 ms':>10}{'max ms':>10}" + (f"{'p50 before':>12}{'change':>9}" if previous else ""))
+        for name, result in endpoints.items():
+            line = (f"{name:<22}{result['queries']:>8}{result['bytes']:>10}{result['min_ms']:>10.1f}"
+                    f"{result['p50_ms']:>10.1f}{result['p90_ms']:>10.1f}{result['max_ms']:>10.1f}")
+            if name in previous:
+                before = previous[name]['p50_ms']
+                line += f"{before:>12.1f}{(result['p50_ms'] - before) / before:>+9.0%}"
+            self.stdout.write(line)
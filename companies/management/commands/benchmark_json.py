@@ -0,0 +1,69 @@
+import io
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from companies.management.commands.benchmark_endpoints import ENDPOINTS
+from companies.models import Company
+from config.parsers import ORJSONParser
+from config.renderers import ORJSONRenderer, orjson
+from users.serializers import UserTokenObtainPairSerializer
+
+JSON_ENDPOINTS = {
+    **ENDPOINTS,
+    "logs": "/api/company/logs/?page_size=1000",
+}
+
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = "Compares render and parse time of DRF's stdlib JSON renderer and parser with the orjson ones " \
+           "on responses of the key company endpoints, on a dataset made by seed_benchmark."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='bench', help="Prefix of the synthetic companies of seed_benchmark.")
+        parser.add_argument('--company', type=int, default=0, help="Index of the company the requests are sent as.")
+        parser.add_argument('--repeat', type=int, default=20, help="Renders and parses per endpoint.")
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError("orjson is not installed")
+        username = f"{options['prefix']}-company-{options['company']}"
+        company = Company.objects.filter(username=username).first()
+        if company is None:
+            raise CommandError(f"Company '{username}' does not exist, create the dataset with seed_benchmark first")
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {UserTokenObtainPairSerializer.get_token(company).access_token}')
+        repeat = options['repeat']
+
+        self.stdout.write(f"\n{'endpoint':<22}{'bytes':>10}{'render ms':>11}{'orjson ms':>11}{'speedup':>9}"
+                          f"{'parse ms':>10}{'orjson ms':>11}{'speedup':>9}{'same':>6}")
+        for name, url in JSON_ENDPOINTS.items():
+            response = client.get(url)
+            if response.status_code >= 400:
+                raise CommandError(f"GET {url} failed with {response.status_code}")
+            data = response.data
+
+            stdlib, fast = JSONRenderer(), ORJSONRenderer()
+            body = stdlib.render(data)
+            same = fast.render(data) == body
+            render = measure(lambda: stdlib.render(data), repeat)
+            fast_render = measure(lambda: fast.render(data), repeat)
+            parse = measure(lambda: JSONParser().parse(io.BytesIO(body)), repeat)
+            fast_parse = measure(lambda: ORJSONParser().parse(io.BytesIO(body)), repeat)
+
+            self.stdout.write(f"{name:<22}{len(body):>10}{render:>11.2f}{fast_render:>11.2f}{render / fast_render:>8.1f}x"
+                              f"{parse:>10.2f}{fast_parse:>11.2f}{parse / fast_parse:>8.1f}x{'yes' if same else 'no':>6}")
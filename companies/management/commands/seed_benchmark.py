@@ -0,0 +1,227 @@
+import contextlib
+import datetime
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from companies.models import Company, Qualification, Task, TaskVoting, TaskVotingTally
+from workers.models import Worker, WorkerSchedule, TaskAppointment, WorkerTaskComment, WorkerLogs, TaskVote
+
+QUALIFICATIONS = [("Junior", 1), ("Middle", 2), ("Senior", 3), ("Lead", 4)]
+TIMEZONES = ["UTC", "Europe/Kyiv", "Europe/London", "America/New_York", "Asia/Tokyo"]
+LOG_TYPES = ["TA", "TD", "TC", "OC", "SL", "CL"]
+LOG_TYPE_WEIGHTS = [2, 2, 4, 6, 1, 1]
+
+
+@contextlib.contextmanager
+def explicit_timestamps(*fields):
+    """
+    Lets bulk_create store given values of auto_now_add fields, e.g. explicit_timestamps((WorkerLogs, 'datetime')).
+    """
+    model_fields = [model._meta.get_field(name) for model, name in fields]
+    for field in model_fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in model_fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = "Generates a deterministic synthetic dataset for benchmarks: companies with qualifications, workers " \
+           "with schedules, tasks, appointments, comments, votings with votes and worker logs, using bulk inserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--companies', type=int, default=3, help="Number of companies.")
+        parser.add_argument('--workers', type=int, default=100, help="Workers per company.")
+        parser.add_argument('--tasks', type=int, default=1000, help="Tasks per company.")
+        parser.add_argument('--logs', type=int, default=3000, help="Logs per worker.")
+        parser.add_argument('--votings', type=int, default=10, help="Votings per company.")
+        parser.add_argument('--days', type=int, default=90, help="Days of history before the reference date.")
+        parser.add_argument('--date', type=datetime.date.fromisoformat, default=None,
+                            help="Reference date of the history (YYYY-MM-DD), today by default.")
+        parser.add_argument('--seed', type=int, default=42, help="Seed of the random generator.")
+        parser.add_argument('--prefix', default='bench', help="Prefix of usernames of the synthetic companies.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per insert query.")
+        parser.add_argument('--cleanup', action='store_true', help="Delete the synthetic data and exit.")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        companies = Company.objects.filter(username__startswith=f'{prefix}-company-')
+        if options['cleanup']:
+            deleted, _ = companies.delete()
+            self.stdout.write(f"Deleted {deleted} rows")
+            return
+        if companies.exists():
+            raise CommandError(f"Synthetic data with prefix '{prefix}' already exists, delete it with --cleanup first")
+
+        self.batch_size = options['batch_size']
+        reference_date = options['date'] or datetime.date.today()
+        self.now = datetime.datetime.combine(reference_date, datetime.time(12), tzinfo=datetime.timezone.utc)
+        self.days = options['days']
+        self.password = make_password(None)
+
+        started = time.perf_counter()
+        for i in range(options['companies']):
+            # Every company has its own generator, so its data does not depend on the number of companies
+            rng = random.Random(f"{options['seed']}-{i}")
+            with transaction.atomic():
+                counts = self.seed_company(rng, f'{prefix}-company-{i}', options)
+            self.stdout.write(f"{prefix}-company-{i}: " + ", ".join(f"{count} {name}" for name, count in counts.items()))
+        self.stdout.write(f"Done in {time.perf_counter() - started:.1f}s")
+
+    def seed_company(self, rng, username, options):
+        company = Company.objects.create(username=username, email=f'{username}@example.com', password=self.password,
+                                         role='C', name=username, timezone=rng.choice(TIMEZONES))
+        qualifications = Qualification.objects.bulk_create([
+            Qualification(name=name, modifier=modifier, company=company) for name, modifier in QUALIFICATIONS
+        ])
+
+        workers = self.seed_workers(rng, company, qualifications, options['workers'])
+        tasks = Task.objects.bulk_create([
+            Task(title=f'Task {i}', description=f'Synthetic task {i} of {company.name}', estimate_hours=rng.randint(1, 40),
+                 difficulty=rng.choice(qualifications), company=company)
+            for i in range(options['tasks'])
+        ], batch_size=self.batch_size)
+
+        appointments = self.seed_appointments(rng, company, workers, tasks)
+        comments = self.seed_comments(rng, company, appointments)
+        appointed_task_ids = {appointment.task_appointed_id for appointment in appointments}
+        free_tasks = [task for task in tasks if task.id not in appointed_task_ids]
+        votes = self.seed_votings(rng, company, workers, free_tasks, options['votings'])
+        logs = self.seed_logs(rng, workers, tasks, appointments, options['logs'])
+
+        return {
+            "workers": len(workers),
+            "tasks": len(tasks),
+            "appointments": len(appointments),
+            "comments": comments,
+            "votes": votes,
+            "logs": logs,
+        }
+
+    def seed_workers(self, rng, company, qualifications, count):
+        workers = []
+        for i in range(count):
+            day_start = rng.randint(7, 11)
+            workers.append(Worker(username=f'{company.username}-worker-{i}',
+                                  email=f'{company.username}-worker-{i}@example.com',
+                                  password=self.password,
+                                  role='W',
+                                  first_name='Worker',
+                                  last_name=str(i),
+                                  working_hours=rng.choice([20, 30, 40, 40, 40]),
+                                  productivity=round(rng.uniform(0.5, 1.5), 4),
+                                  salary=rng.randint(500, 5000),
+                                  day_start=datetime.time(day_start),
+                                  day_end=datetime.time(day_start + 8),
+                                  employer=company,
+                                  qualification=rng.choice(qualifications)))
+        Worker.bulk_create(workers, batch_size=self.batch_size)
+        WorkerSchedule.objects.bulk_create([
+            WorkerSchedule(worker=worker, saturday=rng.random() < 0.1, sunday=rng.random() < 0.05) for worker in workers
+        ], batch_size=self.batch_size)
+        return workers
+
+    def seed_appointments(self, rng, company, workers, tasks):
+        """
+        Appoints about 60% of the tasks to random workers, most of them are done and some workers
+        have one task in progress.
+        """
+        appointed = rng.sample(tasks, int(len(tasks) * 0.6))
+        appointments = []
+        in_progress = set()
+        for task in appointed:
+            worker = rng.choice(workers)
+            time_start = self.now - datetime.timedelta(days=rng.uniform(0, self.days))
+            is_done = worker.id in in_progress or rng.random() < 0.9
+            if not is_done:
+                in_progress.add(worker.id)
+            time_end = min(time_start + datetime.timedelta(hours=rng.uniform(1, 120)), self.now) if is_done else None
+            appointments.append(TaskAppointment(task_appointed=task, worker_appointed=worker, is_done=is_done,
+                                                difficulty_for_worker=task.difficulty.modifier / worker.qualification.modifier,
+                                                time_start=time_start, time_end=time_end,
+                                                deadline=time_start + datetime.timedelta(hours=rng.uniform(8, 120)),
+                                                status="Done" if is_done else "In progress"))
+        with explicit_timestamps((TaskAppointment, 'time_start')):
+            return TaskAppointment.objects.bulk_create(appointments, batch_size=self.batch_size)
+
+    def seed_comments(self, rng, company, appointments):
+        comments = []
+        for appointment in appointments:
+            for i in range(rng.randint(0, 3)):
+                user = company if i % 2 else appointment.worker_appointed
+                comments.append(WorkerTaskComment(text=f'Comment {i}', task_appointment=appointment, user=user,
+                                                  time_created=appointment.time_start + datetime.timedelta(hours=i)))
+        with explicit_timestamps((WorkerTaskComment, 'time_created')):
+            WorkerTaskComment.objects.bulk_create(comments, batch_size=self.batch_size)
+        return len(comments)
+
+    def seed_votings(self, rng, company, workers, tasks, count):
+        """
+        Votings for the tasks that are not appointed, the older half of them is closed.
+        Tallies are counted here, because bulk inserted votes do not send signals.
+        """
+        if not tasks:
+            return 0
+        votes = []
+        votings = []
+        for i in range(count):
+            voting_tasks = rng.sample(tasks, min(len(tasks), rng.randint(3, 10)))
+            voting = TaskVoting.objects.create(title=f'Voting {i}', description='Synthetic voting', company=company,
+                                               deadline=self.now + datetime.timedelta(days=rng.randint(1, 30)),
+                                               max_score=len(voting_tasks), min_score=0)
+            voting.voting_tasks.set(voting_tasks)
+            for worker in rng.sample(workers, int(len(workers) * rng.uniform(0.3, 0.9))):
+                scores = rng.sample(range(1, len(voting_tasks) + 1), len(voting_tasks))
+                weight = worker.qualification.modifier * worker.productivity
+                votes.extend(TaskVote(task=task, score=score, voting=voting, worker=worker, weight=weight)
+                             for task, score in zip(voting_tasks, scores))
+            votings.append(voting)
+        TaskVote.objects.bulk_create(votes, batch_size=self.batch_size)
+
+        tallies = {}
+        for vote in votes:
+            tally = tallies.setdefault((vote.voting.id, vote.task.id),
+                                       TaskVotingTally(voting=vote.voting, task=vote.task))
+            tally.raw_score_sum += vote.score
+            tally.weighted_score += vote.score * vote.weight
+        TaskVotingTally.objects.bulk_create(tallies.values(), batch_size=self.batch_size)
+
+        for voting in votings[:count // 2]:
+            voting.close()
+        return len(votes)
+
+    def seed_logs(self, rng, workers, tasks, appointments, count):
+        """
+        Logs of every worker spread over the history, on the tasks appointed to the worker when there are any.
+        Rows are generated and inserted batch by batch, so millions of them do not have to fit in memory.
+        """
+        worker_tasks = {}
+        for appointment in appointments:
+            worker_tasks.setdefault(appointment.worker_appointed_id, []).append(appointment.task_appointed)
+
+        def generate():
+            for worker in workers:
+                candidates = worker_tasks.get(worker.id) or tasks
+                log_types = rng.choices(LOG_TYPES, weights=LOG_TYPE_WEIGHTS, k=count)
+                for log_type in log_types:
+                    yield WorkerLogs(worker=worker, task=rng.choice(candidates), type=log_type,
+                                     datetime=self.now - datetime.timedelta(seconds=rng.uniform(0, self.days * 86400)),
+                                     description='Synthetic log')
+
+        created = 0
+        batch = []
+        with explicit_timestamps((WorkerLogs, 'datetime')):
+            for log in generate():
+                batch.append(log)
+                if len(batch) == self.batch_size:
+                    WorkerLogs.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            WorkerLogs.objects.bulk_create(batch)
+        return created + len(batch)
@@ -0,0 +1,27 @@
+# Generated by Django 4.2 on 2026-10-19 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0007_taskvoting_max_score_taskvoting_min_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskvoting',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='taskvoting',
+            name='results_snapshot',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='taskvoting',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['deadline'], name='active_voting_deadline_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-19 18:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0008_taskvoting_results_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskVotingTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('raw_score_sum', models.IntegerField(default=0)),
+                ('weighted_score', models.FloatField(default=0)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='voting_tallies', to='companies.task')),
+                ('voting', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tallies', to='companies.taskvoting')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='taskvotingtally',
+            constraint=models.UniqueConstraint(fields=('voting', 'task'), name='unique_voting_task_tally'),
+        ),
+    ]
@@ -1,4 +1,7 @@
 from django.db import models
+from django.db.models import F, Q, FloatField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 import pytz
 
@@ -57,5 +60,112 @@ class TaskVoting(models.Model):
     is_active = models.BooleanField(default=True)
     max_score = models.IntegerField(default=10)
     min_score = models.IntegerField(default=0)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    results_snapshot = models.JSONField(null=True, blank=True, editable=False)
 
     company = models.ForeignKey(Company, on_delete=models.CASCADE, null=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deadline'], condition=Q(is_active=True), name='active_voting_deadline_idx'),
+        ]
+
+    def get_results(self, with_votes=False) -> dict:
+        """
+        Returns frozen results of the closed voting, or tallies the active one.
+        :param with_votes: include the list of votes of each task
+        """
+        if not self.is_active and self.results_snapshot is not None:
+            if with_votes:
+                return self.results_snapshot
+            return {
+                "winner": self.results_snapshot["winner"],
+                "tasks_info": [{key: value for key, value in task_info.items() if key != "votes"}
+                               for task_info in self.results_snapshot["tasks_info"]],
+            }
+        return self.get_voting_results(with_votes=with_votes)
+
+    def close(self):
+        """
+        Ends the voting and stores snapshot of its results, so they do not change with workers productivity.
+        """
+        self.results_snapshot = self.get_voting_results(with_votes=True)
+        self.is_active = False
+        self.closed_at = timezone.now()
+        self.save(update_fields=['results_snapshot', 'is_active', 'closed_at'])
+
+    def get_voting_results(self, with_votes=False) -> dict:
+        """
+        Reads results of the voting from its tally counters: score of each task is the sum of
+        vote score * voter qualification modifier * voter productivity at the time of the vote.
+        The weight is frozen when the vote is cast, so later changes of the voter qualification or
+        productivity do not change the results, only a new vote of the worker does.
+        Lists of votings prefetch voting_tasks and the tallies into `prefetched_tallies`, and with votes
+        also the votes into `prefetched_votes` (with workers), then the results are built without queries.
+        :param with_votes: include the list of votes of each task, it grows with the number of votes (one more query)
+        :return: dict with the winner title and per-task scores
+        """
+        tallies = getattr(self, 'prefetched_tallies', None)
+        if tallies is not None:
+            scores = {tally.task_id: tally.weighted_score for tally in tallies}
+            tasks = [{"id": task.id, "title": task.title, "score": scores.get(task.id, 0.0)}
+                     for task in sorted(self.voting_tasks.all(), key=lambda task: task.id)]
+        else:
+            weighted_score = TaskVotingTally.objects.filter(voting=self, task=OuterRef('pk')).values('weighted_score')[:1]
+            tasks = self.voting_tasks.annotate(
+                score=Coalesce(Subquery(weighted_score, output_field=FloatField()), 0.0),
+            ).order_by('id').values('id', 'title', 'score')
+
+        task_votes = {}
+        if with_votes:
+            votes = getattr(self, 'prefetched_votes', None)
+            if votes is not None:
+                votes = [{"task_id": vote.task_id, "worker__username": vote.worker.username, "score": vote.score,
+                          "weight": vote.weight} for vote in sorted(votes, key=lambda vote: vote.id)]
+            else:
+                votes = self.votes.order_by('id').values('task_id', 'worker__username', 'score', 'weight')
+            for vote in votes:
+                task_votes.setdefault(vote['task_id'], []).append({
+                    "worker": vote['worker__username'],
+                    "score": vote['score'],
+                    "expertness": round(vote['weight'] or 0, 3),
+                })
+
+        winner = ["", 0]
+        result = {"winner": "", "tasks_info": []}
+        for task in tasks:
+            task_info = {"id": task['id'], "title": task['title'], "score": round(task['score'], 3)}
+            if with_votes:
+                task_info["votes"] = task_votes.get(task['id'], [])
+            result["tasks_info"].append(task_info)
+            if winner[1] < task['score']:
+                winner = [task['title'], task['score']]
+
+        result["winner"] = winner[0]
+        return result
+
+
+class TaskVotingTally(models.Model):
+    """
+    Running totals of the votes for the task in the voting, kept up to date on every vote change.
+    """
+    voting = models.ForeignKey(TaskVoting, on_delete=models.CASCADE, null=False, related_name='tallies')
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, null=False, related_name='voting_tallies')
+    raw_score_sum = models.IntegerField(default=0)
+    weighted_score = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['voting', 'task'], name='unique_voting_task_tally'),
+        ]
+
+    @classmethod
+    def add_vote(cls, voting_id, task_id, score, weight):
+        tally, _ = cls.objects.get_or_create(voting_id=voting_id, task_id=task_id)
+        cls.objects.filter(id=tally.id).update(raw_score_sum=F('raw_score_sum') + score,
+                                               weighted_score=F('weighted_score') + score * weight)
+
+    @classmethod
+    def remove_vote(cls, voting_id, task_id, score, weight):
+        cls.objects.filter(voting_id=voting_id, task_id=task_id).update(raw_score_sum=F('raw_score_sum') - score,
+                                                                       weighted_score=F('weighted_score') - score * weight)
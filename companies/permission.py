@@ -18,7 +18,7 @@ class IsCompanyWorker(permissions.BasePermission):
         return False
 
     def has_object_permission(self, request, view, obj):
-        if obj.employer.id == request.user.id:
+        if obj.employer_id == request.user.id:
             return True
         return False
 
@@ -30,6 +30,6 @@ class IsCompanyOwner(permissions.BasePermission):
         return False
 
     def has_object_permission(self, request, view, obj):
-        if obj.worker.employer.id == request.user.id:
+        if obj.worker.employer_id == request.user.id:
             return True
         return False
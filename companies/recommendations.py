@@ -0,0 +1,71 @@
+import datetime
+
+from django.db.models import Exists, OuterRef, Subquery, Sum, IntegerField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from workers.models import Worker, TaskAppointment
+
+
+class WorkerRecommender:
+    """
+    Recommends workers of the company for its tasks. Workers with their weekly load, activity and schedules
+    are loaded once, so recommendations for any number of tasks take the same number of queries.
+    """
+
+    def __init__(self, company_id):
+        today = timezone.now()
+        last_monday = today - datetime.timedelta(days=today.weekday())
+        week_estimate_hours = TaskAppointment.objects.filter(
+            worker_appointed=OuterRef('pk'), time_start__gte=last_monday,
+        ).order_by().values('worker_appointed').annotate(total=Sum('task_appointed__estimate_hours')).values('total')
+
+        self.workers = list(Worker.objects.filter(employer=company_id).select_related(
+            'qualification', 'employer', 'schedule',
+        ).annotate(
+            week_estimate_hours=Coalesce(Subquery(week_estimate_hours, output_field=IntegerField()), 0),
+            is_busy=Exists(TaskAppointment.objects.filter(worker_appointed=OuterRef('pk'), is_done=False)),
+        ).order_by("-productivity"))
+
+    def recommend(self, task):
+        """
+        Free workers that can do the task, with the most remaining working hours of the week first.
+        Workers of the task qualification are preferred to any workers of a higher one.
+        """
+        workers = [worker for worker in self.workers
+                   if worker.working_hours >= task.estimate_hours and worker.qualification_id == task.difficulty_id]
+        if not workers:
+            workers = [worker for worker in self.workers
+                       if worker.working_hours >= task.estimate_hours
+                       and worker.qualification.modifier >= task.difficulty.modifier]
+        if not workers:
+            return _('There are no workers to recommend for this task!')
+        result = []
+        workers = sorted(workers, key=lambda a: a.count_remaining_working_hours(), reverse=True)
+        for worker in workers:
+            if not worker.is_busy:
+                result.append({
+                    "id": worker.id,
+                    "first_name": worker.first_name,
+                    "last_name": worker.last_name,
+                    "productivity": worker.productivity,
+                    "working_hours": worker.working_hours,
+                    "approx_finsh_date": worker.get_recommended_deadline_for_task(task, datetime.datetime.now(
+                        tz=worker.employer.get_timezone())),
+                })
+
+        if not result:
+            return _(
+                'There are no workers to recommend for this task for now! (probably some workers that can be recommended are busy now)')
+
+        return result
+
+
+def get_worker_recommender(context, company_id):
+    """
+    Returns recommender shared by all serializers of the request through their context.
+    """
+    if 'worker_recommender' not in context:
+        context['worker_recommender'] = WorkerRecommender(company_id)
+    return context['worker_recommender']
@@ -0,0 +1,22 @@
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from companies.models import TaskVoting
+
+logger = logging.getLogger(__name__)
+
+
+def close_expired_votings():
+    expired_votings = TaskVoting.objects.filter(is_active=True, deadline__lte=timezone.now()).values_list('id', flat=True)
+    closed = 0
+    for voting_id in expired_votings:
+        with transaction.atomic():
+            voting = TaskVoting.objects.select_for_update().filter(id=voting_id, is_active=True).first()
+            if voting:
+                voting.close()
+                closed += 1
+
+    if closed:
+        logger.info("Closed %d expired votings", closed)
@@ -1,15 +1,28 @@
 import datetime
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
+import django
 import pytz
+import tablib
+from django.conf import settings
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.db.models.functions import TruncMonth, TruncDay
 from django.utils import timezone
 from rest_framework import serializers
 from django.utils.translation import gettext_lazy as _
+from django.db import models, transaction
 from django.db.models import F, Count, Q
 
 from companies.models import Company, Qualification, Task, TaskVoting
+from companies.recommendations import get_worker_recommender
+from config.serializers import SparseFieldsetMixin, get_expand
+from users.models import UserAccount
 from workers.models import Worker, TaskAppointment, WorkerLogs, WorkerTaskComment, WorkerSchedule, TaskVote
 
 
@@ -43,7 +56,7 @@ class CompanySerializer(serializers.ModelSerializer):
         )
 
 
-class QualificationSerializer(serializers.ModelSerializer):
+class QualificationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Qualification
         fields = [
@@ -56,11 +69,11 @@ class QualificationSerializer(serializers.ModelSerializer):
         return Qualification.objects.create(
             name=validated_data['name'],
             modifier=validated_data['modifier'],
-            company=self.context['request'].user.company,
+            company_id=self.context['request'].user.company_id,
         )
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     task_difficulty_info = QualificationSerializer(read_only=True, source="difficulty")
     is_done = serializers.SerializerMethodField(read_only=True)
     is_appointed = serializers.SerializerMethodField(read_only=True)
@@ -79,11 +92,23 @@ class TaskSerializer(serializers.ModelSerializer):
             'is_appointed',
             'recommended_workers',
         ]
+        # Fields that are computed only when requested with ?expand=<field>[,<field>]
+        expandable_fields = [
+            'recommended_workers',
+        ]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expand = get_expand(self.context.get('request'))
+        for field_name in self.Meta.expandable_fields:
+            if field_name not in expand:
+                fields.pop(field_name, None)
+        return fields
 
     def validate(self, data):
         errors = {}
 
-        if data.get('difficulty') and self.context['request'].user.company != data['difficulty'].company:
+        if data.get('difficulty') and self.context['request'].user.company_id != data['difficulty'].company_id:
             errors.update({'qualification': [_('You cannot use another company`s qualifications!')]})
 
         if errors:
@@ -92,51 +117,19 @@ class TaskSerializer(serializers.ModelSerializer):
         return data
 
     def get_is_done(self, obj):
-        if TaskAppointment.objects.filter(task_appointed=obj, is_done=True):
-            return True
-        return False
+        if hasattr(obj, 'is_done'):
+            return obj.is_done
+        return TaskAppointment.objects.filter(task_appointed=obj, is_done=True).exists()
 
     def get_is_appointed(self, obj):
-        if TaskAppointment.objects.filter(task_appointed=obj):
-            return True
-        return False
-
+        if hasattr(obj, 'is_appointed'):
+            return obj.is_appointed
+        return TaskAppointment.objects.filter(task_appointed=obj).exists()
 
     def get_recommended_workers(self, obj):
-        if TaskAppointment.objects.filter(task_appointed=obj):
+        if self.get_is_appointed(obj):
             return {}
-        estimate_hours = obj.estimate_hours
-        difficulty = obj.difficulty
-        company = obj.company
-        workers = Worker.objects.filter(working_hours__gte=estimate_hours,
-                                        qualification=difficulty,
-                                        employer=company).order_by("-productivity")
-
-        if not workers:
-            workers = Worker.objects.filter(working_hours__gte=estimate_hours,
-                                            qualification__modifier__gte=difficulty.modifier,
-                                            employer=company).order_by("-productivity")
-        if not workers:
-            return _('There are no workers to recommend for this task!')
-        result = []
-        workers = sorted(workers, key=lambda a: a.count_remaining_working_hours(), reverse=True)
-        for worker in workers:
-            if not TaskAppointment.objects.filter(is_done=False, worker_appointed=worker):
-                result.append({
-                    "id": worker.id,
-                    "first_name": worker.first_name,
-                    "last_name": worker.last_name,
-                    "productivity": worker.productivity,
-                    "working_hours": worker.working_hours,
-                    "approx_finsh_date": worker.get_recommended_deadline_for_task(obj, datetime.datetime.now(
-                        tz=worker.employer.get_timezone())),
-                })
-
-        if not result:
-            return _(
-                'There are no workers to recommend for this task for now! (probably some workers that can be recommended are busy now)')
-
-        return result
+        return get_worker_recommender(self.context, obj.company_id).recommend(obj)
 
     def create(self, validated_data):
         return Task.objects.create(
@@ -144,7 +137,7 @@ class TaskSerializer(serializers.ModelSerializer):
             description=validated_data['description'],
             estimate_hours=validated_data['estimate_hours'],
             difficulty=validated_data['difficulty'],
-            company=self.context['request'].user.company,
+            company_id=self.context['request'].user.company_id,
         )
 
     def update(self, instance, validated_data):
@@ -161,7 +154,134 @@ class TaskSerializer(serializers.ModelSerializer):
         return instance
 
 
-class WorkerScheduleSerializer(serializers.ModelSerializer):
+class BulkImportSerializer(serializers.Serializer):
+    """
+    Base of the CSV/XLSX imports: the first row of the file holds column names, every other row is validated
+    with `row_serializer_class`. Nothing is saved if any row is invalid, the errors are reported per file row.
+    """
+    file = serializers.FileField(write_only=True)
+
+    row_serializer_class = None
+    file_formats = {'.csv': 'csv', '.xlsx': 'xlsx'}
+    max_rows = 10000
+    batch_size = 1000
+
+    def validate_file(self, value):
+        file_format = self.file_formats.get(os.path.splitext(value.name)[1].lower())
+        if not file_format:
+            raise serializers.ValidationError(_('Only .csv and .xlsx files are supported!'))
+
+        content = value.read()
+        try:
+            if file_format == 'csv':
+                content = content.decode('utf-8-sig')
+            dataset = tablib.Dataset().load(content, format=file_format)
+        except Exception:
+            raise serializers.ValidationError(_('The file can not be read!'))
+
+        if not dataset.headers or not dataset.height:
+            raise serializers.ValidationError(_('The file has no rows to import!'))
+        if dataset.height > self.max_rows:
+            raise serializers.ValidationError(_('The file has more than %(max_rows)s rows!') % {'max_rows': self.max_rows})
+
+        return dataset
+
+    def get_row_context(self):
+        return self.context
+
+    def validate_rows(self, rows):
+        """
+        Checks across all valid rows (duplicates, existing records), returns errors by row index.
+        """
+        return {}
+
+    def validate(self, data):
+        dataset = data.pop('file')
+        headers = [str(header).strip().lower() if header else None for header in dataset.headers]
+
+        # One row serializer builds its fields once and validates every row
+        row_serializer = self.row_serializer_class(context=self.get_row_context())
+        rows = {}
+        errors = {}
+        for index, values in enumerate(dataset):
+            row = {header: value for header, value in zip(headers, values) if header and value not in (None, '')}
+            try:
+                rows[index] = row_serializer.run_validation(row)
+            except serializers.ValidationError as exc:
+                errors[index] = exc.detail
+
+        for index, row_errors in self.validate_rows(rows).items():
+            errors.setdefault(index, {}).update(row_errors)
+
+        if errors:
+            raise serializers.ValidationError({'rows': [
+                {'row': index + 2, 'errors': errors[index]} for index in sorted(errors)
+            ]})
+
+        data['rows'] = list(rows.values())
+        return data
+
+
+def get_qualifications_lookup(company_id):
+    """
+    Maps ids and lowercased names of the company qualifications to them, for imports.
+    """
+    qualifications = {}
+    for qualification in Qualification.objects.filter(company=company_id):
+        qualifications.setdefault(qualification.name.strip().lower(), qualification)
+        qualifications[str(qualification.id)] = qualification
+    return qualifications
+
+
+class CompanyQualificationField(serializers.CharField):
+    """
+    Qualification given by id or name, resolved from the `qualifications` lookup in context.
+    """
+    default_error_messages = {
+        'does_not_exist': _('There is no such qualification in your company!'),
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, float) and data.is_integer():
+            data = int(data)
+        value = super().to_internal_value(data)
+        qualification = self.context['qualifications'].get(value.lower())
+        if not qualification:
+            self.fail('does_not_exist')
+        return qualification
+
+
+class TaskImportRowSerializer(serializers.ModelSerializer):
+    difficulty = CompanyQualificationField()
+
+    class Meta:
+        model = Task
+        fields = [
+            'title',
+            'description',
+            'estimate_hours',
+            'difficulty',
+        ]
+
+
+class TaskImportSerializer(BulkImportSerializer):
+    """
+    Creates tasks from the file with title, description, estimate_hours and difficulty columns,
+    difficulty is the id or the name of the company qualification.
+    """
+    row_serializer_class = TaskImportRowSerializer
+
+    def get_row_context(self):
+        return {**self.context, 'qualifications': get_qualifications_lookup(self.context['request'].user.id)}
+
+    def create(self, validated_data):
+        company_id = self.context['request'].user.id
+        tasks = [Task(company_id=company_id, **row) for row in validated_data['rows']]
+        with transaction.atomic():
+            return Task.objects.bulk_create(tasks, batch_size=self.batch_size)
+
+
+class WorkerScheduleSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     worker_id = serializers.IntegerField(read_only=True)
 
     class Meta:
@@ -179,7 +299,7 @@ class WorkerScheduleSerializer(serializers.ModelSerializer):
         ]
 
 
-class WorkerSerializer(serializers.ModelSerializer):
+class WorkerSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     password = serializers.CharField(style={'input_type': 'password'}, write_only=True, validators=[validate_password])
     password2 = serializers.CharField(style={'input_type': 'password'}, write_only=True)
     worker_qualification_info = QualificationSerializer(read_only=True, source="qualification")
@@ -212,7 +332,7 @@ class WorkerSerializer(serializers.ModelSerializer):
 
         if password and password != password2:
             errors.update({'password': [_('Passwords do not match!')]})
-        if data.get('qualification') and self.context['request'].user.company != data['qualification'].company:
+        if data.get('qualification') and self.context['request'].user.company_id != data['qualification'].company_id:
             errors.update({'qualification': [_('You cannot use another company`s qualifications!')]})
 
         if errors:
@@ -229,7 +349,7 @@ class WorkerSerializer(serializers.ModelSerializer):
             role='W',
             first_name=validated_data['first_name'],
             last_name=validated_data['last_name'],
-            employer=self.context['request'].user.company,
+            employer_id=self.context['request'].user.company_id,
             qualification=validated_data['qualification'],
             working_hours=validated_data['working_hours'],
             day_start=validated_data['day_start'],
@@ -259,7 +379,112 @@ class WorkerSerializer(serializers.ModelSerializer):
         return instance
 
 
-class CompanyTaskCommentSerializer(serializers.ModelSerializer):
+_password_hashing_pool = None
+_password_hashing_pool_lock = threading.Lock()
+
+
+def get_password_hashing_pool():
+    """
+    Process pool of the worker imports, created on first use and reused by the following requests.
+    Its processes are spawned, not forked, so they do not inherit locks held by threads of the web process.
+    """
+    global _password_hashing_pool
+    with _password_hashing_pool_lock:
+        if _password_hashing_pool is None:
+            _password_hashing_pool = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASHING_WORKERS,
+                                                         mp_context=multiprocessing.get_context('spawn'),
+                                                         initializer=django.setup)
+        return _password_hashing_pool
+
+
+def reset_password_hashing_pool(pool):
+    global _password_hashing_pool
+    with _password_hashing_pool_lock:
+        if _password_hashing_pool is pool:
+            _password_hashing_pool = None
+    pool.shutdown(wait=False)
+
+
+class WorkerImportRowSerializer(serializers.ModelSerializer):
+    password = serializers.CharField(write_only=True, validators=[validate_password])
+    qualification = CompanyQualificationField()
+
+    class Meta:
+        model = Worker
+        fields = [
+            'username',
+            'email',
+            'password',
+            'first_name',
+            'last_name',
+            'qualification',
+            'working_hours',
+            'day_start',
+            'day_end',
+            'salary',
+        ]
+        # Uniqueness is checked for the whole file at once in WorkerImportSerializer.validate_rows
+        extra_kwargs = {
+            'username': {'validators': [UnicodeUsernameValidator()]},
+            'email': {'validators': []},
+        }
+
+
+class WorkerImportSerializer(BulkImportSerializer):
+    """
+    Creates workers and their schedules from the file with the columns of WorkerImportRowSerializer,
+    passwords are hashed in a process pool.
+    """
+    row_serializer_class = WorkerImportRowSerializer
+    max_rows = 5000
+    # Smaller files are hashed in the request process, sending them to the pool costs more than it saves
+    parallel_hashing_threshold = 20
+
+    def get_row_context(self):
+        return {**self.context, 'qualifications': get_qualifications_lookup(self.context['request'].user.id)}
+
+    def validate_rows(self, rows):
+        errors = {}
+        for field_name, message in (('username', _('A user with that username already exists.')),
+                                    ('email', _('User account with this email address already exists.'))):
+            values = [row[field_name] for row in rows.values()]
+            taken = set(UserAccount.objects.filter(**{f'{field_name}__in': values}).values_list(field_name, flat=True))
+            seen = set()
+            for index, row in rows.items():
+                if row[field_name] in taken or row[field_name] in seen:
+                    errors.setdefault(index, {})[field_name] = [message]
+                seen.add(row[field_name])
+        return errors
+
+    def hash_passwords(self, passwords):
+        if len(passwords) < self.parallel_hashing_threshold:
+            return [make_password(password) for password in passwords]
+        pool = get_password_hashing_pool()
+        chunksize = max(1, len(passwords) // (4 * settings.PASSWORD_HASHING_WORKERS))
+        try:
+            return list(pool.map(make_password, passwords, chunksize=chunksize))
+        except BrokenProcessPool:
+            # A process of the pool died, the next import starts a new pool
+            reset_password_hashing_pool(pool)
+            return [make_password(password) for password in passwords]
+
+    def create(self, validated_data):
+        rows = validated_data['rows']
+        passwords = self.hash_passwords([row.pop('password') for row in rows])
+        company_id = self.context['request'].user.id
+        workers = [Worker(**row, password=password, role='W', employer_id=company_id)
+                   for row, password in zip(rows, passwords)]
+
+        with transaction.atomic():
+            Worker.bulk_create(workers, batch_size=self.batch_size)
+            # The worker_created signal is not sent by bulk inserts
+            WorkerSchedule.objects.bulk_create([WorkerSchedule(worker=worker) for worker in workers],
+                                               batch_size=self.batch_size)
+
+        return workers
+
+
+class CompanyTaskCommentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     time_created = serializers.DateTimeField(read_only=True)
     username = serializers.CharField(read_only=True, source='user.username')
     localized_time_created = serializers.SerializerMethodField(read_only=True)
@@ -275,7 +500,7 @@ class CompanyTaskCommentSerializer(serializers.ModelSerializer):
         ]
 
     def validate(self, data):
-        if data.get('task_appointment') and not TaskAppointment.objects.filter(id=data.get('task_appointment').id, task_appointed__company=self.context['request'].user.company):
+        if data.get('task_appointment') and not TaskAppointment.objects.filter(id=data.get('task_appointment').id, task_appointed__company=self.context['request'].user.company_id):
             raise serializers.ValidationError({'task_appointment': [
                 _('The task_appointment does not exist or does not belong to your company!')
             ]})
@@ -283,7 +508,9 @@ class CompanyTaskCommentSerializer(serializers.ModelSerializer):
         return data
 
     def get_localized_time_created(self, obj):
-        print(obj.user.role)
+        # Views listing comments of one company pass its timezone
+        if 'timezone' in self.context:
+            return timezone.localtime(obj.time_created, self.context['timezone']).strftime('%Y-%m-%d %H:%M:%S')
         if obj.user.role == 'C':
             localized_datetime = timezone.localtime(obj.time_created, obj.user.company.get_timezone())
         else:
@@ -294,7 +521,7 @@ class CompanyTaskCommentSerializer(serializers.ModelSerializer):
         if validated_data.get('task_appointment') and validated_data.get('task_appointment') != instance.task_appointment:
             raise serializers.ValidationError({'task_appointment': [_('You can not change task for comment!')]})
 
-        if self.context['request'].user != instance.user:
+        if self.context['request'].user.id != instance.user_id:
             raise serializers.ValidationError({'user': [_('You can not change another people comments!')]})
 
         instance.text = validated_data.get('text') or instance.text
@@ -307,11 +534,11 @@ class CompanyTaskCommentSerializer(serializers.ModelSerializer):
         return WorkerTaskComment.objects.create(
             text=validated_data['text'],
             task_appointment=validated_data['task_appointment'],
-            user=self.context['request'].user
+            user_id=self.context['request'].user.id
         )
 
 
-class TaskAppointmentSerializer(serializers.ModelSerializer):
+class TaskAppointmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     task_info = TaskSerializer(read_only=True, source="task_appointed")
     worker_info = WorkerSerializer(read_only=True, source="worker_appointed")
     is_done = serializers.BooleanField(read_only=True)
@@ -341,11 +568,11 @@ class TaskAppointmentSerializer(serializers.ModelSerializer):
     def validate(self, data):
         errors = {}
 
-        if not Worker.objects.filter(id=data['worker_appointed'].id, employer=self.context['request'].user.company):
+        if not Worker.objects.filter(id=data['worker_appointed'].id, employer=self.context['request'].user.company_id):
             errors.update(
                 {'worker_appointed': [_('The assigned worker does not exist or does not belong to your company!')]})
         if not Task.objects.filter(id=data['task_appointed'].id,
-                                   company=self.context['request'].user.company):
+                                   company=self.context['request'].user.company_id):
             errors.update({'task_appointed': [
                 _('The assigned task does not exist or does not belong to your company!')
             ]})
@@ -394,7 +621,28 @@ class TaskAppointmentSerializer(serializers.ModelSerializer):
         return instance
 
 
-class WorkerLogSerializer(serializers.ModelSerializer):
+class AppointedTaskSerializer(TaskSerializer):
+    """
+    Task of the appointment, its flags are taken from the appointment instead of separate queries.
+    """
+
+    def get_is_done(self, obj):
+        # select_related from the appointment caches the reverse relation as well
+        return bool(obj.task_appointment.is_done)
+
+    def get_is_appointed(self, obj):
+        return True
+
+
+class TaskAppointmentListSerializer(TaskAppointmentSerializer):
+    """
+    Read representation of appointments, built only from the joined and prefetched relations.
+    Comments are localized to the company timezone passed in context.
+    """
+    task_info = AppointedTaskSerializer(read_only=True, source="task_appointed")
+
+
+class WorkerLogSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     datetime = serializers.DateTimeField(read_only=True)
     username = serializers.CharField(read_only=True, source="worker.username")
     title = serializers.CharField(read_only=True, source="task.title")
@@ -420,7 +668,7 @@ class WorkerLogSerializer(serializers.ModelSerializer):
         return localized_datetime.strftime('%Y-%m-%d %H:%M:%S')
 
 
-class TaskRecommendationSerializer(serializers.ModelSerializer):
+class TaskRecommendationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     recommended_workers = serializers.SerializerMethodField()
 
     class Meta:
@@ -432,39 +680,57 @@ class TaskRecommendationSerializer(serializers.ModelSerializer):
         ]
 
     def get_recommended_workers(self, obj):
-        estimate_hours = obj.estimate_hours
-        difficulty = obj.difficulty
-        company = obj.company
-        workers = Worker.objects.filter(working_hours__gte=estimate_hours,
-                                        qualification=difficulty,
-                                        employer=company).order_by("-productivity")
-
-        if not workers:
-            workers = Worker.objects.filter(working_hours__gte=estimate_hours,
-                                            qualification__modifier__gte=difficulty.modifier,
-                                            employer=company).order_by("-productivity")
-        if not workers:
-            return _('There are no workers to recommend for this task!')
-        result = []
-        workers = sorted(workers, key=lambda a: a.count_remaining_working_hours(), reverse=True)
-        for worker in workers:
-            if not TaskAppointment.objects.filter(is_done=False, worker_appointed=worker):
-                result.append({
-                    "id": worker.id,
-                    "first_name": worker.first_name,
-                    "last_name": worker.last_name,
-                    "productivity": worker.productivity,
-                    "working_hours": worker.working_hours,
-                    "approx_finsh_date": worker.get_recommended_deadline_for_task(obj, datetime.datetime.now(tz=worker.employer.get_timezone())),
-                })
-
-        if not result:
-            return _('There are no workers to recommend for this task for now! (probably some workers that can be recommended are busy now)')
-
-        return result
-
-
-class WorkerReportSerializer(serializers.ModelSerializer):
+        return get_worker_recommender(self.context, obj.company_id).recommend(obj)
+
+
+def get_report_start(request):
+    """
+    Returns start of the period of the report, given in days before now with ?days=, or None for all time.
+    """
+    days = request.query_params.get("days")
+    if not days:
+        return None
+    return timezone.now() - datetime.timedelta(days=int(days))
+
+
+def get_statistics_by_days(worker_logs):
+    """
+    Counts logs of each worker by days: {worker_id: [{"day", "td", "ta", "oc"}]}.
+    """
+    statistics = worker_logs.annotate(day=TruncDay('datetime')).values('worker', 'day').annotate(
+        td=Count('id', filter=Q(type='TD')),
+        ta=Count('id', filter=Q(type='TA')),
+        oc=Count('id', filter=Q(type='OC')),
+    ).order_by('day')
+
+    result = {}
+    for day in statistics:
+        worker_id = day.pop('worker')
+        result.setdefault(worker_id, []).append(day)
+    return result
+
+
+class WorkerReportListSerializer(serializers.ListSerializer):
+    """
+    Counts daily statistics of all reported workers in one query.
+    """
+
+    def to_representation(self, data):
+        workers = list(data.all() if isinstance(data, models.Manager) else data)
+        if 'worker_statistics_by_days' in self.child.fields:
+            worker_logs = WorkerLogs.objects.filter(worker__in=workers)
+            since = get_report_start(self.context['request'])
+            if since:
+                worker_logs = worker_logs.filter(datetime__gte=since)
+            self.context['statistics_by_days'] = get_statistics_by_days(worker_logs)
+        return super().to_representation(workers)
+
+
+class WorkerReportSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Statistics are read from the annotations and prefetched appointments of WorkerReportView queryset
+    when they are there, and queried per worker otherwise.
+    """
     worker_general_statistics = serializers.SerializerMethodField()
     worker_tasks_statistics = serializers.SerializerMethodField()
     worker_statistics_by_days = serializers.SerializerMethodField()
@@ -481,20 +747,28 @@ class WorkerReportSerializer(serializers.ModelSerializer):
             "worker_tasks_statistics",
             "worker_statistics_by_days",
         ]
+        list_serializer_class = WorkerReportListSerializer
 
     def get_worker_general_statistics(self, obj):
-        if not self.context['request'].query_params.get("days"):
+        if hasattr(obj, 'tasks_done'):
+            return {
+                "tasks_done": obj.tasks_done,
+                "times_out_of_working_place": obj.times_out_of_working_place,
+                "times_deadline_not_met": obj.times_deadline_not_met,
+            }
+
+        since = get_report_start(self.context['request'])
+        if not since:
             worker_logs = WorkerLogs.objects.filter(worker=obj)
             times_deadline_not_met = TaskAppointment.objects.filter(worker_appointed=obj,
                                                                     is_done=True,
                                                                     deadline__gt=F('time_end')).count()
         else:
-            days = timezone.now() - datetime.timedelta(days=int(self.context['request'].query_params.get("days")))
-            worker_logs = WorkerLogs.objects.filter(worker=obj, datetime__gte=days)
+            worker_logs = WorkerLogs.objects.filter(worker=obj, datetime__gte=since)
             times_deadline_not_met = TaskAppointment.objects.filter(worker_appointed=obj,
                                                                     is_done=True,
                                                                     deadline__gt=F('time_end'),
-                                                                    time_end__gte=days).count()
+                                                                    time_end__gte=since).count()
 
         result = {
             "tasks_done": worker_logs.filter(type__exact="TD").count(),
@@ -505,51 +779,50 @@ class WorkerReportSerializer(serializers.ModelSerializer):
         return result
 
     def get_worker_statistics_by_days(self, obj):
-        if not self.context['request'].query_params.get("days"):
+        statistics_by_days = self.context.get('statistics_by_days')
+        if statistics_by_days is None:
             worker_logs = WorkerLogs.objects.filter(worker=obj)
-        else:
-            days = timezone.now() - datetime.timedelta(days=int(self.context['request'].query_params.get("days")))
-            worker_logs = WorkerLogs.objects.filter(worker=obj, datetime__gte=days)
-
-        worker_statistics = worker_logs.annotate(day=TruncDay('datetime')).values('day').annotate(
-            td=Count('id', filter=Q(type='TD')),
-            ta=Count('id', filter=Q(type='TA')),
-            oc=Count('id', filter=Q(type='OC')),
-        ).values('day', 'td', "ta", "oc").order_by('day')
+            since = get_report_start(self.context['request'])
+            if since:
+                worker_logs = worker_logs.filter(datetime__gte=since)
+            statistics_by_days = get_statistics_by_days(worker_logs)
 
-        return worker_statistics
+        return statistics_by_days.get(obj.id, [])
 
     def get_worker_tasks_statistics(self, obj):
-        days = self.context['request'].query_params.get("days")
-        if days:
-            days = timezone.now() - datetime.timedelta(days=int(days))
-            worker_tasks_appointments = TaskAppointment.objects.filter(worker_appointed=obj,
-                                                                       is_done=True,
-                                                                       time_end__gte=days)
-        else:
-            worker_tasks_appointments = TaskAppointment.objects.filter(worker_appointed=obj,
-                                                                       is_done=True)
+        worker_tasks_appointments = getattr(obj, 'done_appointments', None)
+        if worker_tasks_appointments is None:
+            since = get_report_start(self.context['request'])
+            worker_tasks_appointments = TaskAppointment.objects.filter(worker_appointed=obj, is_done=True)
+            if since:
+                worker_tasks_appointments = worker_tasks_appointments.filter(time_end__gte=since)
 
         result = []
         for task_appointment in worker_tasks_appointments:
-            logs = WorkerLogs.objects.filter(task=task_appointment.task_appointed)
+            if hasattr(task_appointment, 'times_out_of_working_place'):
+                times_out_of_working_place = task_appointment.times_out_of_working_place
+            else:
+                times_out_of_working_place = WorkerLogs.objects.filter(task=task_appointment.task_appointed,
+                                                                       type__exact="OC").count()
+            task_performance = task_appointment.get_task_performance()
+            company_timezone = task_appointment.worker_appointed.employer.get_timezone()
             result.append({
                 "id": task_appointment.task_appointed.id,
                 "title": task_appointment.task_appointed.title,
                 "estimate_hours": task_appointment.task_appointed.estimate_hours,
-                "times_out_of_working_place": logs.filter(type__exact="OC").count(),
-                "task_performance": task_appointment.get_task_performance(),
+                "times_out_of_working_place": times_out_of_working_place,
+                "task_performance": task_performance,
                 "is_deadline_met": (task_appointment.deadline < task_appointment.time_end),
-                "spent_working_hours": (task_appointment.task_appointed.estimate_hours / task_appointment.get_task_performance()),
-                "time_start": timezone.localtime(task_appointment.time_start, task_appointment.worker_appointed.employer.get_timezone()).strftime('%Y-%m-%d %H:%M:%S'),
-                "time_end": timezone.localtime(task_appointment.time_end, task_appointment.worker_appointed.employer.get_timezone()).strftime('%Y-%m-%d %H:%M:%S'),
+                "spent_working_hours": (task_appointment.task_appointed.estimate_hours / task_performance),
+                "time_start": timezone.localtime(task_appointment.time_start, company_timezone).strftime('%Y-%m-%d %H:%M:%S'),
+                "time_end": timezone.localtime(task_appointment.time_end, company_timezone).strftime('%Y-%m-%d %H:%M:%S'),
                 "deadline": task_appointment.deadline.strftime('%Y-%m-%d %H:%M:%S')
             })
 
         return result
 
 
-class AutoAppointmentSerializer(serializers.ModelSerializer):
+class AutoAppointmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     workers = serializers.SerializerMethodField(read_only=True)
     tasks = serializers.SerializerMethodField(read_only=True)
     previous_appointments = serializers.SerializerMethodField(read_only=True)
@@ -565,7 +838,8 @@ class AutoAppointmentSerializer(serializers.ModelSerializer):
         ]
 
     def get_workers(self, obj):
-        workers = Worker.objects.filter(employer=obj).order_by("-productivity", "qualification__modifier", "working_hours")
+        workers = Worker.objects.filter(employer=obj).select_related('qualification').order_by(
+            "-productivity", "qualification__modifier", "working_hours")
         result = []
         for worker in workers:
             result.append({
@@ -579,7 +853,7 @@ class AutoAppointmentSerializer(serializers.ModelSerializer):
         return result
 
     def get_tasks(self, obj):
-        tasks = Task.objects.filter(company=obj)
+        tasks = Task.objects.filter(company=obj).select_related('difficulty')
         result = []
         for task in tasks:
             result.append({
@@ -604,8 +878,17 @@ class AutoAppointmentSerializer(serializers.ModelSerializer):
 
     def get_new_appointments(self, obj):
         is_save_mode = self.context['request'].query_params.get("is_save_mode") != 'false'
-        sorted_workers = Worker.objects.filter(employer=obj).order_by("-productivity", "qualification__modifier", "working_hours")
-        tasks = Task.objects.filter(company=obj)
+        sorted_workers = Worker.objects.filter(employer=obj).select_related(
+            'qualification', 'employer', 'schedule',
+        ).order_by("-productivity", "qualification__modifier", "working_hours")
+        tasks = Task.objects.filter(company=obj).select_related('difficulty')
+        appointed_task_ids = set()
+        busy_worker_ids = set()
+        for task_id, worker_id, is_done in TaskAppointment.objects.filter(
+                task_appointed__company=obj).values_list('task_appointed_id', 'worker_appointed_id', 'is_done'):
+            appointed_task_ids.add(task_id)
+            if is_done is False:
+                busy_worker_ids.add(worker_id)
         assigned_tasks = []
         assignment_steps = []
         assigned_workers = set()
@@ -617,11 +900,11 @@ class AutoAppointmentSerializer(serializers.ModelSerializer):
 
         i = 0
         for task in tasks:
-            if not TaskAppointment.objects.filter(task_appointed=task):
+            if task.id not in appointed_task_ids:
                 chosen_worker = None
 
                 for worker in sorted_workers:
-                    if not TaskAppointment.objects.filter(is_done=False, worker_appointed=worker) \
+                    if worker.id not in busy_worker_ids \
                             and worker not in assigned_workers \
                             and task.difficulty.modifier <= worker.qualification.modifier \
                             and task.estimate_hours <= worker.working_hours:
@@ -652,7 +935,7 @@ class AutoAppointmentSerializer(serializers.ModelSerializer):
         return result
 
 
-class VotingSerializer(serializers.ModelSerializer):
+class VotingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     voting_results = serializers.SerializerMethodField(read_only=True)
     class Meta:
         model = TaskVoting
@@ -667,7 +950,7 @@ class VotingSerializer(serializers.ModelSerializer):
         ]
 
     def validate_voting_tasks(self, value):
-        company_done_tasks = Task.objects.filter(company=self.context['request'].user.company)
+        company_done_tasks = Task.objects.filter(company=self.context['request'].user.company_id)
         for task in value:
             if task not in company_done_tasks:
                 raise serializers.ValidationError({
@@ -676,24 +959,8 @@ class VotingSerializer(serializers.ModelSerializer):
         return value
 
     def get_voting_results(self, obj):
-        tasks = obj.voting_tasks.all()
-        votes = obj.votes.all()
-        winner = ["", 0]
-        result = {"winner": "", "tasks_info": []}
-        for task in tasks:
-            score = 0
-            task_votes = []
-            for vote in votes:
-                if vote.task == task:
-                    expertness = vote.worker.qualification.modifier * vote.worker.productivity
-                    task_votes.append({"worker": vote.worker.username, "score": vote.score, "expertness": round(expertness, 3)})
-                    score += vote.score * expertness
-            result["tasks_info"].append({"id": task.id,"title": task.title, "score": round(score, 3), "votes": task_votes})
-            if winner[1] < score:
-                winner = [task.title, score]
-
-        result["winner"] = winner[0]
-        return result
+        # Scores are read from the tallies, votes of every task are listed as the API always did
+        return obj.get_results(with_votes=True)
 
     def create(self, validated_data):
         voting_tasks = validated_data["voting_tasks"]
@@ -702,7 +969,7 @@ class VotingSerializer(serializers.ModelSerializer):
             description=validated_data["description"],
             deadline=validated_data["deadline"],
             is_active=validated_data["is_active"],
-            company=self.context['request'].user.company,
+            company_id=self.context['request'].user.company_id,
             max_score=len(voting_tasks)
         )
         for voting_task in voting_tasks:
@@ -719,18 +986,25 @@ class VotingSerializer(serializers.ModelSerializer):
         instance.description = validated_data.get('description') or instance.description
         #instance.voting_tasks = validated_data.get('voting_tasks') or instance.title
         instance.deadline = validated_data.get('deadline') or instance.deadline
+        was_active = instance.is_active
         instance.is_active = validated_data.get('is_active')
         voting_tasks = validated_data["voting_tasks"] or instance.voting_tasks
         instance.max_score = len(voting_tasks)
         for voting_task in voting_tasks:
             instance.voting_tasks.add(voting_task)
+        if instance.is_active:
+            instance.results_snapshot = None
+            instance.closed_at = None
 
         instance.save()
 
+        if was_active and not instance.is_active:
+            instance.close()
+
         return instance
 
 
-class VotingResultSerializer(serializers.ModelSerializer):
+class VotingResultSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     voting_results = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
@@ -745,21 +1019,5 @@ class VotingResultSerializer(serializers.ModelSerializer):
         ]
 
     def get_voting_results(self, obj):
-        tasks = obj.voting_tasks.all()
-        votes = obj.votes.all()
-        winner = ["", 0]
-        result = {"winner": "", "tasks_info": []}
-        for task in tasks:
-            score = 0
-            task_votes = []
-            for vote in votes:
-                if vote.task == task:
-                    expertness = vote.worker.qualification.modifier * vote.worker.productivity
-                    task_votes.append({"worker": vote.worker.username, "score": vote.score, "expertness": round(expertness, 3)})
-                    score += vote.score * expertness
-            result["tasks_info"].append({"id": task.id,"title": task.title, "score": round(score, 3), "votes": task_votes})
-            if winner[1] < score:
-                winner = [task.title, score]
-
-        result["winner"] = winner[0]
-        return result
+        # Scores are read from the tallies, votes of every task are listed as the API always did
+        return obj.get_results(with_votes=True)
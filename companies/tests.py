@@ -1,3 +1,207 @@
-from django.test import TestCase
+import datetime
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+import companies.serializers
+from companies.models import Task, TaskVoting
+from companies.scheduler import close_expired_votings
+from companies.serializers import WorkerImportSerializer, get_password_hashing_pool
+from config.db_router import REPLICA_DATABASE, ReplicaRouter
+from config.testing import QueryBudgetTestCase, TenantTestCase
+from workers.models import Worker, WorkerLogs, WorkerTaskComment
+
+
+class CompanyQueryBudgetTests(QueryBudgetTestCase):
+    def test_workers(self):
+        self.assertQueryBudget(2, '/api/company/worker/')
+        self.assertQueryBudget(1, lambda tenant: f'/api/company/worker/{tenant.worker.id}/')
+
+    def test_worker_schedule(self):
+        self.assertQueryBudget(1, lambda tenant: f'/api/company/worker-schedule/{tenant.worker.schedule.id}/')
+
+    def test_logs(self):
+        self.assertQueryBudget(2, '/api/company/logs/')
+        self.assertQueryBudget(1, lambda tenant: f'/api/company/logs/{WorkerLogs.objects.filter(worker=tenant.worker).first().id}/')
+
+    def test_sparse_logs(self):
+        self.authenticate(self.tenants[0].company)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/company/logs/?fields=id,type')
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'type'})
+        # Worker and its employer are joined only for the fields that show them
+        self.assertFalse(any('users_useraccount' in query['sql'] for query in queries))
+
+    def test_qualifications(self):
+        self.assertQueryBudget(1, '/api/company/qualification/')
+        self.assertQueryBudget(1, lambda tenant: f'/api/company/qualification/{tenant.qualifications[0].id}/')
+
+    def test_tasks(self):
+        self.assertQueryBudget(1, '/api/company/task/')
+        self.assertQueryBudget(1, lambda tenant: f'/api/company/task/{tenant.tasks[0].id}/')
+
+    def test_tasks_with_recommended_workers(self):
+        self.assertQueryBudget(4, '/api/company/task/?expand=recommended_workers')
+
+    def test_appointments(self):
+        self.assertQueryBudget(2, '/api/company/appointment/')
+        self.assertQueryBudget(2, lambda tenant: f'/api/company/appointment/{tenant.appointments[0].id}/')
+
+    def test_comments(self):
+        self.assertQueryBudget(1, '/api/company/comment-task/')
+        self.assertQueryBudget(1, lambda tenant: f'/api/company/comment-task/{WorkerTaskComment.objects.filter(user=tenant.company).first().id}/')
+
+    def test_task_recommendations(self):
+        self.assertQueryBudget(4, '/api/company/task-recommendation/')
+        self.assertQueryBudget(4, lambda tenant: f'/api/company/task-recommendation/{tenant.tasks[-1].id}/')
+
+    def test_worker_reports(self):
+        self.assertQueryBudget(3, '/api/company/worker-report/')
+        self.assertQueryBudget(3, '/api/company/worker-report/?days=30')
+        self.assertQueryBudget(3, lambda tenant: f'/api/company/worker-report/{tenant.workers[1].id}/')
+
+    def test_auto_appointment(self):
+        self.assertQueryBudget(7, '/api/company/auto-appointment/')
+
+    def test_votings(self):
+        self.assertQueryBudget(4, '/api/company/voting/')
+        self.assertQueryBudget(4, lambda tenant: f'/api/company/voting/{tenant.votings[0].id}/')
+        # Without the results neither tallies nor votes are read
+        self.assertQueryBudget(2, '/api/company/voting/?omit=voting_results')
+
+    def test_voting_results(self):
+        self.assertQueryBudget(4, '/api/company/voting-results/')
+        self.assertQueryBudget(4, lambda tenant: f'/api/company/voting-results/{tenant.votings[0].id}/')
+
+    def test_voting_results_votes(self):
+        tenant = self.tenants[0]
+        self.authenticate(tenant.company)
+        for voting in tenant.votings:
+            results = self.client.get(f'/api/company/voting-results/{voting.id}/').json()['voting_results']
+            self.assertEqual(set(results), {'winner', 'tasks_info'})
+            for task_info in results['tasks_info']:
+                self.assertEqual(len(task_info['votes']), len(tenant.workers))
+
+    def test_cached_lists(self):
+        for url in ('/api/company/worker-report/', '/api/company/worker-report/?days=30',
+                    '/api/company/task-recommendation/'):
+            tenant = self.tenants[-1]
+            self.authenticate(tenant.company)
+            first = self.client.get(url)
+            self.assertEqual(self.count_queries('get', url)[0], 0, url)
+            self.assertEqual(self.client.get(url).json(), first.json())
+
+
+class TaskImportTests(TenantTestCase):
+    def import_tasks(self, content):
+        self.authenticate(self.tenant.company)
+        file = SimpleUploadedFile('tasks.csv', content.encode(), content_type='text/csv')
+        return self.client.post('/api/company/task/import/', {'file': file}, format='multipart')
+
+    def test_import(self):
+        tenant = self.tenant
+        response = self.import_tasks(f'Title,Description,Estimate_hours,Difficulty\n'
+                                     f'Imported 1,Description,4,{tenant.qualifications[0].id}\n'
+                                     f'Imported 2,,2,senior\n')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json(), {'created': 2})
+        self.assertEqual(set(Task.objects.filter(company=tenant.company, title__startswith='Imported')
+                             .values_list('title', 'difficulty__name')),
+                         {('Imported 1', 'Junior'), ('Imported 2', 'Senior')})
+
+    def test_row_errors(self):
+        response = self.import_tasks('title,estimate_hours,difficulty\n'
+                                     'Valid,4,junior\n'
+                                     ',x,unknown\n'
+                                     'Valid too,2,senior\n'
+                                     'No hours,,junior\n')
+        self.assertEqual(response.status_code, 400)
+        rows = response.json()['rows']
+        # Validation errors render every value as a string, file row numbers included
+        self.assertEqual([row['row'] for row in rows], ['3', '5'])
+        self.assertEqual(set(rows[0]['errors']), {'title', 'estimate_hours', 'difficulty'})
+        self.assertEqual(set(rows[1]['errors']), {'estimate_hours'})
+        # Nothing is saved when any row is invalid
+        self.assertFalse(Task.objects.filter(title__startswith='Valid').exists())
+
+
+class WorkerImportTests(TenantTestCase):
+    def test_import_hashes_in_pool(self):
+        tenant = self.tenant
+        rows = [f'imported-{i},imported-{i}@example.com,Str0ng-pass-{i},Worker,{i},junior,40,09:00,18:00,1000'
+                for i in range(WorkerImportSerializer.parallel_hashing_threshold)]
+        content = 'username,email,password,first_name,last_name,qualification,working_hours,day_start,day_end,salary\n'
+        self.authenticate(tenant.company)
+        file = SimpleUploadedFile('workers.csv', (content + '\n'.join(rows)).encode(), content_type='text/csv')
+        response = self.client.post('/api/company/worker/import/', {'file': file}, format='multipart')
+        self.assertEqual(response.status_code, 201, response.content)
+
+        worker = Worker.objects.get(username='imported-3')
+        self.assertTrue(worker.check_password('Str0ng-pass-3'))
+        self.assertEqual(worker.employer_id, tenant.company.id)
+        # The pool stays for the following imports
+        self.assertIsNotNone(companies.serializers._password_hashing_pool)
+        self.assertIs(get_password_hashing_pool(), companies.serializers._password_hashing_pool)
+
+
+
+class CloseExpiredVotingsTests(TenantTestCase):
+    def test_only_expired_votings_are_closed(self):
+        active, closed = self.tenant.votings
+        expired = TaskVoting.objects.create(title='Expired', description='Description', company=self.tenant.company,
+                                            deadline=timezone.now() - datetime.timedelta(minutes=1),
+                                            max_score=active.max_score)
+        expired.voting_tasks.set(active.voting_tasks.all())
+        for vote in active.votes.all():
+            vote.pk = None
+            vote.voting = expired
+            vote.save()
+        results = expired.get_voting_results(with_votes=True)
+        closed_snapshot = TaskVoting.objects.get(id=closed.id).results_snapshot
+
+        with self.assertLogs('companies.scheduler', 'INFO'):
+            close_expired_votings()
+
+        expired.refresh_from_db()
+        self.assertFalse(expired.is_active)
+        self.assertIsNotNone(expired.closed_at)
+        self.assertEqual(expired.results_snapshot, results)
+        self.assertTrue(TaskVoting.objects.get(id=active.id).is_active)
+        closed.refresh_from_db()
+        self.assertFalse(closed.is_active)
+        self.assertEqual(closed.results_snapshot, closed_snapshot)
+
+class ReplicaRoutingTests(QueryBudgetTestCase):
+    def get_read_databases(self, method, url, data=None):
+        databases = []
+        db_for_read = ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            databases.append(db_for_read(router, model, **hints) or 'default')
+            return databases[-1]
+
+        with mock.patch.object(ReplicaRouter, 'db_for_read', record):
+            response = getattr(self.client, method)(url, data)
+        self.assertLess(response.status_code, 400)
+        return set(databases)
+
+    def test_reads_go_to_replica(self):
+        self.authenticate(self.tenants[0].company)
+        for url in ('/api/company/worker-report/', '/api/company/logs/', '/api/company/voting-results/'):
+            self.assertEqual(self.get_read_databases('get', url), {REPLICA_DATABASE}, url)
+
+    def test_other_views_read_default(self):
+        self.authenticate(self.tenants[0].company)
+        self.assertEqual(self.get_read_databases('get', '/api/company/task/'), {'default'})
+
+    def test_reads_after_write_go_to_default(self):
+        self.authenticate(self.tenants[0].company)
+        self.get_read_databases('post', '/api/company/qualification/', {'name': 'Lead', 'modifier': 3})
+        self.assertEqual(self.get_read_databases('get', '/api/company/logs/'), {'default'})
+
+        # Other users still read from the replica
+        self.authenticate(self.tenants[1].company)
+        self.assertEqual(self.get_read_databases('get', '/api/company/logs/'), {REPLICA_DATABASE})
@@ -1,24 +1,35 @@
+from django.db.models import Count, Exists, F, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from django.shortcuts import render
 from django_filters import DateFromToRangeFilter, DateTimeFromToRangeFilter, DateTimeFilter, IsoDateTimeFilter, \
     DateFilter
 from django_filters.rest_framework import DjangoFilterBackend, FilterSet
 
 from rest_framework import generics, viewsets, status, mixins, filters
+from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
-from django.views.decorators.vary import vary_on_cookie, vary_on_headers
 
 from companies.models import Company, Qualification, Task, TaskVoting
 from companies.serializers import CompanySerializer, WorkerSerializer, QualificationSerializer, TaskSerializer, \
-    TaskAppointmentSerializer, WorkerLogSerializer, TaskRecommendationSerializer, \
+    TaskAppointmentSerializer, TaskAppointmentListSerializer, WorkerLogSerializer, TaskRecommendationSerializer, \
     WorkerReportSerializer, AutoAppointmentSerializer, CompanyTaskCommentSerializer, WorkerScheduleSerializer, \
-    VotingSerializer, VotingResultSerializer
+    VotingSerializer, VotingResultSerializer, TaskImportSerializer, WorkerImportSerializer, get_report_start
 from companies.permission import IsCompany, IsCompanyWorker, IsCompanyOwner
-from workers.models import Worker, TaskAppointment, WorkerLogs, WorkerTaskComment, WorkerSchedule
+from config.views import CachedListMixin, ReplicaReadViewMixin, SparseFieldsetViewMixin
+from workers.models import Worker, TaskAppointment, WorkerLogs, WorkerTaskComment, WorkerSchedule, TaskVote
+
+
+def count_subquery(queryset, group_by):
+    """
+    Counts rows of the queryset filtered by OuterRef in a subquery, 0 when there are none.
+    """
+    counts = queryset.order_by().values(group_by).annotate(count=Count('id')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
 
 
 class CustomStandartPagination(PageNumberPagination):
@@ -32,20 +43,35 @@ class CompanySinUpView(mixins.CreateModelMixin, GenericViewSet):
     serializer_class = CompanySerializer
 
 
-class WorkerView(viewsets.ModelViewSet):
+class WorkerView(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Worker.objects.all()
     serializer_class = WorkerSerializer
     permission_classes = [IsAuthenticated, IsCompanyWorker, ]
     filter_backends = [filters.SearchFilter]
     search_fields = ['username', 'email', 'first_name', 'last_name']
+    select_related_fields = {
+        'worker_qualification_info': ['qualification'],
+        'worker_schedule': ['schedule'],
+    }
 
     def get_queryset(self):
         qs = super().get_queryset()
         return qs.filter(employer=self.request.user.id)
 
+    @action(detail=False, methods=['post'], url_path='import', serializer_class=WorkerImportSerializer,
+            parser_classes=[MultiPartParser, FormParser])
+    def import_workers(self, request, *args, **kwargs):
+        """
+        Onboards workers from uploaded CSV/XLSX file, responds with per-row errors if any row is invalid.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        workers = serializer.save()
+        return Response({'created': len(workers)}, status=status.HTTP_201_CREATED)
+
 
 class WorkerScheduleView(mixins.RetrieveModelMixin, mixins.UpdateModelMixin,  GenericViewSet):
-    queryset = WorkerSchedule.objects.all()
+    queryset = WorkerSchedule.objects.select_related('worker')
     serializer_class = WorkerScheduleSerializer
     permission_classes = [IsAuthenticated, IsCompanyOwner]
 
@@ -60,21 +86,63 @@ class QualificationView(viewsets.ModelViewSet):
         return qs.filter(company=self.request.user.id)
 
 
-class TaskView(viewsets.ModelViewSet):
+class TaskView(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticated, IsCompany, ]
+    select_related_fields = {
+        'task_difficulty_info': ['difficulty'],
+        'recommended_workers': ['difficulty'],
+    }
     # pagination_class = CustomStandartPagination
 
+    @action(detail=False, methods=['post'], url_path='import', serializer_class=TaskImportSerializer,
+            parser_classes=[MultiPartParser, FormParser])
+    def import_tasks(self, request, *args, **kwargs):
+        """
+        Creates tasks from uploaded CSV/XLSX file, responds with per-row errors if any row is invalid.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        tasks = serializer.save()
+        return Response({'created': len(tasks)}, status=status.HTTP_201_CREATED)
+
     def get_queryset(self):
         qs = super().get_queryset()
-        return qs.filter(company=self.request.user.id)
+        appointments = TaskAppointment.objects.filter(task_appointed=OuterRef('pk'))
+        return qs.filter(company=self.request.user.id).annotate(
+            is_done=Exists(appointments.filter(is_done=True)),
+            is_appointed=Exists(appointments),
+        )
 
 
-class TaskAppointmentView(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericViewSet):
+class TaskAppointmentView(SparseFieldsetViewMixin, mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                          mixins.ListModelMixin, GenericViewSet):
     queryset = TaskAppointment.objects.all()
     serializer_class = TaskAppointmentSerializer
     permission_classes = [IsAuthenticated, IsCompany, ]
+    select_related_fields = {
+        'task_info': ['task_appointed'],
+        'task_info.task_difficulty_info': ['task_appointed__difficulty'],
+        'worker_info': ['worker_appointed'],
+        'worker_info.worker_qualification_info': ['worker_appointed__qualification'],
+        'worker_info.worker_schedule': ['worker_appointed__schedule'],
+    }
+
+    def get_prefetch_related_fields(self):
+        return {
+            'comments': [Prefetch('comments', queryset=WorkerTaskComment.objects.select_related('user'))],
+        }
+
+    def get_serializer_class(self):
+        if self.action in ('list', 'retrieve'):
+            return TaskAppointmentListSerializer
+        return super().get_serializer_class()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['timezone'] = self.request.user.get_timezone()
+        return context
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -90,10 +158,16 @@ class LogFilter(FilterSet):
         fields = ['worker', 'type', 'datetime', 'date']
 
 
-class WorkerLogView(mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericViewSet):
+class WorkerLogView(ReplicaReadViewMixin, SparseFieldsetViewMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin,
+                    GenericViewSet):
     queryset = WorkerLogs.objects.all()
     serializer_class = WorkerLogSerializer
     permission_classes = [IsAuthenticated, IsCompany, ]
+    select_related_fields = {
+        'username': ['worker'],
+        'title': ['task'],
+        'localized_datetime': ['worker__employer'],
+    }
     filter_backends = [DjangoFilterBackend]
     filterset_class = LogFilter
     pagination_class = CustomStandartPagination
@@ -103,39 +177,65 @@ class WorkerLogView(mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericVie
         return qs.filter(task__company=self.request.user.id)
 
 
-class CompanyTaskCommentView(viewsets.ModelViewSet):
+class CompanyTaskCommentView(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = WorkerTaskComment.objects.all()
     serializer_class = CompanyTaskCommentSerializer
     permission_classes = [IsAuthenticated, IsCompany, ]
+    select_related_fields = {
+        'username': ['user'],
+    }
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['timezone'] = self.request.user.get_timezone()
+        return context
 
     def get_queryset(self):
         qs = super().get_queryset()
         return qs.filter(task_appointment__worker_appointed__employer=self.request.user.id)
 
 
-class TaskRecommendationView(mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericViewSet):
-    queryset = Task.objects.all()
+class TaskRecommendationView(CachedListMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericViewSet):
+    queryset = Task.objects.select_related('difficulty')
     serializer_class = TaskRecommendationSerializer
     permission_classes = [IsAuthenticated, IsCompany, ]
+    list_cache_timeout = 30
 
     def get_queryset(self):
         qs = super().get_queryset()
         return qs.filter(company=self.request.user.id, task_appointment=None)
 
 
-class WorkerReportView(mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericViewSet):
+class WorkerReportView(ReplicaReadViewMixin, CachedListMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin,
+                       GenericViewSet):
     queryset = Worker.objects.all()
     serializer_class = WorkerReportSerializer
     permission_classes = [IsAuthenticated, IsCompany, ]
-
-    @method_decorator(cache_page(60 * 2))
-    @method_decorator(vary_on_headers("Authorization", ))
-    def list(self, *args, **kwargs):
-        return super().list(*args, **kwargs)
+    list_cache_timeout = 60 * 2
 
     def get_queryset(self):
         qs = super().get_queryset()
-        return qs.filter(employer=self.request.user.id)
+        since = get_report_start(self.request)
+        worker_logs = WorkerLogs.objects.filter(worker=OuterRef('pk'))
+        done_appointments = TaskAppointment.objects.filter(is_done=True)
+        if since:
+            worker_logs = worker_logs.filter(datetime__gte=since)
+            done_appointments = done_appointments.filter(time_end__gte=since)
+
+        task_logs = WorkerLogs.objects.filter(task=OuterRef('task_appointed'), type='OC')
+        return qs.filter(employer=self.request.user.id).select_related('employer', 'schedule').annotate(
+            tasks_done=count_subquery(worker_logs.filter(type='TD'), 'worker'),
+            times_out_of_working_place=count_subquery(worker_logs.filter(type='OC'), 'worker'),
+            times_deadline_not_met=count_subquery(done_appointments.filter(worker_appointed=OuterRef('pk'),
+                                                                           deadline__gt=F('time_end')),
+                                                  'worker_appointed'),
+        ).prefetch_related(Prefetch(
+            'taskappointment_set',
+            queryset=done_appointments.select_related('task_appointed').annotate(
+                times_out_of_working_place=count_subquery(task_logs, 'task'),
+            ),
+            to_attr='done_appointments',
+        ))
 
 
 class AutoAppointmentView(generics.RetrieveAPIView):
@@ -148,21 +248,37 @@ class AutoAppointmentView(generics.RetrieveAPIView):
         return get_object_or_404(qs, id=self.request.user.id)
 
 
-class VotingView(viewsets.ModelViewSet):
+# Relations read by TaskVoting.get_voting_results of the listed votings, votes are listed in the results
+VOTING_RESULTS_PREFETCH = [
+    'voting_tasks',
+    Prefetch('tallies', to_attr='prefetched_tallies'),
+    Prefetch('votes', queryset=TaskVote.objects.select_related('worker'), to_attr='prefetched_votes'),
+]
+
+
+class VotingResultsViewMixin(SparseFieldsetViewMixin):
+    prefetch_related_fields = {
+        'voting_tasks': ['voting_tasks'],
+        'voting_results': VOTING_RESULTS_PREFETCH,
+    }
+
+
+class VotingView(VotingResultsViewMixin, viewsets.ModelViewSet):
     queryset = TaskVoting.objects.all()
     serializer_class = VotingSerializer
     permission_classes = [IsAuthenticated, IsCompany, ]
 
     def get_queryset(self):
         qs = super().get_queryset()
-        return qs.filter(company=self.request.user.company)
+        return qs.filter(company=self.request.user.company_id)
 
 
-class GetVotingResult(mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericViewSet):
+class GetVotingResult(ReplicaReadViewMixin, VotingResultsViewMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin,
+                      GenericViewSet):
     queryset = TaskVoting.objects.all()
     serializer_class = VotingResultSerializer
     permission_classes = [IsAuthenticated, IsCompany, ]
 
     def get_queryset(self):
         qs = super().get_queryset()
-        return qs.filter(company=self.request.user.company)
+        return qs.filter(company=self.request.user.company_id)
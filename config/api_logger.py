@@ -0,0 +1,293 @@
+"""
+Buffered replacement of drf_api_logger's middleware.
+
+Requests only put raw data of the call into a bounded in-memory queue. A background thread parses, masks
+and writes the entries into the drf_api_logger table with bulk_create, when API_LOGGER_BATCH_SIZE
+entries are collected or API_LOGGER_FLUSH_INTERVAL seconds pass. When the queue is full new entries are
+dropped and counted instead of slowing the requests down.
+
+Settings:
+    API_LOGGER_QUEUE_MAX_SIZE - maximum number of entries waiting for the write
+    API_LOGGER_BATCH_SIZE - maximum number of entries written by one insert
+    API_LOGGER_FLUSH_INTERVAL - seconds after which collected entries are written anyway
+    API_LOGGER_MAX_BODY_SIZE - request bodies larger than this number of bytes are not logged
+    API_LOGGER_SAMPLING - share of logged calls by path prefix, e.g. {'/api/iot/activity/': 0.01}
+
+drf_api_logger's own settings of the logged calls (DRF_API_LOGGER_PATH_TYPE, _SKIP_URL_NAME, _SKIP_NAMESPACE,
+_METHODS and _STATUS_CODES) are honored. The writer thread takes the name of drf_api_logger's one, so the library
+does not start its thread next to it. Nothing is logged and no thread is started while DRF_API_LOGGER_DATABASE is off,
+as it is under the test runner.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from drf_api_logger.utils import database_log_enabled, get_client_ip, get_headers, mask_sensitive_data
+
+logger = logging.getLogger(__name__)
+
+LOGGED_CONTENT_TYPES = ('application/json', 'application/vnd.api+json', 'application/gzip')
+
+# drf_api_logger starts its writer thread only when no thread of this name runs in the process
+WRITER_THREAD_NAME = 'insert_log_into_database'
+
+PATH_TYPES = ('ABSOLUTE', 'FULL_PATH', 'RAW_URI')
+
+
+def get_api(request, path_type):
+    """
+    Logged address of the call, like drf_api_logger builds it for DRF_API_LOGGER_PATH_TYPE.
+    """
+    if path_type == 'FULL_PATH':
+        return request.get_full_path()
+    if path_type == 'RAW_URI':
+        # HttpRequest.get_raw_uri() was removed in Django 4.0, the host is not validated like there
+        return f'{request.scheme}://{request._get_raw_host()}{request.get_full_path()}'
+    return request.build_absolute_uri()
+
+
+def get_sample_rate(path, sampling):
+    """
+    Returns sample rate of the longest matching path prefix, every call is logged by default.
+    """
+    rate = 1
+    matched = ''
+    for prefix, prefix_rate in sampling.items():
+        if path.startswith(prefix) and len(prefix) > len(matched):
+            matched, rate = prefix, prefix_rate
+    return rate
+
+
+def parse_json(content):
+    if not content:
+        return ''
+    try:
+        return json.loads(content)
+    except ValueError:
+        return ''
+
+
+class APILogBuffer:
+    """
+    Bounded queue of API log entries with the background thread writing them into the database.
+    """
+
+    def __init__(self, max_size=10000, batch_size=500, flush_interval=2):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        # Counters are updated by request threads and by the writer thread
+        self._counters_lock = threading.Lock()
+        self.counters = {"enqueued": 0, "dropped": 0, "written": 0, "failed": 0}
+        self._reported_drops = 0
+
+    def put(self, entry):
+        self.start()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self._count("dropped")
+        else:
+            self._count("enqueued")
+
+    def stats(self) -> dict:
+        with self._counters_lock:
+            counters = dict(self.counters)
+        return {**counters, "queued": self._queue.qsize()}
+
+    def flush(self):
+        """
+        Writes everything that is queued now, used on shutdown and in tests.
+        """
+        entries = []
+        while True:
+            try:
+                entries.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for start in range(0, len(entries), self.batch_size):
+            self._write(entries[start:start + self.batch_size])
+
+    def start(self):
+        """
+        Starts the writer thread in the current process, if it does not run yet and logging is enabled.
+        """
+        if not database_log_enabled():
+            return
+        # The thread does not survive fork of the worker processes, so it is started in every process
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name=WRITER_THREAD_NAME, daemon=True)
+                self._thread.start()
+
+    def _count(self, name, number=1):
+        with self._counters_lock:
+            self.counters[name] += number
+
+    def _run(self):
+        while True:
+            entries = self._collect()
+            if entries:
+                self._write(entries)
+
+    def _collect(self):
+        """
+        Waits for the next batch: batch_size entries, or the entries queued until flush_interval seconds pass.
+        """
+        entries = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(entries) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                entries.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return entries
+
+    def _write(self, entries):
+        from drf_api_logger.models import APILogsModel
+
+        close_old_connections()
+        try:
+            APILogsModel.objects.using(getattr(settings, 'DRF_API_LOGGER_DEFAULT_DATABASE', 'default')).bulk_create(
+                [APILogsModel(**self.build_record(entry)) for entry in entries]
+            )
+            self._count("written", len(entries))
+        except Exception:
+            self._count("failed", len(entries))
+            logger.exception("API logger failed to write %d entries", len(entries))
+        finally:
+            close_old_connections()
+        self._report_drops()
+
+    def _report_drops(self):
+        with self._counters_lock:
+            dropped = self.counters["dropped"] - self._reported_drops
+            self._reported_drops = self.counters["dropped"]
+        if dropped:
+            logger.warning("API logger queue is full, dropped %d entries", dropped)
+
+    @staticmethod
+    def build_record(entry):
+        if entry["content_type"] == 'application/gzip':
+            response = '** GZIP Archive **'
+        else:
+            response = mask_sensitive_data(parse_json(entry["response"]))
+        body = mask_sensitive_data(parse_json(entry["body"]))
+        return {
+            "api": mask_sensitive_data(entry["api"], mask_api_parameters=True),
+            "headers": json.dumps(mask_sensitive_data(entry["headers"]), indent=4, ensure_ascii=False),
+            "body": json.dumps(body, indent=4, ensure_ascii=False) if body else '',
+            "method": entry["method"],
+            "client_ip_address": entry["client_ip_address"],
+            "response": json.dumps(response, indent=4, ensure_ascii=False),
+            "status_code": entry["status_code"],
+            "execution_time": entry["execution_time"],
+            "added_on": entry["added_on"],
+        }
+
+
+api_log_buffer = APILogBuffer(max_size=getattr(settings, 'API_LOGGER_QUEUE_MAX_SIZE', 10000),
+                              batch_size=getattr(settings, 'API_LOGGER_BATCH_SIZE', 500),
+                              flush_interval=getattr(settings, 'API_LOGGER_FLUSH_INTERVAL', 2))
+atexit.register(api_log_buffer.flush)
+
+
+class BufferedAPILoggerMiddleware:
+    """
+    Logs API calls like drf_api_logger's middleware, but through api_log_buffer and with sampling.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.enabled = database_log_enabled()
+        if self.enabled:
+            # Started before the first request, so that drf_api_logger finds the thread and does not start its own
+            api_log_buffer.start()
+        path_type = getattr(settings, 'DRF_API_LOGGER_PATH_TYPE', 'ABSOLUTE')
+        self.path_type = path_type if path_type in PATH_TYPES else 'ABSOLUTE'
+        self.sampling = getattr(settings, 'API_LOGGER_SAMPLING', {})
+        self.max_body_size = getattr(settings, 'API_LOGGER_MAX_BODY_SIZE', 64 * 1024)
+        self.skip_url_names = getattr(settings, 'DRF_API_LOGGER_SKIP_URL_NAME', [])
+        self.skip_namespaces = ['admin', *getattr(settings, 'DRF_API_LOGGER_SKIP_NAMESPACE', [])]
+        self.methods = getattr(settings, 'DRF_API_LOGGER_METHODS', [])
+        self.status_codes = getattr(settings, 'DRF_API_LOGGER_STATUS_CODES', [])
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.is_logged(request):
+            return self.get_response(request)
+
+        start_time = time.time()
+        body = self.get_body(request)
+        response = self.get_response(request)
+        self.log(request, body, response, time.time() - start_time)
+        return response
+
+    async def __acall__(self, request):
+        if not self.is_logged(request):
+            return await self.get_response(request)
+
+        start_time = time.time()
+        body = self.get_body(request)
+        response = await self.get_response(request)
+        self.log(request, body, response, time.time() - start_time)
+        return response
+
+    def is_logged(self, request):
+        if not self.enabled or (self.methods and request.method not in self.methods):
+            return False
+        rate = get_sample_rate(request.path_info, self.sampling)
+        return rate >= 1 or random.random() < rate
+
+    def get_body(self, request):
+        if int(request.META.get('CONTENT_LENGTH') or 0) <= self.max_body_size:
+            return request.body
+        return b''
+
+    def log(self, request, body, response, execution_time):
+        resolver_match = request.resolver_match
+        if resolver_match and (resolver_match.namespace in self.skip_namespaces
+                               or resolver_match.url_name in self.skip_url_names):
+            return
+        if self.status_codes and response.status_code not in self.status_codes:
+            return
+        content_type = response.get('content-type')
+        if content_type not in LOGGED_CONTENT_TYPES or getattr(response, 'streaming', False):
+            return
+
+        api_log_buffer.put({
+            "api": get_api(request, self.path_type),
+            "headers": get_headers(request=request),
+            "body": body,
+            "method": request.method,
+            "client_ip_address": get_client_ip(request),
+            "response": response.content if content_type != 'application/gzip' else b'',
+            "content_type": content_type,
+            "status_code": response.status_code,
+            "execution_time": execution_time,
+            "added_on": timezone.now(),
+        })
@@ -0,0 +1,44 @@
+import time
+
+from django.core.cache import cache
+
+SINGLE_FLIGHT_LOCK_TIMEOUT = 30
+SINGLE_FLIGHT_WAIT_TIMEOUT = 5
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+
+
+def get_or_compute(key, compute, timeout, stale_timeout=None, lock_timeout=SINGLE_FLIGHT_LOCK_TIMEOUT,
+                   wait_timeout=SINGLE_FLIGHT_WAIT_TIMEOUT):
+    """
+    Returns cached value of the key, or computes and caches it, so that only one process recomputes an entry at a time.
+
+    The entry is kept for `stale_timeout` seconds after it expires. While one process recomputes an expired entry
+    under a lock, the others get the stale value, or wait up to `wait_timeout` seconds for the new one if there is none.
+    The lock expires after `lock_timeout` seconds in case the process holding it dies.
+    """
+    if stale_timeout is None:
+        stale_timeout = timeout
+    entry = cache.get(key)
+    if entry is not None and entry[1] > time.time():
+        return entry[0]
+
+    lock_key = f'{key}:lock'
+    locked = cache.add(lock_key, 1, lock_timeout)
+    if not locked:
+        if entry is not None:
+            return entry[0]
+        deadline = time.monotonic() + wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[0]
+        # The process holding the lock takes too long, compute the value without it
+
+    try:
+        value = compute()
+        cache.set(key, (value, time.time() + timeout), timeout + stale_timeout)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value
@@ -0,0 +1,111 @@
+import contextlib
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA_DATABASE = 'replica'
+
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+
+def is_replica_configured():
+    return REPLICA_DATABASE in settings.DATABASES
+
+
+def start_replica_reads():
+    """
+    Sends following reads of the current context to the replica database, if there is one.
+    Returns token for stop_replica_reads.
+    """
+    return _read_from_replica.set(is_replica_configured())
+
+
+def stop_replica_reads(token):
+    _read_from_replica.reset(token)
+
+
+@contextlib.contextmanager
+def read_from_replica():
+    """
+    Sends reads of the block to the replica database, or to the default one if there is no replica.
+    """
+    token = start_replica_reads()
+    try:
+        yield
+    finally:
+        stop_replica_reads(token)
+
+
+class ReplicaRouter:
+    """
+    Reads go to the replica only inside read_from_replica(), everything else goes to the default database.
+    Objects read from the replica are saved to the default database as well. The replica is a copy of
+    the default database kept by the database server, so it is never migrated.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _read_from_replica.get():
+            return REPLICA_DATABASE
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_DATABASE
+
+
+def get_sticky_cache_key(user_id):
+    return f'db-sticky:{user_id}'
+
+
+def mark_sticky(user_id):
+    """
+    Sends reads of the user to the default database for a while, until the replica catches up with their writes.
+    """
+    cache.set(get_sticky_cache_key(user_id), 1, settings.DATABASE_REPLICA_STICKY_SECONDS)
+
+
+def is_sticky(user_id):
+    return cache.get(get_sticky_cache_key(user_id)) is not None
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Makes reads of a user that has just changed something go to the default database, so they see their own writes.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if is_replica_configured() and request.method not in SAFE_METHODS:
+            self.mark_writer(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if is_replica_configured() and request.method not in SAFE_METHODS:
+            # User of the session is loaded from the database lazily
+            await sync_to_async(self.mark_writer)(request, response)
+        return response
+
+    def mark_writer(self, request, response):
+        if response.status_code < 400:
+            # DRF sets the authenticated user on the request, while authenticating in the view
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                mark_sticky(user.id)
@@ -0,0 +1,226 @@
+"""
+Per-route request metrics in Prometheus text format.
+
+MetricsMiddleware records latency, number and time of DB queries and response size of every request,
+labelled by the resolved route and the method. Metrics are aggregated in the process. When
+METRICS_MULTIPROCESS_DIR is set, every process also dumps its metrics into its own file in that
+directory at most every METRICS_FLUSH_INTERVAL seconds and /metrics/ sums the files of all processes.
+The directory should be emptied when the application is deployed.
+"""
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+HISTOGRAMS = {
+    "http_request_duration_seconds": ("Request latency in seconds", LATENCY_BUCKETS),
+    "http_request_db_queries": ("Number of DB queries made by the request", QUERY_COUNT_BUCKETS),
+}
+COUNTERS = {
+    "http_request_db_query_seconds_total": "Time spent in DB queries in seconds",
+    "http_response_size_bytes_total": "Size of response bodies in bytes",
+}
+
+
+def format_labels(item):
+    route = item["route"].replace('\\', '\\\\').replace('"', '\\"')
+    return f'route="{route}",method="{item["method"]}"'
+
+
+def get_route(request):
+    """
+    Returns the url pattern of the request, e.g. "api/company/task/<pk>/", with regex syntax of the routers removed.
+    """
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match is None:
+        return 'unmatched'
+    route = re.sub(r'\(\?P<(\w+)>[^)]*\)', r'<\1>', resolver_match.route)
+    return route.replace('^', '').replace('$', '').replace('\\.', '.')
+
+
+class MetricsRegistry:
+    """
+    In-process aggregate of request metrics by (route, method).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._dumped_at = 0
+        self._file_name = f'metrics-{os.getpid()}-{uuid.uuid4().hex}.json'
+
+    def observe(self, route, method, duration, queries, query_time, response_size):
+        key = f'{route} {method}'
+        with self._lock:
+            metrics = self._metrics.get(key)
+            if metrics is None:
+                metrics = self._metrics[key] = {
+                    "route": route,
+                    "method": method,
+                    "histograms": {name: {"buckets": [0] * len(buckets), "count": 0, "sum": 0}
+                                   for name, (_, buckets) in HISTOGRAMS.items()},
+                    "counters": dict.fromkeys(COUNTERS, 0),
+                }
+            self._observe_histogram(metrics, "http_request_duration_seconds", duration)
+            self._observe_histogram(metrics, "http_request_db_queries", queries)
+            metrics["counters"]["http_request_db_query_seconds_total"] += query_time
+            metrics["counters"]["http_response_size_bytes_total"] += response_size
+
+        self.dump()
+
+    @staticmethod
+    def _observe_histogram(metrics, name, value):
+        histogram = metrics["histograms"][name]
+        for i, bound in enumerate(HISTOGRAMS[name][1]):
+            if value <= bound:
+                histogram["buckets"][i] += 1
+        histogram["count"] += 1
+        histogram["sum"] += value
+
+    def snapshot(self):
+        with self._lock:
+            return json.loads(json.dumps(self._metrics))
+
+    def dump(self, force=False):
+        directory = getattr(settings, 'METRICS_MULTIPROCESS_DIR', None)
+        if not directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._dumped_at < getattr(settings, 'METRICS_FLUSH_INTERVAL', 1):
+            return
+        self._dumped_at = now
+
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self._file_name)
+        with open(f'{path}.tmp', 'w') as file:
+            json.dump(self.snapshot(), file)
+        os.replace(f'{path}.tmp', path)
+
+    def collect(self):
+        """
+        Returns metrics of this process, or of all processes in multiprocess mode.
+        """
+        directory = getattr(settings, 'METRICS_MULTIPROCESS_DIR', None)
+        if not directory:
+            return self.snapshot()
+
+        self.dump(force=True)
+        result = {}
+        for file_name in os.listdir(directory):
+            if not file_name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(directory, file_name)) as file:
+                    process_metrics = json.load(file)
+            except (OSError, ValueError):
+                continue
+            for key, metrics in process_metrics.items():
+                if key not in result:
+                    result[key] = metrics
+                    continue
+                for name, histogram in metrics["histograms"].items():
+                    merged = result[key]["histograms"][name]
+                    merged["buckets"] = [a + b for a, b in zip(merged["buckets"], histogram["buckets"])]
+                    merged["count"] += histogram["count"]
+                    merged["sum"] += histogram["sum"]
+                for name, value in metrics["counters"].items():
+                    result[key]["counters"][name] += value
+        return result
+
+    def render(self) -> str:
+        """
+        Renders collected metrics in Prometheus text exposition format.
+        """
+        metrics = sorted(self.collect().values(), key=lambda item: (item["route"], item["method"]))
+        lines = []
+        for name, (description, buckets) in HISTOGRAMS.items():
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+            for item in metrics:
+                labels = format_labels(item)
+                histogram = item["histograms"][name]
+                for bound, count in zip(buckets, histogram["buckets"]):
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram["count"]}')
+                lines.append(f'{name}_sum{{{labels}}} {histogram["sum"]}')
+                lines.append(f'{name}_count{{{labels}}} {histogram["count"]}')
+        for name, description in COUNTERS.items():
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+            for item in metrics:
+                labels = format_labels(item)
+                lines.append(f'{name}{{{labels}}} {item["counters"][name]}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.time = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.time += time.perf_counter() - started
+
+
+def count_queries(stack, query_counter):
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(query_counter))
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        query_counter = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            count_queries(stack, query_counter)
+            response = self.get_response(request)
+        self.observe(request, response, time.perf_counter() - started, query_counter)
+        return response
+
+    async def __acall__(self, request):
+        query_counter = QueryCounter()
+        started = time.perf_counter()
+        # Async views query the database in the thread of sync_to_async, so its connections are wrapped there
+        stack = ExitStack()
+        await sync_to_async(count_queries)(stack, query_counter)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.observe(request, response, time.perf_counter() - started, query_counter)
+        return response
+
+    def observe(self, request, response, duration, query_counter):
+        if getattr(response, 'streaming', False):
+            response_size = 0
+        else:
+            response_size = len(response.content)
+        registry.observe(get_route(request), request.method, duration,
+                         query_counter.count, query_counter.time, response_size)
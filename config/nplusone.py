@@ -0,0 +1,101 @@
+"""
+Development detector of N+1 queries.
+
+NPlusOneDetectorMiddleware records every DB query of the request together with the serializer field that made
+it, found on the call stack. The same query repeated NPLUSONE_THRESHOLD or more times by one field is logged
+as a warning of the config.nplusone logger with the field path, e.g. "TaskAppointmentSerializer: comments.username", so it is clear which field needs
+select_related/prefetch_related or an annotation. Walking the stack is slow, enable it with NPLUSONE_DETECTOR
+in development only.
+"""
+import logging
+import sys
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.fields import Field
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def get_field_label(field):
+    """
+    Returns "<RootSerializer>: <field path>" of the serializer field.
+    """
+    path = []
+    node = field
+    while node.parent is not None:
+        # child of ListSerializer is bound with empty field name
+        if node.field_name:
+            path.append(node.field_name)
+        node = node.parent
+    if isinstance(node, ListSerializer):
+        node = node.child
+    if not path:
+        return type(node).__name__
+    return f'{type(node).__name__}: {".".join(reversed(path))}'
+
+
+def get_querying_field(frame):
+    """
+    Finds the serializer field that runs the code of the frame: the innermost field that is not a serializer
+    (SerializerMethodField calls get_<name> of its serializer), or the innermost serializer.
+    """
+    serializer = None
+    while frame is not None:
+        obj = frame.f_locals.get('self')
+        if isinstance(obj, Field):
+            if not isinstance(obj, BaseSerializer):
+                return obj
+            if serializer is None:
+                serializer = obj
+        frame = frame.f_back
+    return serializer
+
+
+class QueryRecorder:
+    """
+    Execute wrapper collecting (sql, serializer field label) of the queries.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        field = get_querying_field(sys._getframe(1))
+        self.queries.append((sql, get_field_label(field) if field is not None else None))
+        return execute(sql, params, many, context)
+
+    def get_repeated_queries(self, threshold):
+        """
+        Returns [(label, sql, count)] of the queries made `threshold` or more times by the same field.
+        """
+        counts = Counter(self.queries)
+        return [(label, sql, count) for (sql, label), count in counts.most_common() if count >= threshold]
+
+    def format_repeated_queries(self, threshold):
+        return '\n'.join(f'{count} x {label or "outside of serializers"}: {sql}'
+                         for label, sql, count in self.get_repeated_queries(threshold))
+
+
+class NPlusOneDetectorMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'NPLUSONE_DETECTOR', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'NPLUSONE_THRESHOLD', 3)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        report = recorder.format_repeated_queries(self.threshold)
+        if report:
+            logger.warning("Possible N+1 queries in %s %s:\n%s", request.method, request.path, report)
+        return response
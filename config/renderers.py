@@ -0,0 +1,30 @@
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Dates and times are formatted by DRF's encoder, orjson recomputes offsets of pytz datetimes that are not normalized
+ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Renders the same JSON as DRF's JSONRenderer with orjson, several times faster on large responses.
+    Dates and types orjson does not know, such as Decimal, lazy translation strings and querysets, are
+    converted by DRF's encoder. Falls back to the stdlib renderer when orjson is not installed or
+    indentation is requested, e.g. by the browsable API.
+    """
+    encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self.encoder.default, option=ORJSON_OPTIONS)
+        # Escaped like DRF does, so the output stays a strict javascript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,84 @@
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+EXPAND_PARAM = 'expand'
+
+
+def parse_field_paths(value):
+    """
+    Parses "id,task_info.title" into [('id',), ('task_info', 'title')].
+    """
+    return [tuple(path.split('.')) for path in value.split(',') if path.strip()]
+
+
+def get_field_paths(request):
+    """
+    Returns requested and omitted field paths of the read request, or None when the response is not sparse.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    query_params = getattr(request, 'query_params', request.GET)
+    fields = parse_field_paths(query_params.get(FIELDS_PARAM, ''))
+    omit = parse_field_paths(query_params.get(OMIT_PARAM, ''))
+    if not fields and not omit:
+        return None
+    return fields, omit
+
+
+def get_expand(request):
+    """
+    Returns names of the optional parts of the response requested with ?expand=a,b.
+    """
+    if request is None:
+        return set()
+    query_params = getattr(request, 'query_params', request.GET)
+    return {name.strip() for name in query_params.get(EXPAND_PARAM, '').split(',') if name.strip()}
+
+
+def is_field_included(field_paths, path):
+    """
+    Checks whether the field on the `path` (tuple of field names from the root serializer) is rendered.
+    A level of nesting is restricted by ?fields= only when some of the requested paths go below it,
+    so ?fields=task_info returns the whole nested object and ?fields=task_info.title only its title.
+    """
+    if field_paths is None:
+        return True
+    fields, omit = field_paths
+
+    for depth in range(len(path)):
+        prefix = path[:depth]
+        selected = {field[depth] for field in fields if len(field) > depth and field[:depth] == prefix}
+        if selected and path[depth] not in selected:
+            return False
+
+    return not any(path[:len(field)] == field for field in omit)
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin for ?fields=a,b.c and ?omit=a,b.c query parameters of read requests.
+    Excluded fields are removed before serialization, so their methods and nested serializers never run.
+    """
+
+    def get_field_path(self):
+        path = []
+        node = self
+        while node.parent is not None:
+            # child of ListSerializer is bound with empty field name
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+        return tuple(reversed(path))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        field_paths = get_field_paths(self.context.get('request'))
+        if field_paths is None:
+            return fields
+
+        path = self.get_field_path()
+        for field_name in list(fields):
+            if not is_field_included(field_paths, path + (field_name,)):
+                fields.pop(field_name)
+        return fields
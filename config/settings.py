@@ -15,6 +15,7 @@ from dotenv import load_dotenv, find_dotenv
 from datetime import timedelta
 from django.utils.translation import gettext_lazy as _
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -63,6 +64,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.metrics.MetricsMiddleware',
+    'config.nplusone.NPlusOneDetectorMiddleware',
+    'config.db_router.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -73,17 +77,39 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django.middleware.locale.LocaleMiddleware',
 
-    'drf_api_logger.middleware.api_logger_middleware.APILoggerMiddleware',
+    'config.api_logger.BufferedAPILoggerMiddleware',
 ]
 
 
-DRF_API_LOGGER_DATABASE = True
+# Not under the test runner, the writer thread would write outside of the test transactions
+DRF_API_LOGGER_DATABASE = sys.argv[1:2] != ['test']
 
-DRF_LOGGER_QUEUE_MAX_SIZE = 1
+DRF_API_LOGGER_PATH_TYPE = 'ABSOLUTE'
 
-DRF_LOGGER_INTERVAL = 1
+# Buffered API logging, see config/api_logger.py
+API_LOGGER_QUEUE_MAX_SIZE = 10000
 
-DRF_API_LOGGER_PATH_TYPE = 'ABSOLUTE'
+API_LOGGER_BATCH_SIZE = 500
+
+API_LOGGER_FLUSH_INTERVAL = 2
+
+API_LOGGER_SAMPLING = {
+    '/api/iot/activity/': 0.01,
+}
+
+# Processes hashing passwords of bulk worker imports, see companies/serializers.py
+PASSWORD_HASHING_WORKERS = int(os.getenv('PASSWORD_HASHING_WORKERS', min(4, os.cpu_count() or 1)))
+
+# Request metrics exposed at /metrics/, see config/metrics.py.
+# Set the directory when the app runs in several processes, so /metrics/ reports all of them.
+METRICS_MULTIPROCESS_DIR = os.getenv('METRICS_MULTIPROCESS_DIR')
+
+METRICS_FLUSH_INTERVAL = 1
+
+# Logs queries repeated by a serializer field, see config/nplusone.py. Development only, it slows requests down.
+NPLUSONE_DETECTOR = DEBUG and os.getenv('NPLUSONE_DETECTOR') == 'True'
+
+NPLUSONE_THRESHOLD = 3
 
 X_FRAME_OPTIONS = 'SAMEORIGIN'
 
@@ -124,23 +150,55 @@ DATABASES = {
     }
 }
 
+# Local SQLite database, e.g. for benchmarks with seed_benchmark and benchmark_endpoints
+if os.getenv('DB_ENGINE') == 'sqlite':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    }
+
+# Read replica of the default database, used by the report, log and voting results views, see config.db_router
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'HOST': os.getenv('DB_REPLICA_HOST', DATABASES['default'].get('HOST', '')),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default'].get('PORT', '')),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# The test runner adds the replica as a second connection to the test database, so the routing is always tested
+if sys.argv[1:2] == ['test'] and 'replica' not in DATABASES:
+    DATABASES['replica'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['config.db_router.ReplicaRouter']
+# Seconds the reads of a user go to the default database after their write, longer than the replication lag
+DATABASE_REPLICA_STICKY_SECONDS = 5
+
+# Cache shared by all processes and nodes: CACHE_BACKEND=memcached or redis with CACHE_LOCATION,
+# locmem for tests and a single process, the file based cache of this node by default
+CACHE_BACKENDS = {
+    "memcached": ("django.core.cache.backends.memcached.PyMemcacheCache", "127.0.0.1:11211"),
+    "redis": ("django.core.cache.backends.redis.RedisCache", "redis://127.0.0.1:6379"),
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "workeronline"),
+    "file": ("django.core.cache.backends.filebased.FileBasedCache", os.path.join(BASE_DIR, "workeronline_cache")),
+}
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[os.getenv('CACHE_BACKEND', 'file')]
+CACHE_LOCATION = os.getenv('CACHE_LOCATION', CACHE_LOCATION)
+
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
-        "LOCATION": os.path.join(BASE_DIR, "workeronline_cache"),
+        "BACKEND": CACHE_BACKEND,
+        # Several memcached servers or Redis replicas are separated by commas
+        "LOCATION": CACHE_LOCATION.split(',') if ',' in CACHE_LOCATION else CACHE_LOCATION,
     }
 }
+if os.getenv('CACHE_BACKEND') == 'memcached':
+    CACHES["default"]["OPTIONS"] = {"no_delay": True, "use_pooling": True}
 
 DBBACKUP_STORAGE = 'django.core.files.storage.FileSystemStorage'
 DBBACKUP_STORAGE_OPTIONS = {'location':  os.path.join(BASE_DIR, "backups")}
 
-# CACHES = {
-#     "default": {
-#         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-#         "LOCATION": "unique-snowflake",
-#     }
-# }
-
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -162,12 +220,21 @@ AUTH_PASSWORD_VALIDATORS = [
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.TokenAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedBasicAuthentication',
+        'users.authentication.PrincipalJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'config.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'config.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 AUTH_USER_MODEL = 'users.UserAccount'
@@ -379,8 +446,8 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_LIFETIME": timedelta(minutes=5),
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(days=1),
 
-    "TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainPairSerializer",
-    "TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSerializer",
+    "TOKEN_OBTAIN_SERIALIZER": "users.serializers.UserTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "users.serializers.UserTokenRefreshSerializer",
     "TOKEN_VERIFY_SERIALIZER": "rest_framework_simplejwt.serializers.TokenVerifySerializer",
     "TOKEN_BLACKLIST_SERIALIZER": "rest_framework_simplejwt.serializers.TokenBlacklistSerializer",
     "SLIDING_TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainSlidingSerializer",
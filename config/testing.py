@@ -0,0 +1,164 @@
+"""
+Test helpers: realistic tenant data, a test case with a seeded tenant and query budget assertions for the API endpoints.
+"""
+import datetime
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from companies.models import Company, Qualification, Task, TaskVoting
+from config.db_router import REPLICA_DATABASE, is_replica_configured
+from config.nplusone import QueryRecorder
+from iot.models import Supervisor, Offer
+from users.authentication import get_token_version
+from users.models import TechSupportRequest
+from users.serializers import UserTokenObtainPairSerializer
+from workers.models import Worker, TaskAppointment, WorkerLogs, WorkerTaskComment, TaskVote
+
+
+def seed_tenant(prefix, size):
+    """
+    Creates a company with `size` workers and everything they work with: tasks, appointments (half of them done),
+    logs, comments, an active and a closed voting with votes of every worker, supervisors, offers and support requests.
+    """
+    now = timezone.now()
+    company = Company.objects.create(username=f'{prefix}-company', email=f'{prefix}-company@example.com', role='C',
+                                     name=f'{prefix} company', timezone='Europe/Kyiv')
+    qualifications = [
+        Qualification.objects.create(name='Junior', modifier=1, company=company),
+        Qualification.objects.create(name='Senior', modifier=2, company=company),
+    ]
+    workers = [
+        Worker.objects.create(username=f'{prefix}-worker-{i}', email=f'{prefix}-worker-{i}@example.com', role='W',
+                              first_name='Worker', last_name=str(i), working_hours=40,
+                              day_start=datetime.time(9), day_end=datetime.time(18),
+                              employer=company, qualification=qualifications[i % 2])
+        for i in range(size)
+    ]
+    tasks = [
+        Task.objects.create(title=f'Task {i}', description='Description', estimate_hours=4 + i % 3,
+                            difficulty=qualifications[i % 2], company=company)
+        for i in range(size * 2)
+    ]
+
+    appointments = []
+    for i, worker in enumerate(workers):
+        appointment = TaskAppointment.objects.create(task_appointed=tasks[i], worker_appointed=worker,
+                                                     deadline=now + datetime.timedelta(days=2))
+        if i % 2:
+            appointment.is_done = True
+            appointment.time_end = now + datetime.timedelta(hours=i)
+            appointment.save()
+        appointments.append(appointment)
+        WorkerTaskComment.objects.create(text='Question', task_appointment=appointment, user=worker)
+        WorkerTaskComment.objects.create(text='Answer', task_appointment=appointment, user=company)
+        WorkerLogs.objects.create(task=tasks[i], worker=worker, type='OC', description='Out of working place')
+
+    # Tasks that are not appointed are recommended and voted for
+    voting_tasks = tasks[size:]
+    votings = []
+    for is_active in (True, False):
+        voting = TaskVoting.objects.create(title='Voting', description='Description', company=company,
+                                           deadline=now + datetime.timedelta(days=1), max_score=len(voting_tasks))
+        voting.voting_tasks.set(voting_tasks)
+        for worker in workers:
+            for score, task in enumerate(voting_tasks, start=1):
+                TaskVote.objects.create(task=task, score=score, voting=voting, worker=worker)
+        if not is_active:
+            voting.close()
+        votings.append(voting)
+
+    supervisors = [
+        Supervisor.objects.create(serial_number=f'{prefix}-{i}', company=company, worker=worker, last_active=now)
+        for i, worker in enumerate(workers)
+    ]
+    offers = [Offer.objects.create(company=company, address_of_delivery='Address') for _ in range(size)]
+    for user in (company, workers[0]):
+        for _ in range(size):
+            TechSupportRequest.objects.create(title='Request', description='Description', user=user)
+
+    return SimpleNamespace(company=company, qualifications=qualifications, workers=workers, worker=workers[0],
+                           tasks=tasks, appointments=appointments, votings=votings, supervisors=supervisors,
+                           offers=offers)
+
+
+class TenantTestCase(APITestCase):
+    """
+    API tests against a tenant made by seed_tenant, available as `tenant`.
+    """
+    databases = '__all__'
+    tenant_size = 2
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Test data is not committed, so reads routed to the replica have to use the connection of the default database
+        if is_replica_configured():
+            cls.replica_connection = connections[REPLICA_DATABASE]
+            connections[REPLICA_DATABASE] = connections['default']
+
+    @classmethod
+    def tearDownClass(cls):
+        if is_replica_configured():
+            connections[REPLICA_DATABASE] = cls.replica_connection
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = seed_tenant('tenant', cls.tenant_size)
+
+    def setUp(self):
+        # Responses cached by earlier tests would not make any queries
+        cache.clear()
+
+    def authenticate(self, user):
+        token = UserTokenObtainPairSerializer.get_token(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        # The version is read once and then cached, query budgets are of the requests that follow
+        get_token_version(user.id)
+
+
+class QueryBudgetTestCase(TenantTestCase):
+    """
+    Runs every checked request against tenants of `data_sizes` and fails when it makes more queries than its
+    budget, or more queries for the bigger tenant than for the smaller one, i.e. the count grows with the data.
+    """
+    data_sizes = (2, 6)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenants = [seed_tenant(f'size-{size}', size) for size in cls.data_sizes]
+
+    def count_queries(self, method, url, data=None, **extra):
+        recorder = QueryRecorder()
+        with CaptureQueriesContext(connection) as queries, connection.execute_wrapper(recorder):
+            response = getattr(self.client, method)(url, data, **extra)
+        self.assertLess(response.status_code, 400, f'{method.upper()} {url}: {response.content[:500]}')
+        return len(queries), recorder
+
+    def assertQueryBudget(self, budget, url, user='company', method='get', data=None, **extra):
+        """
+        :param budget: maximum number of queries of the request
+        :param url: url or function returning the url for the tenant
+        :param user: attribute of the tenant authenticated for the request, None to send no token
+        """
+        counts = []
+        for size, tenant in zip(self.data_sizes, self.tenants):
+            tenant_url = url(tenant) if callable(url) else url
+            self.client.credentials()
+            if user:
+                self.authenticate(getattr(tenant, user))
+            count, recorder = self.count_queries(method, tenant_url, data, **extra)
+            self.assertLessEqual(count, budget, f'{method.upper()} {tenant_url} made {count} queries with '
+                                                f'{size} workers, budget is {budget}:\n'
+                                                f'{recorder.format_repeated_queries(2)}')
+            counts.append((size, count, recorder))
+
+        (small_size, small_count, _), (big_size, big_count, recorder) = counts[0], counts[-1]
+        self.assertLessEqual(big_count, small_count, f'{method.upper()} {url} made {small_count} queries with '
+                                                     f'{small_size} workers and {big_count} with {big_size}:\n'
+                                                     f'{recorder.format_repeated_queries(2)}')
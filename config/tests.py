@@ -0,0 +1,292 @@
+import datetime
+import importlib
+import io
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from decimal import Decimal
+from unittest import mock
+
+import pytz
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from config.api_logger import APILogBuffer, get_api
+from config.cache import get_or_compute
+from config.metrics import LATENCY_BUCKETS, MetricsRegistry, registry
+from config.nplusone import NPlusOneDetectorMiddleware
+from config.parsers import ORJSONParser
+from config.testing import TenantTestCase
+from config.renderers import ORJSONRenderer
+from users.models import UserAccount
+
+
+class GetOrComputeTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self, value='value', delay=0):
+        def compute():
+            self.calls += 1
+            time.sleep(delay)
+            return value
+        return compute
+
+    def test_fresh_value_is_not_recomputed(self):
+        self.assertEqual(get_or_compute('key', self.compute(), 60), 'value')
+        self.assertEqual(get_or_compute('key', self.compute('new'), 60), 'value')
+        self.assertEqual(self.calls, 1)
+
+    def test_expired_value_is_recomputed(self):
+        get_or_compute('key', self.compute(), 0.01)
+        time.sleep(0.02)
+        self.assertEqual(get_or_compute('key', self.compute('new'), 60), 'new')
+        self.assertEqual(self.calls, 2)
+
+    def test_stale_value_is_returned_while_recomputed(self):
+        get_or_compute('key', self.compute(), 0.01, stale_timeout=60)
+        time.sleep(0.02)
+        cache.add('key:lock', 1)
+        self.assertEqual(get_or_compute('key', self.compute('new'), 60), 'value')
+        self.assertEqual(self.calls, 1)
+
+    def test_concurrent_misses_compute_once(self):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(get_or_compute('key', self.compute(delay=0.2), 60)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['value'] * 5)
+        self.assertEqual(self.calls, 1)
+
+    def test_value_is_computed_when_lock_is_held_too_long(self):
+        cache.add('key:lock', 1)
+        self.assertEqual(get_or_compute('key', self.compute(), 60, wait_timeout=0.1), 'value')
+        self.assertEqual(self.calls, 1)
+        self.assertIsNotNone(cache.get('key:lock'))
+
+
+class ORJSONTests(SimpleTestCase):
+    data = {
+        "decimal": Decimal('1.50'),
+        "datetime": datetime.datetime(2026, 1, 1, 12, 30, tzinfo=datetime.timezone.utc),
+        "local_datetime": pytz.timezone('Europe/Kyiv').localize(datetime.datetime(2026, 1, 1, 1, 2, 3, 5)),
+        # Summer time offset kept after the arithmetic over the change, like deadlines of recommended workers
+        "shifted_datetime": pytz.timezone('Europe/London').localize(datetime.datetime(2026, 10, 24, 12))
+        + datetime.timedelta(days=2),
+        "date": datetime.date(2026, 1, 2),
+        "time": datetime.time(9, 30),
+        "duration": datetime.timedelta(hours=1),
+        "uuid": uuid.UUID(int=1),
+        "lazy": _('Not found.'),
+        "text": 'Привіт \u2028',
+        "nested": [{1: None, "flag": True, "float": 0.1}],
+    }
+
+    def test_renders_like_drf(self):
+        self.assertEqual(ORJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_indent_falls_back_to_drf(self):
+        self.assertEqual(ORJSONRenderer().render(self.data, 'application/json; indent=4'),
+                         JSONRenderer().render(self.data, 'application/json; indent=4'))
+
+    def test_parses_like_drf(self):
+        body = JSONRenderer().render(self.data)
+        self.assertEqual(ORJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+
+    def test_invalid_json(self):
+        for body in (b'{', b'NaN', b'\xff'):
+            with self.assertRaises(ParseError):
+                ORJSONParser().parse(io.BytesIO(body))
+
+
+class APILoggerTests(SimpleTestCase):
+    def test_path_type(self):
+        request = RequestFactory().get('/api/company/logs/?page=2')
+        self.assertEqual(get_api(request, 'ABSOLUTE'), 'http://testserver/api/company/logs/?page=2')
+        self.assertEqual(get_api(request, 'FULL_PATH'), '/api/company/logs/?page=2')
+        self.assertEqual(get_api(request, 'RAW_URI'), 'http://testserver/api/company/logs/?page=2')
+
+    def test_thread_is_not_started_under_tests(self):
+        buffer = APILogBuffer()
+        buffer.put({})
+        self.assertIsNone(buffer._thread)
+
+    def test_counters_of_concurrent_puts(self):
+        buffer = APILogBuffer(max_size=100)
+
+        def put():
+            for _ in range(1000):
+                buffer.put({})
+
+        threads = [threading.Thread(target=put) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(buffer.stats(), {'enqueued': 100, 'dropped': 7900, 'written': 0, 'failed': 0, 'queued': 100})
+
+    def test_batch_size_and_interval(self):
+        buffer = APILogBuffer(batch_size=3, flush_interval=0.05)
+        for i in range(4):
+            buffer.put(i)
+
+        started = time.monotonic()
+        self.assertEqual(buffer._collect(), [0, 1, 2])
+        self.assertLess(time.monotonic() - started, 0.05)
+        # The rest is written when the interval passes
+        self.assertEqual(buffer._collect(), [3])
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        self.assertEqual(buffer._collect(), [])
+
+    def test_flush_in_batches(self):
+        buffer = APILogBuffer(batch_size=3)
+        for i in range(4):
+            buffer.put(i)
+        with mock.patch.object(buffer, '_write') as write:
+            buffer.flush()
+        self.assertEqual([call.args[0] for call in write.call_args_list], [[0, 1, 2], [3]])
+        self.assertEqual(buffer.stats()['queued'], 0)
+
+    def test_dropped_entries_are_reported_once(self):
+        buffer = APILogBuffer(max_size=2)
+        for i in range(5):
+            buffer.put(i)
+        self.assertEqual(buffer.stats()['dropped'], 3)
+        with self.assertLogs('config.api_logger', 'WARNING') as logs:
+            buffer._report_drops()
+        self.assertEqual(logs.output, ['WARNING:config.api_logger:API logger queue is full, dropped 3 entries'])
+        with self.assertNoLogs('config.api_logger', 'WARNING'):
+            buffer._report_drops()
+
+    @override_settings(DRF_API_LOGGER_DATABASE=True)
+    def test_library_thread_is_not_started(self):
+        # Idle without entries, the middleware does not log under tests
+        APILogBuffer().start()
+        # The library starts its thread when the module is executed, its model is not loaded under tests
+        sys.modules.pop('drf_api_logger.start_logger_when_server_starts', None)
+        with mock.patch.dict(sys.modules, {'drf_api_logger.insert_log_into_database': mock.Mock()}):
+            start_logger = importlib.import_module('drf_api_logger.start_logger_when_server_starts')
+        self.assertIsNone(start_logger.LOGGER_THREAD)
+
+
+@override_settings(NPLUSONE_DETECTOR=True, NPLUSONE_THRESHOLD=3)
+class NPlusOneDetectorTests(TestCase):
+    def test_repeated_queries_are_logged(self):
+        def get_response(request):
+            with connection.cursor() as cursor:
+                for _ in range(3):
+                    cursor.execute('SELECT 1')
+            return HttpResponse()
+
+        with self.assertLogs('config.nplusone', 'WARNING') as logs:
+            NPlusOneDetectorMiddleware(get_response)(RequestFactory().get('/api/company/logs/'))
+        self.assertIn('Possible N+1 queries in GET /api/company/logs/:\n3 x outside of serializers: SELECT 1',
+                      logs.output[0])
+
+
+@override_settings(METRICS_MULTIPROCESS_DIR=None)
+class MetricsRegistryTests(SimpleTestCase):
+    def test_observe(self):
+        metrics = MetricsRegistry()
+        metrics.observe('api/company/task/', 'GET', 0.03, 2, 0.01, 100)
+        metrics.observe('api/company/task/', 'GET', 3, 20, 0.5, 50)
+        metrics.observe('api/company/task/', 'POST', 0.001, 0, 0, 10)
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(set(snapshot), {'api/company/task/ GET', 'api/company/task/ POST'})
+        task_metrics = snapshot['api/company/task/ GET']
+        duration = task_metrics['histograms']['http_request_duration_seconds']
+        # Buckets are cumulative, every observation is counted in the buckets of all bounds above it
+        self.assertEqual(duration['buckets'], [0, 0, 0, 1, 1, 1, 1, 1, 1, 2, 2])
+        self.assertEqual((duration['count'], duration['sum']), (2, 3.03))
+        queries = task_metrics['histograms']['http_request_db_queries']
+        self.assertEqual(queries['buckets'], [0, 0, 1, 1, 1, 2, 2, 2, 2, 2])
+        self.assertEqual(task_metrics['counters'], {'http_request_db_query_seconds_total': 0.51,
+                                                    'http_response_size_bytes_total': 150})
+
+    def test_render(self):
+        metrics = MetricsRegistry()
+        metrics.observe('api/"quoted"/', 'GET', 0.03, 2, 0.25, 100)
+
+        lines = metrics.render().splitlines()
+        labels = 'route="api/\\"quoted\\"/",method="GET"'
+        for line in ('# HELP http_request_duration_seconds Request latency in seconds',
+                     '# TYPE http_request_duration_seconds histogram',
+                     f'http_request_duration_seconds_bucket{{{labels},le="0.025"}} 0',
+                     f'http_request_duration_seconds_bucket{{{labels},le="0.05"}} 1',
+                     f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1',
+                     f'http_request_duration_seconds_sum{{{labels}}} 0.03',
+                     f'http_request_duration_seconds_count{{{labels}}} 1',
+                     '# TYPE http_request_db_queries histogram',
+                     f'http_request_db_queries_bucket{{{labels},le="2"}} 1',
+                     '# TYPE http_request_db_query_seconds_total counter',
+                     f'http_request_db_query_seconds_total{{{labels}}} 0.25',
+                     '# TYPE http_response_size_bytes_total counter',
+                     f'http_response_size_bytes_total{{{labels}}} 100'):
+            self.assertIn(line, lines)
+        self.assertEqual(len([line for line in lines if line.startswith('http_request_duration_seconds_bucket')]),
+                         len(LATENCY_BUCKETS) + 1)
+
+    def test_multiprocess_merge(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_MULTIPROCESS_DIR=directory):
+            first, second = MetricsRegistry(), MetricsRegistry()
+            first.observe('api/company/task/', 'GET', 0.03, 2, 0.01, 100)
+            second.observe('api/company/task/', 'GET', 0.2, 4, 0.02, 50)
+            second.observe('api/worker/tasks/', 'GET', 0.01, 1, 0.01, 10)
+            second.dump(force=True)
+            # Files that are being written or broken are skipped
+            with open(f'{directory}/broken.json', 'w') as file:
+                file.write('{')
+
+            collected = first.collect()
+            self.assertEqual(set(collected), {'api/company/task/ GET', 'api/worker/tasks/ GET'})
+            task_metrics = collected['api/company/task/ GET']
+            self.assertEqual(task_metrics['histograms']['http_request_duration_seconds']['count'], 2)
+            self.assertEqual(task_metrics['histograms']['http_request_db_queries']['sum'], 6)
+            self.assertEqual(task_metrics['counters']['http_response_size_bytes_total'], 150)
+            # Metrics of the process itself are not changed by the merge
+            self.assertEqual(first.snapshot()['api/company/task/ GET']['counters']['http_response_size_bytes_total'],
+                             100)
+
+
+@override_settings(METRICS_MULTIPROCESS_DIR=None)
+class MetricsViewTests(TenantTestCase):
+    url = '/metrics/'
+
+    def test_requests_are_recorded(self):
+        self.authenticate(self.tenant.company)
+        before = registry.snapshot().get('api/company/task/ GET', {}).get('histograms', {})
+        count = before.get('http_request_duration_seconds', {}).get('count', 0)
+        self.client.get('/api/company/task/')
+
+        task_metrics = registry.snapshot()['api/company/task/ GET']
+        self.assertEqual(task_metrics['histograms']['http_request_duration_seconds']['count'], count + 1)
+        self.assertGreater(task_metrics['histograms']['http_request_db_queries']['sum'], 0)
+        self.assertGreater(task_metrics['counters']['http_response_size_bytes_total'], 0)
+
+    def test_superuser_only(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        self.authenticate(self.tenant.company)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        superuser = UserAccount.objects.create_superuser('admin', 'admin@example.com', 'Str0ng-pass', role='A')
+        self.client.credentials()
+        self.client.force_authenticate(superuser)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('# TYPE http_request_duration_seconds histogram', response.content.decode())
@@ -18,6 +18,8 @@ from django.conf.urls.i18n import i18n_patterns
 from django.contrib import admin
 from django.urls import path, include
 
+from config.views import MetricsView
+
 urlpatterns = [
     path("i18n/admin/backups/", include("dbbackup_ui.urls")),
     path("i18n/", include("django.conf.urls.i18n")),
@@ -25,6 +27,7 @@ urlpatterns = [
     path('api/', include('workers.urls')),
     path('api/', include('users.urls')),
     path('api/', include('iot.urls')),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
 
 urlpatterns += i18n_patterns(path("admin/", admin.site.urls))
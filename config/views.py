@@ -0,0 +1,100 @@
+import hashlib
+
+from django.http import HttpResponse
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from config.cache import get_or_compute
+from config.db_router import is_replica_configured, is_sticky, start_replica_reads, stop_replica_reads
+from config.metrics import registry
+from config.serializers import get_field_paths, is_field_included
+from users.permission import IsSuperUser
+
+
+class SparseFieldsetViewMixin:
+    """
+    Loads relations for the serializer fields that are actually rendered.
+    Maps field path of the view serializer to lookups it needs, e.g. {'task_info.task_difficulty_info': ['task_appointed__difficulty']}.
+    Lookups of fields excluded with ?fields= or ?omit= are not joined or prefetched.
+    """
+    select_related_fields = {}
+    prefetch_related_fields = {}
+
+    def get_select_related_fields(self):
+        return self.select_related_fields
+
+    def get_prefetch_related_fields(self):
+        return self.prefetch_related_fields
+
+    def get_related_lookups(self, related_fields):
+        field_paths = get_field_paths(self.request)
+        lookups = []
+        for field_name, field_lookups in related_fields.items():
+            if is_field_included(field_paths, tuple(field_name.split('.'))):
+                lookups.extend(lookup for lookup in field_lookups if lookup not in lookups)
+        return lookups
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        select_related = self.get_related_lookups(self.get_select_related_fields())
+        if select_related:
+            qs = qs.select_related(*select_related)
+        prefetch_related = self.get_related_lookups(self.get_prefetch_related_fields())
+        if prefetch_related:
+            qs = qs.prefetch_related(*prefetch_related)
+        return qs
+
+
+class ReplicaReadViewMixin:
+    """
+    Sends read-only requests of the view to the replica database, unless the user has just written something
+    and the replica may not have their changes yet. Authentication and permissions are checked on the default one.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and is_replica_configured() and not is_sticky(request.user.id):
+            self._replica_reads = start_replica_reads()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if getattr(self, '_replica_reads', None) is not None:
+            stop_replica_reads(self._replica_reads)
+            self._replica_reads = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class CachedListMixin:
+    """
+    Caches serialized list of the view per user and query string in the shared cache for `list_cache_timeout` seconds.
+    Expired lists are recomputed by one process at a time, the others get the stale list meanwhile.
+    """
+    list_cache_timeout = 60
+    list_cache_stale_timeout = None
+
+    def get_list_cache_key(self):
+        # Query string is hashed to keep the key short and valid for memcached
+        query = hashlib.md5(self.request.GET.urlencode().encode()).hexdigest()
+        return f'{self.basename}-list:{self.request.user.id}:{query}'
+
+    def get_list_data(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.get_serializer(queryset, many=True).data
+
+    def list(self, request, *args, **kwargs):
+        data = get_or_compute(self.get_list_cache_key(), self.get_list_data, self.list_cache_timeout,
+                              self.list_cache_stale_timeout)
+        return Response(data)
+
+
+class MetricsView(APIView):
+    """
+    Request metrics of all routes in Prometheus text format, available to superusers only.
+    """
+    authentication_classes = [*api_settings.DEFAULT_AUTHENTICATION_CLASSES, SessionAuthentication]
+    permission_classes = [IsSuperUser]
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -2,7 +2,7 @@ from django.contrib import admin
 from django import forms
 from django.utils.translation import gettext_lazy as _
 
-from iot.models import Supervisor, Offer
+from iot.models import Supervisor, Offer, SchedulerJob
 
 
 class OfferAdmin(admin.ModelAdmin):
@@ -24,5 +24,14 @@ class SupervisorAdmin(admin.ModelAdmin):
         return form
 
 
+class SchedulerJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'next_run_time', 'last_run_at', 'total_runs', 'failed_runs', 'last_duration', 'max_duration')
+    exclude = ('job_state', )
+
+    def has_add_permission(self, request):
+        return False
+
+
 admin.site.register(Supervisor, SupervisorAdmin)
 admin.site.register(Offer, OfferAdmin)
+admin.site.register(SchedulerJob, SchedulerJobAdmin)
@@ -8,8 +8,6 @@ class IotConfig(AppConfig):
     def ready(self):
         try:
             import iot.signals
-            from . import scheduler
-            scheduler.start()
 
         except ImportError:
             print("iot app ImportError")
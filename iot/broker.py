@@ -0,0 +1,123 @@
+import asyncio
+import contextlib
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+
+def get_version_cache_key(serial_number):
+    return f'iot-options-version:{serial_number}'
+
+
+class OptionsBroker:
+    """
+    Notifies devices waiting on the long-poll endpoint that their options changed.
+
+    Waiters of the current process are woken up directly on publish. Changes published by other
+    processes or nodes are picked up by a background thread that polls the per-supervisor version
+    counters kept in the shared cache every `poll_interval` seconds. Versions are only tracked for
+    supervisors that have waiters.
+    """
+
+    def __init__(self, poll_interval=0.5):
+        self.poll_interval = poll_interval
+        self._waiters = defaultdict(set)
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._poller = None
+
+    def publish(self, *serial_numbers):
+        for serial_number in serial_numbers:
+            key = get_version_cache_key(serial_number)
+            try:
+                version = cache.incr(key)
+            except ValueError:
+                version = 1
+                cache.set(key, version, None)
+            with self._lock:
+                if serial_number in self._waiters:
+                    self._versions[serial_number] = version
+            self._notify(serial_number)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, serial_number):
+        """
+        Registers a waiter for changes of options of the supervisor and yields an event that is set on the first
+        change published after the registration. The caller compares the current options after entering,
+        so a change made between its check and the registration can not be missed.
+        """
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        try:
+            await sync_to_async(self._add_waiter)(serial_number, waiter)
+            yield waiter[1]
+        finally:
+            with self._lock:
+                self._waiters[serial_number].discard(waiter)
+                if not self._waiters[serial_number]:
+                    del self._waiters[serial_number]
+                    self._versions.pop(serial_number, None)
+
+    def _add_waiter(self, serial_number, waiter):
+        with self._lock:
+            self._waiters[serial_number].add(waiter)
+            tracked = serial_number in self._versions
+        if not tracked:
+            # Changes of other processes are detected against the version seen at the registration
+            version = cache.get(get_version_cache_key(serial_number), 0)
+            with self._lock:
+                if serial_number in self._waiters:
+                    self._versions.setdefault(serial_number, version)
+        self._ensure_poller()
+
+    def _notify(self, serial_number):
+        with self._lock:
+            waiters = list(self._waiters.get(serial_number, ()))
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def _ensure_poller(self):
+        with self._lock:
+            if self._poller is None or not self._poller.is_alive():
+                self._poller = threading.Thread(target=self._poll, name='iot-options-broker', daemon=True)
+                self._poller.start()
+
+    def _poll(self):
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                serial_numbers = list(self._waiters)
+            if not serial_numbers:
+                continue
+
+            keys = {get_version_cache_key(serial_number): serial_number for serial_number in serial_numbers}
+            try:
+                versions = cache.get_many(keys.keys())
+            except Exception:
+                continue
+
+            changed = []
+            with self._lock:
+                for key, serial_number in keys.items():
+                    version = versions.get(key, 0)
+                    if serial_number not in self._versions:
+                        # Waiters are gone or not fully registered yet
+                        continue
+                    if self._versions[serial_number] != version:
+                        self._versions[serial_number] = version
+                        changed.append(serial_number)
+            for serial_number in changed:
+                self._notify(serial_number)
+
+
+async def wait_for_change(changed, timeout) -> bool:
+    try:
+        await asyncio.wait_for(changed.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+options_broker = OptionsBroker()
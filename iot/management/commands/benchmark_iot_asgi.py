@@ -0,0 +1,179 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.asgi import get_asgi_application
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.test import RequestFactory
+
+from iot.models import Supervisor
+from iot.utils import get_supervisor_options
+
+PRESENCE_LOG = json.dumps({"type": "OC", "description": "Worker left the working place"}).encode()
+
+
+def get_rss():
+    """
+    Resident memory of the process in bytes, None where /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * 4096
+    except OSError:
+        return None
+
+
+class Sampler(threading.Thread):
+    """
+    Records the peak number of threads and resident memory of the process while a run lasts.
+    """
+
+    def __init__(self, interval=0.002):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.threads = threading.active_count()
+        self.rss = get_rss()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.threads = max(self.threads, threading.active_count())
+            rss = get_rss()
+            if rss is not None:
+                self.rss = max(self.rss, rss)
+
+
+class Command(BaseCommand):
+    help = "Compares requests per second, threads and memory of the async IoT views served by the WSGI handler " \
+           "with a thread per request and by the ASGI handler with all requests in one event loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help="Requests per endpoint and handler.")
+        parser.add_argument('--concurrency', type=int, default=50,
+                            help="Requests in flight, WSGI threads or concurrent ASGI requests.")
+        parser.add_argument('--supervisors', type=int, default=50, help="Number of synthetic devices.")
+        parser.add_argument('--poll-timeout', type=float, default=1,
+                            help="Seconds every long-poll request waits for a change of options.")
+        parser.add_argument('--prefix', default='asgibench', help="Prefix of the synthetic benchmark data.")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        call_command('simulate_iot_load', supervisors=options['supervisors'], prefix=prefix, seed_only=True,
+                     stdout=self.stdout)
+        serial_numbers = list(Supervisor.objects.filter(company__username=f'{prefix}-company')
+                              .order_by('id').values_list('serial_number', flat=True))
+        try:
+            self.benchmark(serial_numbers, options)
+        finally:
+            call_command('simulate_iot_load', prefix=prefix, cleanup=True, stdout=self.stdout)
+
+    def benchmark(self, serial_numbers, options):
+        etags = {serial_number: f'"{get_supervisor_options(serial_number)[1]}"' for serial_number in serial_numbers}
+        poll_timeout = options['poll_timeout']
+        endpoints = {
+            "get-options": ('GET', '/api/iot/get-options/', b'', {}),
+            "get-server-time": ('GET', '/api/iot/get-server-time/', b'', {}),
+            "activity": ('PUT', '/api/iot/activity/', b'', {}),
+            "presence-log": ('POST', '/api/iot/presence-log/', PRESENCE_LOG, {}),
+            # Requests held until the timeout, like devices waiting for a change of their options
+            "options-changes": ('GET', f'/api/iot/options-changes/?timeout={poll_timeout}', b'', {'etag': True}),
+        }
+        handlers = {
+            "wsgi": (get_wsgi_application(), self.run_wsgi),
+            "asgi": (get_asgi_application(), self.run_asgi),
+        }
+
+        self.stdout.write(f"\n{'endpoint':<18}{'handler':<9}{'requests':>9}{'req/s':>10}{'threads':>9}{'RSS +KiB':>10}")
+        for name, (method, path, body, flags) in endpoints.items():
+            requests = options['requests']
+            if flags.get('etag'):
+                # Every long-poll request takes the whole timeout, so fewer of them are sent
+                requests = min(requests, options['concurrency'] * 4)
+            calls = [
+                (method, path, body, serial_numbers[i % len(serial_numbers)],
+                 etags[serial_numbers[i % len(serial_numbers)]] if flags.get('etag') else None)
+                for i in range(requests)
+            ]
+            for handler_name, (handler, run) in handlers.items():
+                run(handler, calls[:options['concurrency']], options['concurrency'])
+
+                sampler = Sampler()
+                rss_before = sampler.rss
+                sampler.start()
+                started = time.perf_counter()
+                statuses = run(handler, calls, options['concurrency'])
+                elapsed = time.perf_counter() - started
+                sampler.stopped.set()
+                sampler.join()
+
+                failed = [status for status in statuses if status >= 400]
+                assert not failed, f"{name} ({handler_name}) failed with {failed[0]}"
+                rss = f"{(sampler.rss - rss_before) // 1024:>10}" if rss_before is not None else f"{'-':>10}"
+                self.stdout.write(f"{name:<18}{handler_name:<9}{requests:>9}{requests / elapsed:>10.0f}"
+                                  f"{sampler.threads:>9}{rss}")
+
+    def run_wsgi(self, handler, calls, concurrency):
+        factory = RequestFactory()
+
+        def call(method, path, body, serial_number, etag):
+            headers = {'Serial-Number': serial_number}
+            if etag:
+                headers['If-None-Match'] = etag
+            environ = factory.generic(method, path, body, content_type='application/json', headers=headers).environ
+            status = []
+            response = handler(environ, lambda response_status, response_headers: status.append(response_status))
+            b''.join(response)
+            response.close()
+            return int(status[0].split()[0])
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(lambda arguments: call(*arguments), calls))
+
+    def run_asgi(self, handler, calls, concurrency):
+        async def call(method, path, body, serial_number, etag):
+            path, _, query_string = path.partition('?')
+            headers = [
+                (b'host', b'localhost'),
+                (b'serial-number', serial_number.encode()),
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+            ]
+            if etag:
+                headers.append((b'if-none-match', etag.encode()))
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'scheme': 'http',
+                'method': method, 'path': path, 'raw_path': path.encode(), 'query_string': query_string.encode(),
+                'root_path': '', 'headers': headers, 'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+            }
+            received = asyncio.Event()
+
+            async def receive():
+                if received.is_set():
+                    # The client stays connected until the response is sent
+                    await asyncio.Future()
+                received.set()
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+
+            status = []
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            await handler(scope, receive, send)
+            return status[0]
+
+        async def run():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def limited(arguments):
+                async with semaphore:
+                    return await call(*arguments)
+
+            return await asyncio.gather(*(limited(arguments) for arguments in calls))
+
+        return asyncio.run(run())
@@ -0,0 +1,63 @@
+import json
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from iot.models import Supervisor
+from iot.packing import packb
+
+FORMATS = {
+    "json": "application/json",
+    "msgpack": "application/msgpack",
+}
+
+PRESENCE_LOG = {"type": "OC", "description": "Worker left the working place"}
+
+
+class Command(BaseCommand):
+    help = "Compares bytes on the wire and server CPU time per request of JSON and MessagePack on IoT endpoints."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Requests per endpoint and format.")
+        parser.add_argument('--prefix', default='wirebench', help="Prefix of the synthetic benchmark data.")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        call_command('simulate_iot_load', supervisors=1, prefix=prefix, seed_only=True, stdout=self.stdout)
+        serial_number = Supervisor.objects.filter(company__username=f'{prefix}-company').first().serial_number
+
+        try:
+            self.benchmark(serial_number, options['requests'])
+        finally:
+            call_command('simulate_iot_load', prefix=prefix, cleanup=True, stdout=self.stdout)
+
+    def benchmark(self, serial_number, requests):
+        client = Client(HTTP_SERIAL_NUMBER=serial_number)
+        bodies = {
+            "json": json.dumps(PRESENCE_LOG).encode(),
+            "msgpack": packb(PRESENCE_LOG),
+        }
+        endpoints = {
+            "get-options": lambda fmt: client.get('/api/iot/get-options/', HTTP_ACCEPT=FORMATS[fmt]),
+            "get-server-time": lambda fmt: client.get('/api/iot/get-server-time/', HTTP_ACCEPT=FORMATS[fmt]),
+            "activity": lambda fmt: client.put('/api/iot/activity/', HTTP_ACCEPT=FORMATS[fmt]),
+            "presence-log": lambda fmt: client.post('/api/iot/presence-log/', bodies[fmt],
+                                                    content_type=FORMATS[fmt], HTTP_ACCEPT=FORMATS[fmt]),
+        }
+
+        self.stdout.write(f"\n{'endpoint':<18}{'format':<10}{'request B':>11}{'response B':>12}{'CPU us/req':>12}")
+        for name, send in endpoints.items():
+            for fmt in FORMATS:
+                response = send(fmt)
+                assert response.status_code < 400, f"{name} ({fmt}) failed with {response.status_code}"
+                request_size = len(bodies[fmt]) if name == "presence-log" else 0
+
+                started = time.process_time()
+                for _ in range(requests):
+                    send(fmt)
+                cpu_time = (time.process_time() - started) / requests
+
+                self.stdout.write(f"{name:<18}{fmt:<10}{request_size:>11}{len(response.content):>12}"
+                                  f"{cpu_time * 1_000_000:>12.0f}")
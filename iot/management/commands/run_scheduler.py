@@ -0,0 +1,61 @@
+import os
+import signal
+import socket
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from iot.models import SchedulerJob
+from iot.scheduler import LeaderLease, build_scheduler
+
+
+class Command(BaseCommand):
+    help = "Hosts the periodic jobs. Run it on any number of nodes, only the leader lease holder executes the jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lease-ttl', type=int, default=60,
+                            help="Seconds the leader lease is valid without renewal.")
+        parser.add_argument('--stats', action='store_true',
+                            help="Print timing stats of the stored jobs and exit.")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            return self.print_stats()
+
+        lease_ttl = options['lease_ttl']
+        lease = LeaderLease(name='scheduler', owner=f'{socket.gethostname()}:{os.getpid()}', ttl=lease_ttl)
+        scheduler = build_scheduler(lease)
+        is_leader = False
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+        self.stdout.write(f"Scheduler node {lease.owner} started")
+        try:
+            while True:
+                if lease.acquire():
+                    if not is_leader:
+                        if scheduler.running:
+                            scheduler.resume()
+                        else:
+                            scheduler.start()
+                        is_leader = True
+                        self.stdout.write(self.style.SUCCESS("Leader lease acquired, running jobs"))
+                elif is_leader:
+                    scheduler.pause()
+                    is_leader = False
+                    self.stdout.write(self.style.WARNING("Leader lease lost, jobs paused"))
+                time.sleep(lease_ttl / 3)
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            if scheduler.running:
+                scheduler.shutdown()
+            lease.release()
+            self.stdout.write("Scheduler stopped")
+
+    def print_stats(self):
+        for job in SchedulerJob.objects.all():
+            average = f"{job.average_duration:.3f}s" if job.average_duration is not None else "-"
+            last = f"{job.last_duration:.3f}s" if job.last_duration is not None else "-"
+            self.stdout.write(f"{job.id}: next run {job.next_run_time}, runs {job.total_runs} "
+                              f"(failed {job.failed_runs}), last {last}, avg {average}, max {job.max_duration:.3f}s")
@@ -0,0 +1,216 @@
+import asyncio
+import datetime
+import json
+import statistics
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from companies.models import Company, Qualification, Task
+from iot.models import Supervisor
+from workers.models import Worker, TaskAppointment
+
+ENDPOINTS = {
+    "activity": ("PUT", "/api/iot/activity/"),
+    "get-options": ("GET", "/api/iot/get-options/"),
+    "get-server-time": ("GET", "/api/iot/get-server-time/"),
+    "presence-log": ("POST", "/api/iot/presence-log/"),
+}
+
+PRESENCE_LOG_BODY = json.dumps({"type": "OC", "description": "Load simulation"})
+
+
+class Command(BaseCommand):
+    help = "Creates synthetic supervisors and drives the IoT endpoints of a running server concurrently, " \
+           "then reports throughput, latency percentiles and DB queries per endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--supervisors', type=int, default=100, help="Number of simulated devices.")
+        parser.add_argument('--duration', type=float, default=30, help="Seconds to run the load.")
+        parser.add_argument('--concurrency', type=int, default=50, help="Maximum requests in flight.")
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Base url of the server under test.")
+        parser.add_argument('--prefix', default='loadsim', help="Prefix of the synthetic company and devices.")
+        parser.add_argument('--presence-every', type=int, default=10,
+                            help="Send presence log on every N-th cycle of a device.")
+        parser.add_argument('--seed-only', action='store_true', help="Only create the synthetic data.")
+        parser.add_argument('--cleanup', action='store_true', help="Delete the synthetic data and exit.")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['cleanup']:
+            deleted, _ = Company.objects.filter(username=f'{prefix}-company').delete()
+            self.stdout.write(f"Deleted {deleted} rows")
+            return
+
+        serial_numbers = self.seed(prefix, options['supervisors'])
+        self.stdout.write(f"{len(serial_numbers)} synthetic supervisors ready")
+        if options['seed_only']:
+            return
+
+        queries = self.count_queries(serial_numbers[0])
+
+        url = urlsplit(options['url'])
+        if url.scheme != 'http':
+            raise CommandError("Only plain http servers are supported")
+
+        simulation = LoadSimulation(url.hostname, url.port or 80, serial_numbers,
+                                    concurrency=options['concurrency'],
+                                    presence_every=options['presence_every'])
+        results, elapsed = asyncio.run(simulation.run(options['duration']))
+        self.report(results, elapsed, queries)
+
+    @transaction.atomic
+    def seed(self, prefix, count):
+        company, _ = Company.objects.get_or_create(username=f'{prefix}-company', defaults={
+            "email": f'{prefix}-company@example.com',
+            "password": make_password(None),
+            "role": 'C',
+            "name": f'{prefix} company',
+        })
+        qualification, _ = Qualification.objects.get_or_create(name=f'{prefix} qualification', company=company)
+
+        existing = Supervisor.objects.filter(company=company).count()
+        password = make_password(None)
+        supervisors = []
+        for i in range(existing, count):
+            worker = Worker.objects.create(username=f'{prefix}-worker-{i}',
+                                           email=f'{prefix}-worker-{i}@example.com',
+                                           password=password,
+                                           role='W',
+                                           first_name='Load',
+                                           last_name=f'Worker {i}',
+                                           working_hours=40,
+                                           day_start=datetime.time(9),
+                                           day_end=datetime.time(18),
+                                           employer=company,
+                                           qualification=qualification)
+            task = Task.objects.create(title=f'{prefix} task {i}',
+                                       description='Synthetic task of IoT load simulation',
+                                       estimate_hours=8,
+                                       difficulty=qualification,
+                                       company=company)
+            TaskAppointment.objects.create(task_appointed=task,
+                                           worker_appointed=worker,
+                                           deadline=timezone.now() + datetime.timedelta(days=7))
+            supervisors.append(Supervisor(serial_number=f'{prefix}-{i}', company=company, worker=worker))
+        Supervisor.objects.bulk_create(supervisors)
+
+        return list(Supervisor.objects.filter(company=company)
+                    .order_by('id').values_list('serial_number', flat=True)[:count])
+
+    def count_queries(self, serial_number):
+        client = Client(HTTP_SERIAL_NUMBER=serial_number)
+        result = {}
+        for name, (method, path) in ENDPOINTS.items():
+            # The first request warms up caches, the second one is measured
+            for _ in range(2):
+                with CaptureQueriesContext(connection) as context:
+                    if method == "POST":
+                        client.post(path, PRESENCE_LOG_BODY, content_type='application/json')
+                    else:
+                        getattr(client, method.lower())(path)
+            result[name] = len(context.captured_queries)
+        return result
+
+    def report(self, results, elapsed, queries):
+        self.stdout.write(f"\n{'endpoint':<18}{'requests':>10}{'errors':>8}{'req/s':>10}"
+                          f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'queries':>9}")
+        for name in ENDPOINTS:
+            latencies = sorted(results[name]["latencies"])
+            if not latencies:
+                continue
+            percentiles = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+            self.stdout.write(f"{name:<18}{len(latencies):>10}{results[name]['errors']:>8}"
+                              f"{len(latencies) / elapsed:>10.1f}"
+                              f"{percentiles[49] * 1000:>9.1f}{percentiles[89] * 1000:>9.1f}"
+                              f"{percentiles[98] * 1000:>9.1f}{latencies[-1] * 1000:>9.1f}"
+                              f"{queries.get(name, '-'):>9}")
+        total = sum(len(result["latencies"]) for result in results.values())
+        self.stdout.write(f"\nTotal: {total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s)")
+
+
+class LoadSimulation:
+    """
+    Every simulated device repeats the cycle of a real supervisor: heartbeat, options poll
+    (revalidated with ETag), server time and from time to time a presence log.
+    """
+
+    def __init__(self, host, port, serial_numbers, concurrency=50, presence_every=10):
+        self.host = host
+        self.port = port
+        self.serial_numbers = serial_numbers
+        self.concurrency = max(1, concurrency)
+        self.presence_every = presence_every
+        self.results = defaultdict(lambda: {"latencies": [], "errors": 0})
+        self._semaphore = None
+
+    async def run(self, duration):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(self.device(serial_number, deadline) for serial_number in self.serial_numbers))
+        return self.results, time.perf_counter() - started
+
+    async def device(self, serial_number, deadline):
+        etag = None
+        cycle = 0
+        while time.perf_counter() < deadline:
+            await self.request("activity", serial_number)
+            _, headers = await self.request("get-options", serial_number,
+                                                 {"If-None-Match": etag} if etag else None)
+            etag = headers.get("etag", etag)
+            await self.request("get-server-time", serial_number)
+            if cycle % self.presence_every == 0:
+                await self.request("presence-log", serial_number, body=PRESENCE_LOG_BODY)
+            cycle += 1
+
+    async def request(self, name, serial_number, headers=None, body=None):
+        method, path = ENDPOINTS[name]
+        payload = body.encode() if body else b""
+        lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            f"Serial-Number: {serial_number}",
+            "Connection: close",
+            f"Content-Length: {len(payload)}",
+        ]
+        if body:
+            lines.append("Content-Type: application/json")
+        for header, value in (headers or {}).items():
+            lines.append(f"{header}: {value}")
+        raw_request = ("\r\n".join(lines) + "\r\n\r\n").encode() + payload
+
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+                writer.write(raw_request)
+                await writer.drain()
+                response = await reader.read()
+                writer.close()
+                status, response_headers = self.parse_response(response)
+            except (OSError, ValueError, IndexError):
+                status, response_headers = 0, {}
+            latency = time.perf_counter() - started
+
+        self.results[name]["latencies"].append(latency)
+        if not (200 <= status < 300 or status == 304):
+            self.results[name]["errors"] += 1
+        return status, response_headers
+
+    @staticmethod
+    def parse_response(response):
+        head = response.split(b"\r\n\r\n", 1)[0].decode('latin-1').split("\r\n")
+        status = int(head[0].split(" ")[1])
+        headers = {}
+        for line in head[1:]:
+            header, _, value = line.partition(":")
+            headers[header.strip().lower()] = value.strip()
+        return status, headers
@@ -16,7 +16,8 @@ class Migration(migrations.Migration):
             name='Offer',
             fields=[
                 ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('status', models.CharField(choices=[('CR', 'Created'), ('RC', 'Received'), ('IC', 'IoT creating'), ('DL', 'Delivering'), ('CM', 'Completed'), ('RJ', 'Rejected')])),
+                # max_length of 0007 is set here already, databases other than PostgreSQL need a length of varchar
+                ('status', models.CharField(choices=[('CR', 'Created'), ('RC', 'Received'), ('IC', 'IoT creating'), ('DL', 'Delivering'), ('CM', 'Completed'), ('RJ', 'Rejected')], max_length=2)),
                 ('last_changed', models.DateTimeField(auto_now=True)),
                 ('created_at', models.DateTimeField(auto_now_add=True)),
                 ('address_of_delivery', models.TextField()),
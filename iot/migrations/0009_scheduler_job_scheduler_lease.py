@@ -0,0 +1,46 @@
+# Generated by Django 4.2 on 2026-10-19 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iot', '0008_alter_supervisor_last_active'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulerJob',
+            fields=[
+                ('id', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('next_run_time', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('job_state', models.BinaryField()),
+                ('total_runs', models.IntegerField(default=0)),
+                ('failed_runs', models.IntegerField(default=0)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_duration', models.FloatField(blank=True, null=True)),
+                ('max_duration', models.FloatField(default=0)),
+                ('total_duration', models.FloatField(default=0)),
+                ('last_error', models.TextField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'scheduler job',
+                'verbose_name_plural': 'scheduler jobs',
+                'ordering': ('next_run_time',),
+            },
+        ),
+        migrations.CreateModel(
+            name='SchedulerLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('owner', models.CharField(max_length=255)),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'scheduler lease',
+                'verbose_name_plural': 'scheduler leases',
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2 on 2026-10-19 18:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    """
+    Supervisor.worker has been SET_NULL in the model while the migrations still recorded CASCADE. Django applies
+    on_delete in the ORM, not in the database, so SET_NULL has always been used. Only syncs the migration state.
+    """
+
+    dependencies = [
+        ('workers', '0023_alter_taskvote_voting'),
+        ('iot', '0009_scheduler_job_scheduler_lease'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='supervisor',
+            name='worker',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='workers.worker'),
+        ),
+    ]
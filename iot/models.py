@@ -50,3 +50,42 @@ class Offer(models.Model):
         return f"Offer #{self.id}({self.company.name})"
 
 
+class SchedulerJob(models.Model):
+    id = models.CharField(max_length=255, primary_key=True)
+    next_run_time = models.DateTimeField(null=True, blank=True, db_index=True)
+    job_state = models.BinaryField()
+
+    total_runs = models.IntegerField(default=0)
+    failed_runs = models.IntegerField(default=0)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_duration = models.FloatField(null=True, blank=True)
+    max_duration = models.FloatField(default=0)
+    total_duration = models.FloatField(default=0)
+    last_error = models.TextField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('scheduler job')
+        verbose_name_plural = _('scheduler jobs')
+        ordering = ('next_run_time', )
+
+    def __str__(self):
+        return f"{self.id} (next run: {self.next_run_time})"
+
+    @property
+    def average_duration(self):
+        if not self.total_runs:
+            return None
+        return self.total_duration / self.total_runs
+
+
+class SchedulerLease(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    owner = models.CharField(max_length=255)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = _('scheduler lease')
+        verbose_name_plural = _('scheduler leases')
+
+    def __str__(self):
+        return f"{self.name} held by {self.owner} until {self.expires_at}"
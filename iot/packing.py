@@ -0,0 +1,195 @@
+"""
+Minimal MessagePack (https://msgpack.org/) encoder and decoder used as the compact wire format of IoT devices.
+Supports nil, bool, int, float, str, bin, array and map types, which covers every IoT payload.
+"""
+import struct
+
+# Deeper arrays and maps are rejected, IoT payloads are flat and unbounded nesting would exhaust the stack
+MAX_DEPTH = 32
+
+
+class PackingError(ValueError):
+    pass
+
+
+def packb(obj, default=None) -> bytes:
+    buffer = bytearray()
+    _pack(obj, buffer, default)
+    return bytes(buffer)
+
+
+def unpackb(data: bytes):
+    obj, offset = _unpack(memoryview(data), 0, 0)
+    if offset != len(data):
+        raise PackingError("Extra data after the packed object")
+    return obj
+
+
+def _pack(obj, buffer, default):
+    if obj is None:
+        buffer.append(0xc0)
+    elif obj is True:
+        buffer.append(0xc3)
+    elif obj is False:
+        buffer.append(0xc2)
+    elif isinstance(obj, int):
+        _pack_int(obj, buffer)
+    elif isinstance(obj, float):
+        buffer.append(0xcb)
+        buffer += struct.pack('>d', obj)
+    elif isinstance(obj, str):
+        data = obj.encode('utf-8')
+        size = len(data)
+        if size < 32:
+            buffer.append(0xa0 | size)
+        elif size < 0x100:
+            buffer += struct.pack('>BB', 0xd9, size)
+        elif size < 0x10000:
+            buffer += struct.pack('>BH', 0xda, size)
+        else:
+            buffer += struct.pack('>BI', 0xdb, size)
+        buffer += data
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        size = len(obj)
+        if size < 0x100:
+            buffer += struct.pack('>BB', 0xc4, size)
+        elif size < 0x10000:
+            buffer += struct.pack('>BH', 0xc5, size)
+        else:
+            buffer += struct.pack('>BI', 0xc6, size)
+        buffer += obj
+    elif isinstance(obj, (list, tuple)):
+        _pack_header(len(obj), 0x90, 0xdc, 0xdd, buffer)
+        for item in obj:
+            _pack(item, buffer, default)
+    elif isinstance(obj, dict):
+        _pack_header(len(obj), 0x80, 0xde, 0xdf, buffer)
+        for key, value in obj.items():
+            _pack(key, buffer, default)
+            _pack(value, buffer, default)
+    elif default is not None:
+        _pack(default(obj), buffer, None)
+    else:
+        raise PackingError(f"Object of type {type(obj).__name__} can not be packed")
+
+
+def _pack_int(obj, buffer):
+    if 0 <= obj < 0x80:
+        buffer.append(obj)
+    elif -32 <= obj < 0:
+        buffer.append(obj & 0xff)
+    elif 0 <= obj < 0x100:
+        buffer += struct.pack('>BB', 0xcc, obj)
+    elif 0 <= obj < 0x10000:
+        buffer += struct.pack('>BH', 0xcd, obj)
+    elif 0 <= obj < 0x100000000:
+        buffer += struct.pack('>BI', 0xce, obj)
+    elif 0 <= obj < 0x10000000000000000:
+        buffer += struct.pack('>BQ', 0xcf, obj)
+    elif -0x80 <= obj < 0:
+        buffer += struct.pack('>Bb', 0xd0, obj)
+    elif -0x8000 <= obj < 0:
+        buffer += struct.pack('>Bh', 0xd1, obj)
+    elif -0x80000000 <= obj < 0:
+        buffer += struct.pack('>Bi', 0xd2, obj)
+    elif -0x8000000000000000 <= obj < 0:
+        buffer += struct.pack('>Bq', 0xd3, obj)
+    else:
+        raise PackingError("Integer is out of 64 bit range")
+
+
+def _pack_header(size, fix_type, type_16, type_32, buffer):
+    if size < 16:
+        buffer.append(fix_type | size)
+    elif size < 0x10000:
+        buffer += struct.pack('>BH', type_16, size)
+    else:
+        buffer += struct.pack('>BI', type_32, size)
+
+
+_FIXED_SIZE_TYPES = {
+    0xca: '>f', 0xcb: '>d',
+    0xcc: '>B', 0xcd: '>H', 0xce: '>I', 0xcf: '>Q',
+    0xd0: '>b', 0xd1: '>h', 0xd2: '>i', 0xd3: '>q',
+}
+_SIZED_TYPES = {
+    0xd9: ('>B', 'str'), 0xda: ('>H', 'str'), 0xdb: ('>I', 'str'),
+    0xc4: ('>B', 'bin'), 0xc5: ('>H', 'bin'), 0xc6: ('>I', 'bin'),
+    0xdc: ('>H', 'array'), 0xdd: ('>I', 'array'),
+    0xde: ('>H', 'map'), 0xdf: ('>I', 'map'),
+}
+
+
+def _unpack(data, offset, depth):
+    try:
+        code = data[offset]
+    except IndexError:
+        raise PackingError("Unexpected end of data")
+    offset += 1
+
+    if code < 0x80:
+        return code, offset
+    if code >= 0xe0:
+        return code - 0x100, offset
+    if 0xa0 <= code <= 0xbf:
+        return _read(data, offset, code & 0x1f, 'str', depth)
+    if 0x90 <= code <= 0x9f:
+        return _read(data, offset, code & 0x0f, 'array', depth)
+    if 0x80 <= code <= 0x8f:
+        return _read(data, offset, code & 0x0f, 'map', depth)
+    if code == 0xc0:
+        return None, offset
+    if code == 0xc2:
+        return False, offset
+    if code == 0xc3:
+        return True, offset
+    if code in _FIXED_SIZE_TYPES:
+        fmt = _FIXED_SIZE_TYPES[code]
+        return _unpack_struct(fmt, data, offset), offset + struct.calcsize(fmt)
+    if code in _SIZED_TYPES:
+        fmt, kind = _SIZED_TYPES[code]
+        size = _unpack_struct(fmt, data, offset)
+        return _read(data, offset + struct.calcsize(fmt), size, kind, depth)
+
+    raise PackingError(f"Unsupported type code 0x{code:02x}")
+
+
+def _unpack_struct(fmt, data, offset):
+    try:
+        return struct.unpack_from(fmt, data, offset)[0]
+    except struct.error:
+        raise PackingError("Unexpected end of data")
+
+
+def _read(data, offset, size, kind, depth):
+    if kind in ('str', 'bin'):
+        end = offset + size
+        if end > len(data):
+            raise PackingError("Unexpected end of data")
+        chunk = bytes(data[offset:end])
+        if kind == 'bin':
+            return chunk, end
+        try:
+            return chunk.decode('utf-8'), end
+        except UnicodeDecodeError:
+            raise PackingError("Invalid UTF-8 string")
+
+    if depth >= MAX_DEPTH:
+        raise PackingError(f"Nesting is deeper than {MAX_DEPTH} levels")
+
+    if kind == 'array':
+        result = []
+        for _ in range(size):
+            item, offset = _unpack(data, offset, depth + 1)
+            result.append(item)
+        return result, offset
+
+    result = {}
+    for _ in range(size):
+        key, offset = _unpack(data, offset, depth + 1)
+        value, offset = _unpack(data, offset, depth + 1)
+        try:
+            result[key] = value
+        except TypeError:
+            raise PackingError("Unhashable map key")
+    return result, offset
@@ -0,0 +1,18 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from iot.packing import unpackb
+
+
+class MsgPackParser(BaseParser):
+    """
+    Parses MessagePack request body sent by IoT devices.
+    """
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return unpackb(stream.read())
+        except (ValueError, TypeError, RecursionError) as exc:
+            # PackingError is a ValueError, anything else raised while decoding is malformed input as well
+            raise ParseError(f'MessagePack parse error - {exc}')
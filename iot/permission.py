@@ -5,6 +5,6 @@ from iot.models import Supervisor
 
 class IsIot(permissions.BasePermission):
     def has_permission(self, request, view):
-        if Supervisor.objects.filter(serial_number=request.META.get("HTTP_SERIAL_NUMBER")):
+        if Supervisor.objects.filter(serial_number=request.META.get("HTTP_SERIAL_NUMBER")).exists():
             return True
         return False
@@ -0,0 +1,19 @@
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from iot.packing import packb
+
+
+class MsgPackRenderer(BaseRenderer):
+    """
+    Renders response in MessagePack, compact binary format for IoT devices.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return packb(data, default=JSONEncoder().default)
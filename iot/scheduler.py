@@ -1,10 +1,39 @@
-from apscheduler.schedulers.background import BackgroundScheduler
 import datetime
+import logging
+import pickle
+import time
+import traceback
+
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, JobLookupError, ConflictingIdError
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.util import ref_to_obj
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Q
 from django.utils import timezone
 
-from iot.models import Supervisor
+from iot.models import Supervisor, SchedulerJob, SchedulerLease
 from workers.models import WorkerLogs, TaskAppointment
 
+logger = logging.getLogger(__name__)
+
+# Periodic jobs hosted by the `run_scheduler` management command.
+JOBS = [
+    {
+        "id": "iot_updater_1",
+        "func": "iot.scheduler:update_inactive_iot",
+        "trigger": "interval",
+        "trigger_args": {"minutes": 15},
+    },
+    {
+        "id": "voting_closer_1",
+        "func": "companies.scheduler:close_expired_votings",
+        "trigger": "interval",
+        "trigger_args": {"minutes": 1},
+    },
+]
+
 
 def update_inactive_iot(last_active_minutes=20):
     curr_time_tw_ago = timezone.now() - datetime.timedelta(minutes=last_active_minutes)
@@ -24,8 +53,162 @@ def update_inactive_iot(last_active_minutes=20):
         print("Inactive IoTs not detected!")
 
 
-def start():
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(update_inactive_iot, "interval", minutes=15, id="iot_updater_1", replace_existing=True)
-    scheduler.start()
-    print("Scheduler started")
+class DjangoJobStore(BaseJobStore):
+    """
+    APScheduler job store that keeps jobs in the SchedulerJob table,
+    so schedules survive restarts and can be shared between nodes.
+    """
+
+    def lookup_job(self, job_id):
+        row = SchedulerJob.objects.filter(id=job_id).only('job_state').first()
+        return self._reconstitute_job(row.job_state) if row else None
+
+    def get_due_jobs(self, now):
+        return self._get_jobs(next_run_time__lte=now)
+
+    def get_next_run_time(self):
+        row = SchedulerJob.objects.filter(next_run_time__isnull=False).only('next_run_time').first()
+        return row.next_run_time if row else None
+
+    def get_all_jobs(self):
+        jobs = self._get_jobs()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def add_job(self, job):
+        try:
+            # Savepoint, so the conflict does not break a surrounding transaction
+            with transaction.atomic():
+                SchedulerJob.objects.create(id=job.id,
+                                            next_run_time=job.next_run_time,
+                                            job_state=self._serialize_job(job))
+        except IntegrityError:
+            raise ConflictingIdError(job.id)
+
+    def update_job(self, job):
+        updated = SchedulerJob.objects.filter(id=job.id).update(next_run_time=job.next_run_time,
+                                                                job_state=self._serialize_job(job))
+        if not updated:
+            raise JobLookupError(job.id)
+
+    def remove_job(self, job_id):
+        deleted, _ = SchedulerJob.objects.filter(id=job_id).delete()
+        if not deleted:
+            raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        SchedulerJob.objects.all().delete()
+
+    def _get_jobs(self, **filters):
+        jobs = []
+        failed_job_ids = []
+        for row in SchedulerJob.objects.filter(**filters).only('id', 'job_state'):
+            try:
+                jobs.append(self._reconstitute_job(row.job_state))
+            except Exception:
+                self._logger.exception('Unable to restore job "%s" -- removing it', row.id)
+                failed_job_ids.append(row.id)
+
+        if failed_job_ids:
+            SchedulerJob.objects.filter(id__in=failed_job_ids).delete()
+
+        return jobs
+
+    @staticmethod
+    def _serialize_job(job):
+        return pickle.dumps(job.__getstate__(), pickle.HIGHEST_PROTOCOL)
+
+    def _reconstitute_job(self, job_state):
+        job = Job.__new__(Job)
+        job.__setstate__(pickle.loads(bytes(job_state)))
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+
+class LeaderLease:
+    """
+    DB-backed lease, only the process holding it is allowed to run scheduled jobs.
+    The holder has to renew it before `ttl` seconds pass, otherwise any other node can take it over.
+    """
+
+    def __init__(self, name, owner, ttl=60):
+        self.name = name
+        self.owner = owner
+        self.ttl = ttl
+
+    def acquire(self) -> bool:
+        now = timezone.now()
+        expires_at = now + datetime.timedelta(seconds=self.ttl)
+        updated = SchedulerLease.objects.filter(Q(owner=self.owner) | Q(expires_at__lt=now),
+                                                name=self.name).update(owner=self.owner, expires_at=expires_at)
+        if updated:
+            return True
+        try:
+            _, created = SchedulerLease.objects.get_or_create(name=self.name,
+                                                              defaults={"owner": self.owner,
+                                                                        "expires_at": expires_at})
+        except IntegrityError:
+            return False
+        return created
+
+    def is_held(self) -> bool:
+        return SchedulerLease.objects.filter(name=self.name,
+                                             owner=self.owner,
+                                             expires_at__gte=timezone.now()).exists()
+
+    def release(self):
+        SchedulerLease.objects.filter(name=self.name, owner=self.owner).delete()
+
+
+_lease = None
+
+
+def run_job(job_id, func_ref):
+    """
+    Wrapper for every scheduled job: skips the run when this process lost the leader lease
+    and records timing stats of the run in SchedulerJob.
+    """
+    close_old_connections()
+    try:
+        if _lease is not None and not _lease.is_held():
+            logger.info("Job %s skipped, leader lease is held by another node", job_id)
+            return
+
+        error = None
+        started = time.perf_counter()
+        try:
+            ref_to_obj(func_ref)()
+        except Exception:
+            error = traceback.format_exc()
+            logger.exception("Job %s failed", job_id)
+        duration = time.perf_counter() - started
+
+        SchedulerJob.objects.filter(id=job_id).update(total_runs=F('total_runs') + 1,
+                                                      failed_runs=F('failed_runs') + (1 if error else 0),
+                                                      last_run_at=timezone.now(),
+                                                      last_duration=duration,
+                                                      total_duration=F('total_duration') + duration,
+                                                      last_error=error)
+        SchedulerJob.objects.filter(id=job_id, max_duration__lt=duration).update(max_duration=duration)
+    finally:
+        close_old_connections()
+
+
+def build_scheduler(lease=None):
+    global _lease
+    _lease = lease
+
+    scheduler = BackgroundScheduler(jobstores={"default": DjangoJobStore()},
+                                    job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": 60},
+                                    timezone=settings.TIME_ZONE)
+    stored_next_run_times = dict(SchedulerJob.objects.values_list('id', 'next_run_time'))
+    for job in JOBS:
+        job_kwargs = {}
+        if stored_next_run_times.get(job["id"]):
+            # Keep the schedule from the job store, so restarts do not postpone the job.
+            job_kwargs["next_run_time"] = stored_next_run_times[job["id"]]
+        scheduler.add_job(run_job, job["trigger"], args=[job["id"], job["func"]], id=job["id"],
+                          replace_existing=True, **job["trigger_args"], **job_kwargs)
+
+    return scheduler
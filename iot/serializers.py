@@ -2,8 +2,9 @@ from django.utils import timezone
 from rest_framework import serializers
 from django.utils.translation import gettext_lazy as _
 
+from config.serializers import SparseFieldsetMixin
 from iot.models import Supervisor, Offer
-from workers.models import Worker, WorkerLogs, TaskAppointment
+from workers.models import Worker, WorkerLogs
 
 
 class SupervisorOptionsSerializer(serializers.ModelSerializer):
@@ -22,7 +23,7 @@ class SupervisorOptionsSerializer(serializers.ModelSerializer):
         ]
 
 
-class SupervisorCompanySerializer(serializers.ModelSerializer):
+class SupervisorCompanySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     is_active = serializers.BooleanField(read_only=True)
     in_admin_mode = serializers.BooleanField(read_only=True)
     last_active = serializers.DateTimeField(read_only=True)
@@ -48,7 +49,7 @@ class SupervisorCompanySerializer(serializers.ModelSerializer):
     def validate(self, data):
         if data.get('worker'):
             if not Worker.objects.filter(id=data['worker'].id,
-                                         employer=self.context['request'].user.company):
+                                         employer=self.context['request'].user.company_id):
                 raise serializers.ValidationError({'worker': [
                     _('The assigned worker does not exist or belong to your company!')
                 ]})
@@ -63,11 +64,11 @@ class SupervisorCompanySerializer(serializers.ModelSerializer):
         return Supervisor.objects.create(
             in_admin_mode=validated_data['in_admin_mode'] or False,
             worker=validated_data['worker'] or None,
-            company=self.context['request'].user.company,
+            company_id=self.context['request'].user.company_id,
         )
 
 
-class OfferSerializer(serializers.ModelSerializer):
+class OfferSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     status = serializers.CharField(read_only=True, source='get_status_display')
     localized_created_at = serializers.SerializerMethodField(read_only=True)
     last_changed = serializers.DateTimeField(read_only=True)
@@ -98,7 +99,7 @@ class OfferSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         return Offer.objects.create(
             address_of_delivery=validated_data['address_of_delivery'],
-            company=self.context['request'].user.company,
+            company_id=self.context['request'].user.company_id,
         )
 
     def update(self, instance, validated_data):
@@ -112,20 +113,6 @@ class OfferSerializer(serializers.ModelSerializer):
         return instance
 
 
-class SendActivitySerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Supervisor
-        fields = []
-
-    def update(self, instance, validated_data):
-        instance.is_active = True
-        instance.last_active = timezone.now()
-
-        instance.save()
-
-        return instance
-
-
 class WorkerPresenceLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = WorkerLogs
@@ -133,32 +120,3 @@ class WorkerPresenceLogSerializer(serializers.ModelSerializer):
             "type",
             "description"
         ]
-
-    def create(self, validated_data):
-        supervisor = Supervisor.objects.get(serial_number=self.context['request'].META.get("HTTP_SERIAL_NUMBER"))
-        supervisor_worker = supervisor.worker
-        worker_curr_task = TaskAppointment.objects.filter(is_done=False, worker_appointed=supervisor_worker).first()
-        if not supervisor_worker:
-            raise serializers.ValidationError({'detail': _('The IoT does not have assigned worker!')})
-        if not worker_curr_task:
-            raise serializers.ValidationError({'detail': _('The assigned worker does not have task now!')})
-        return WorkerLogs.objects.create(
-            type=validated_data.get("type"),
-            description=validated_data.get("description"),
-            worker=supervisor_worker,
-            task=worker_curr_task.task_appointed
-        )
-
-
-class SupervisorServerTimeSerializer(serializers.ModelSerializer):
-    server_time = serializers.SerializerMethodField(read_only=True)
-
-    class Meta:
-        model = Supervisor
-        fields = [
-            "server_time",
-        ]
-
-    def get_server_time(self, obj):
-        localized_now = timezone.localtime(timezone.now(), obj.company.get_timezone())
-        return localized_now.strftime('%H:%M:%S')
@@ -1,2 +1,63 @@
-from django.db.models.signals import post_save, post_delete, post_init
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
 
+from companies.models import Company
+from iot.models import Supervisor
+from iot.utils import invalidate_supervisor_options
+from workers.models import Worker
+
+SUPERVISOR_ACTIVITY_FIELDS = {'is_active', 'last_active'}
+
+
+def is_options_change(update_fields, options_fields):
+    return update_fields is None or bool(set(update_fields) & options_fields)
+
+
+def invalidate_on_commit(*serial_numbers):
+    """
+    Invalidates cached options once the transaction commits, so a concurrent read can not cache the old row again.
+    """
+    if serial_numbers:
+        transaction.on_commit(lambda: invalidate_supervisor_options(*serial_numbers))
+
+
+@receiver(pre_save, sender=Supervisor)
+def supervisor_serial_number_changing(sender, instance=None, update_fields=None, **kwargs):
+    # Options cached under the old serial number would still be served to whoever sends it
+    instance._previous_serial_number = None
+    if instance.pk and (update_fields is None or 'serial_number' in update_fields):
+        instance._previous_serial_number = Supervisor.objects.filter(pk=instance.pk) \
+            .values_list('serial_number', flat=True).first()
+
+
+@receiver(post_save, sender=Supervisor)
+def supervisor_options_changed(sender, instance=None, update_fields=None, **kwargs):
+    if update_fields is None or not set(update_fields) <= SUPERVISOR_ACTIVITY_FIELDS:
+        previous_serial_number = getattr(instance, '_previous_serial_number', None)
+        if previous_serial_number and previous_serial_number != instance.serial_number:
+            invalidate_on_commit(previous_serial_number, instance.serial_number)
+        else:
+            invalidate_on_commit(instance.serial_number)
+
+
+@receiver(post_delete, sender=Supervisor)
+def supervisor_deleted(sender, instance=None, **kwargs):
+    invalidate_on_commit(instance.serial_number)
+
+
+@receiver(post_save, sender=Worker)
+def worker_hours_changed(sender, instance=None, created=False, update_fields=None, **kwargs):
+    if not created and is_options_change(update_fields, {'day_start', 'day_end'}):
+        invalidate_on_commit(*Supervisor.objects.filter(worker=instance).values_list('serial_number', flat=True))
+
+
+@receiver(pre_delete, sender=Worker)
+def worker_deleted(sender, instance=None, **kwargs):
+    invalidate_on_commit(*Supervisor.objects.filter(worker=instance).values_list('serial_number', flat=True))
+
+
+@receiver(post_save, sender=Company)
+def company_timezone_changed(sender, instance=None, created=False, update_fields=None, **kwargs):
+    if not created and is_options_change(update_fields, {'timezone'}):
+        invalidate_on_commit(*Supervisor.objects.filter(company=instance).values_list('serial_number', flat=True))
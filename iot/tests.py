@@ -1,3 +1,265 @@
-from django.test import TestCase
+import datetime
+import io
+import struct
+from unittest import mock
 
-# Create your tests here.
+from apscheduler.schedulers.background import BackgroundScheduler
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from django.utils.http import quote_etag
+from rest_framework.exceptions import ParseError
+
+from config.testing import QueryBudgetTestCase, TenantTestCase
+from iot.broker import OptionsBroker, wait_for_change
+from iot.models import SchedulerJob, SchedulerLease, Supervisor
+from iot.packing import MAX_DEPTH, PackingError, packb, unpackb
+from iot.parsers import MsgPackParser
+from iot.scheduler import JOBS, DjangoJobStore, LeaderLease, build_scheduler, run_job
+from iot.utils import get_supervisor_options
+
+
+class IotQueryBudgetTests(QueryBudgetTestCase):
+    def test_company_supervisors(self):
+        self.assertQueryBudget(1, '/api/iot/company-options/')
+        self.assertQueryBudget(1, lambda tenant: f'/api/iot/company-options/{tenant.supervisors[0].id}/')
+
+    def test_company_offers(self):
+        self.assertQueryBudget(1, '/api/iot/company-offer/')
+        self.assertQueryBudget(1, lambda tenant: f'/api/iot/company-offer/{tenant.offers[0].id}/')
+
+    def test_supervisor_options(self):
+        for url in ('/api/iot/get-options/', '/api/iot/get-server-time/'):
+            for tenant in self.tenants:
+                self.client.credentials(HTTP_SERIAL_NUMBER=tenant.supervisors[0].serial_number)
+                # Options are computed on the first request and cached
+                self.assertLessEqual(self.count_queries('get', url)[0], 2)
+                self.assertLessEqual(self.count_queries('get', url)[0], 1)
+
+    def test_supervisor_writes(self):
+        for tenant in self.tenants:
+            self.client.credentials(HTTP_SERIAL_NUMBER=tenant.supervisors[0].serial_number)
+            self.assertLessEqual(self.count_queries('put', '/api/iot/activity/')[0], 1)
+            self.assertLessEqual(self.count_queries('post', '/api/iot/presence-log/',
+                                                    {'type': 'OC', 'description': 'Left'}, format='json')[0], 4)
+
+
+class SupervisorOptionsInvalidationTests(TenantTestCase):
+    def test_invalidated_after_commit(self):
+        supervisor = self.tenant.supervisors[0]
+        _, etag = get_supervisor_options(supervisor.serial_number)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            supervisor.worker.day_start = datetime.time(8)
+            supervisor.worker.save()
+            # Cached options stay until the commit, the invalidation then drops whatever was cached meanwhile
+            self.assertEqual(get_supervisor_options(supervisor.serial_number)[1], etag)
+        self.assertEqual(len(callbacks), 1)
+
+        callbacks[0]()
+        self.assertNotEqual(get_supervisor_options(supervisor.serial_number)[1], etag)
+
+    def test_renamed_serial_number(self):
+        supervisor = Supervisor.objects.get(id=self.tenant.supervisors[0].id)
+        old_serial_number = supervisor.serial_number
+        self.assertIsNotNone(get_supervisor_options(old_serial_number))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            supervisor.serial_number = 'renamed'
+            supervisor.save()
+        self.assertIsNone(get_supervisor_options(old_serial_number))
+        self.assertIsNotNone(get_supervisor_options('renamed'))
+        self.client.credentials(HTTP_SERIAL_NUMBER=old_serial_number)
+        for url in ('/api/iot/get-options/', '/api/iot/get-server-time/'):
+            self.assertEqual(self.client.get(url).status_code, 401, url)
+
+
+class SupervisorOptionsChangesTests(TenantTestCase):
+    url = '/api/iot/options-changes/'
+
+    def setUp(self):
+        super().setUp()
+        self.supervisor = self.tenant.supervisors[0]
+        self.client.credentials(HTTP_SERIAL_NUMBER=self.supervisor.serial_number)
+        self.etag = quote_etag(get_supervisor_options(self.supervisor.serial_number)[1])
+
+    def test_changed_options(self):
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"outdated"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'changed': True})
+
+    def test_timeout(self):
+        for timeout in ('0', '-5'):
+            response = self.client.get(self.url, {'timeout': timeout}, HTTP_IF_NONE_MATCH=self.etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], self.etag)
+        for timeout in ('nan', 'inf', 'soon'):
+            self.assertEqual(self.client.get(self.url, {'timeout': timeout}).status_code, 400)
+
+    def test_supervisor_without_worker(self):
+        Supervisor.objects.filter(id=self.supervisor.id).update(worker=None)
+        cache.clear()
+        response = self.client.get(self.url, {'timeout': '0'})
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn('ETag', response)
+
+
+class OptionsBrokerTests(SimpleTestCase):
+    async def test_change_after_subscription(self):
+        broker = OptionsBroker()
+        async with broker.subscribe('serial') as changed:
+            self.assertFalse(await wait_for_change(changed, 0))
+            broker.publish('serial')
+            self.assertTrue(await wait_for_change(changed, 1))
+        self.assertEqual(broker._versions, {})
+
+    def test_publish_without_waiters(self):
+        broker = OptionsBroker()
+        broker.publish('serial')
+        self.assertEqual(broker._versions, {})
+
+
+class PackingTests(SimpleTestCase):
+    def assertRoundTrip(self, obj, size=None):
+        packed = packb(obj)
+        self.assertEqual(unpackb(packed), obj)
+        if size is not None:
+            self.assertEqual(len(packed), size)
+
+    def test_scalars(self):
+        for obj in (None, True, False, 0.0, -1.5, 1e300):
+            self.assertRoundTrip(obj)
+        self.assertEqual(unpackb(b'\xca' + struct.pack('>f', 0.5)), 0.5)
+
+    def test_ints(self):
+        for obj, size in ((0, 1), (127, 1), (-1, 1), (-32, 1), (128, 2), (255, 2), (256, 3), (0xffff, 3),
+                          (0x10000, 5), (0xffffffff, 5), (0x100000000, 9), (2 ** 64 - 1, 9), (-33, 2), (-128, 2),
+                          (-129, 3), (-0x8000, 3), (-0x8001, 5), (-2 ** 31, 5), (-2 ** 31 - 1, 9), (-2 ** 63, 9)):
+            self.assertRoundTrip(obj, size)
+        for obj in (2 ** 64, -2 ** 63 - 1):
+            self.assertRaises(PackingError, packb, obj)
+
+    def test_str_and_bin(self):
+        for length, header in ((0, 1), (31, 1), (32, 2), (0xff, 2), (0x100, 3), (0xffff, 3), (0x10000, 5)):
+            self.assertRoundTrip('ї' * (length // 2) + 'a' * (length % 2), length + header)
+        for length, header in ((0, 2), (0xff, 2), (0x100, 3), (0x10000, 5)):
+            self.assertRoundTrip(b'\x00' * length, length + header)
+        self.assertRaises(PackingError, unpackb, b'\xa2\xff\xfe')
+
+    def test_array_and_map(self):
+        for length in (0, 15, 16, 0xffff, 0x10000):
+            self.assertRoundTrip(list(range(length)))
+            self.assertRoundTrip({str(i): [i, None, {'nested': True}] for i in range(length)})
+        self.assertEqual(unpackb(packb((1, 2))), [1, 2])
+        self.assertRaises(PackingError, unpackb, b'\x81\x90\xc0')
+
+    def test_malformed(self):
+        for data in (b'', b'\xcd\x01', b'\xa5abc', b'\xc4\x05ab', b'\x92\x01', b'\x81\xa1a', b'\xdc\x00'):
+            self.assertRaises(PackingError, unpackb, data)
+        self.assertRaises(PackingError, unpackb, b'\x01\x02')
+        for code in (0xc1, 0xc7, 0xd4, 0xd8):
+            self.assertRaises(PackingError, unpackb, bytes([code, 0, 0]))
+
+    def test_depth_limit(self):
+        nested = []
+        for _ in range(MAX_DEPTH - 1):
+            nested = [nested]
+        self.assertRoundTrip(nested)
+        for nested in (b'\x91' * (MAX_DEPTH + 1) + b'\xc0', b'\x81\xc0' * 50000 + b'\xc0', b'\x91' * 50000):
+            self.assertRaises(PackingError, unpackb, nested)
+
+    def test_parser(self):
+        for data in (b'\x91' * 50000, b'\xc1', b'\x01\x02'):
+            self.assertRaises(ParseError, MsgPackParser().parse, io.BytesIO(data))
+
+
+class MsgPackEndpointTests(TenantTestCase):
+    def test_nested_body(self):
+        self.client.credentials(HTTP_SERIAL_NUMBER=self.tenant.supervisors[0].serial_number)
+        response = self.client.generic('POST', '/api/iot/presence-log/', b'\x91' * 50000,
+                                       content_type='application/msgpack')
+        self.assertEqual(response.status_code, 400)
+
+
+def passing_job():
+    pass
+
+
+def failing_job():
+    raise RuntimeError('Job failed')
+
+
+class LeaderLeaseTests(TestCase):
+    def test_acquire_renew_and_steal(self):
+        first, second = LeaderLease('scheduler', 'first'), LeaderLease('scheduler', 'second')
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+        self.assertTrue(first.is_held())
+        self.assertFalse(second.is_held())
+
+        expires_at = SchedulerLease.objects.get(name='scheduler').expires_at
+        SchedulerLease.objects.update(expires_at=expires_at - datetime.timedelta(seconds=30))
+        self.assertTrue(first.acquire())
+        self.assertGreaterEqual(SchedulerLease.objects.get(name='scheduler').expires_at, expires_at)
+
+        # The holder did not renew the lease in time
+        SchedulerLease.objects.update(expires_at=timezone.now() - datetime.timedelta(seconds=1))
+        self.assertFalse(first.is_held())
+        self.assertTrue(second.acquire())
+        self.assertTrue(second.is_held())
+        self.assertFalse(first.acquire())
+
+        first.release()
+        self.assertTrue(second.is_held())
+        second.release()
+        self.assertFalse(SchedulerLease.objects.exists())
+
+
+@mock.patch('iot.scheduler.close_old_connections')
+class SchedulerJobTests(TestCase):
+    def start_scheduler(self, lease=None):
+        scheduler = build_scheduler(lease)
+        # Jobs are written into the store on start, the scheduler thread that would run them is not started
+        with mock.patch.object(BackgroundScheduler, '_main_loop'):
+            scheduler.start(paused=True)
+        self.addCleanup(scheduler.shutdown)
+        self.addCleanup(build_scheduler)
+        return scheduler
+
+    def test_jobs_are_stored(self, close_old_connections):
+        self.start_scheduler()
+        self.assertEqual(set(SchedulerJob.objects.values_list('id', flat=True)), {job["id"] for job in JOBS})
+
+        store = DjangoJobStore()
+        store.start(build_scheduler(), 'default')
+        job = store.lookup_job('voting_closer_1')
+        self.assertEqual(job.args, ('voting_closer_1', 'companies.scheduler:close_expired_votings'))
+        self.assertEqual(store.get_due_jobs(timezone.now() - datetime.timedelta(days=1)), [])
+
+    def test_restart_keeps_schedule(self, close_old_connections):
+        self.start_scheduler()
+        next_run_time = timezone.now() + datetime.timedelta(hours=3)
+        SchedulerJob.objects.filter(id='iot_updater_1').update(next_run_time=next_run_time)
+
+        self.start_scheduler()
+        self.assertEqual(SchedulerJob.objects.get(id='iot_updater_1').next_run_time, next_run_time)
+
+    def test_run_stats(self, close_old_connections):
+        SchedulerJob.objects.create(id='failing', job_state=b'')
+        with self.assertLogs('iot.scheduler', 'ERROR'):
+            run_job('failing', 'iot.tests:failing_job')
+        run_job('failing', 'iot.tests:passing_job')
+
+        job = SchedulerJob.objects.get(id='failing')
+        self.assertEqual((job.total_runs, job.failed_runs), (2, 1))
+        self.assertIsNone(job.last_error)
+        self.assertGreaterEqual(job.max_duration, job.last_duration)
+
+    def test_run_without_lease(self, close_old_connections):
+        SchedulerJob.objects.create(id='failing', job_state=b'')
+        LeaderLease('scheduler', 'other').acquire()
+        self.start_scheduler(LeaderLease('scheduler', 'this'))
+
+        with self.assertLogs('iot.scheduler', 'INFO'):
+            run_job('failing', 'iot.tests:failing_job')
+        self.assertEqual(SchedulerJob.objects.get(id='failing').total_runs, 0)
@@ -2,7 +2,7 @@ from django.urls import path, include
 from rest_framework import routers
 
 from iot.views import SupervisorCompanyView, SupervisorOptionsView, SupervisorActivityView, WorkerPresenceLogView, \
-    OfferCompanyView, ServerTimeView
+    OfferCompanyView, ServerTimeView, SupervisorOptionsChangesView
 
 iot_router = routers.SimpleRouter()
 iot_router.register(r'company-options', SupervisorCompanyView, basename='company-options')
@@ -12,6 +12,7 @@ urlpatterns = [
     path('iot/', include(iot_router.urls)),
     path('iot/get-options/', SupervisorOptionsView.as_view()),
     path('iot/get-server-time/', ServerTimeView.as_view()),
+    path('iot/options-changes/', SupervisorOptionsChangesView.as_view()),
     path('iot/activity/', SupervisorActivityView.as_view()),
     path('iot/presence-log/', WorkerPresenceLogView.as_view()),
 ]
@@ -0,0 +1,47 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from rest_framework.utils.encoders import JSONEncoder
+
+from iot.broker import options_broker
+from iot.models import Supervisor
+from iot.serializers import SupervisorOptionsSerializer
+
+OPTIONS_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_options_cache_key(serial_number):
+    return f'iot-options:{serial_number}'
+
+
+def get_supervisor_options(serial_number):
+    """
+    Returns precomputed options payload of the supervisor and its content hash,
+    or None if there is no supervisor with assigned worker for given serial number.
+    """
+    cache_key = get_options_cache_key(serial_number)
+    options = cache.get(cache_key)
+    if options is None:
+        supervisor = Supervisor.objects.select_related('worker', 'company').filter(serial_number=serial_number,
+                                                                                   worker__isnull=False).first()
+        if not supervisor:
+            return None
+
+        data = dict(SupervisorOptionsSerializer(supervisor).data)
+        content = json.dumps(data, cls=JSONEncoder, sort_keys=True).encode()
+        options = {
+            "data": data,
+            "etag": hashlib.sha1(content).hexdigest(),
+        }
+        cache.set(cache_key, options, OPTIONS_CACHE_TIMEOUT)
+
+    return options["data"], options["etag"]
+
+
+def invalidate_supervisor_options(*serial_numbers):
+    """
+    Drops cached options of the supervisors and notifies devices waiting for their config change.
+    """
+    cache.delete_many([get_options_cache_key(serial_number) for serial_number in serial_numbers])
+    options_broker.publish(*serial_numbers)
@@ -1,68 +1,225 @@
-from rest_framework import viewsets, mixins, generics, status
-from rest_framework.generics import get_object_or_404
+import io
+import math
+
+import pytz
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from django.utils.translation import gettext_lazy as _
+from django.views import View
+from rest_framework import viewsets, mixins, status
+from rest_framework.exceptions import APIException, MethodNotAllowed, NotAuthenticated, NotFound, \
+    UnsupportedMediaType, ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.viewsets import GenericViewSet
 
 from companies.permission import IsCompany
+from config.views import SparseFieldsetViewMixin
 from iot.models import Supervisor, Offer
-from iot.permission import IsIot
-from iot.serializers import SupervisorCompanySerializer, SupervisorOptionsSerializer, SendActivitySerializer, \
-    WorkerPresenceLogSerializer, OfferSerializer, SupervisorServerTimeSerializer
+from iot.broker import options_broker, wait_for_change
+from iot.parsers import MsgPackParser
+from iot.renderers import MsgPackRenderer
+from iot.serializers import SupervisorCompanySerializer, WorkerPresenceLogSerializer, OfferSerializer
+from iot.utils import get_supervisor_options
 
-from workers.models import WorkerLogs
+from workers.models import TaskAppointment, WorkerLogs
 
+# Devices can use MessagePack instead of JSON by sending Accept/Content-Type: application/msgpack
+IOT_RENDERER_CLASSES = [*api_settings.DEFAULT_RENDERER_CLASSES, MsgPackRenderer]
+IOT_PARSER_CLASSES = [*api_settings.DEFAULT_PARSER_CLASSES, MsgPackParser]
 
-class SupervisorCompanyView(mixins.RetrieveModelMixin, mixins.ListModelMixin, mixins.UpdateModelMixin, GenericViewSet):
+
+class SupervisorCompanyView(SparseFieldsetViewMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin,
+                            mixins.UpdateModelMixin, GenericViewSet):
     queryset = Supervisor.objects.all()
     serializer_class = SupervisorCompanySerializer
     permission_classes = [IsAuthenticated, IsCompany, ]
+    select_related_fields = {
+        'username': ['worker'],
+        'localized_last_active': ['company'],
+    }
 
     def get_queryset(self):
         qs = super().get_queryset()
         return qs.filter(company=self.request.user.id)
 
 
-class SupervisorOptionsView(generics.RetrieveAPIView):
-    queryset = Supervisor.objects.all()
-    serializer_class = SupervisorOptionsSerializer
-    permission_classes = [IsIot]
-
-    def get_object(self):
-        qs = super().get_queryset()
-        return get_object_or_404(qs, serial_number=self.request.META.get("HTTP_SERIAL_NUMBER"), worker__isnull=False)
-
-
-class ServerTimeView(generics.RetrieveAPIView):
-    queryset = Supervisor.objects.all()
-    serializer_class = SupervisorServerTimeSerializer
-    permission_classes = [IsIot]
-
-    def get_object(self):
-        qs = super().get_queryset()
-        return get_object_or_404(qs, serial_number=self.request.META.get("HTTP_SERIAL_NUMBER"), worker__isnull=False)
-
-
-class SupervisorActivityView(generics.UpdateAPIView):
-    queryset = Supervisor.objects.all()
-    serializer_class = SendActivitySerializer
-    permission_classes = [IsIot]
-
-    def get_object(self):
-        qs = super().get_queryset()
-        return get_object_or_404(qs, serial_number=self.request.META.get("HTTP_SERIAL_NUMBER"))
-
-
-class WorkerPresenceLogView(generics.CreateAPIView):
-    queryset = WorkerLogs.objects.all()
-    serializer_class = WorkerPresenceLogSerializer
-    permission_classes = [IsIot]
+class AsyncIotView(View):
+    """
+    Base of the async endpoints polled by supervisors, so that under ASGI waiting devices do not hold a thread each.
+    Requests and responses are JSON or MessagePack like in DRF views, errors are rendered like DRF does.
+    """
+    renderer_classes = IOT_RENDERER_CLASSES
+    parser_classes = IOT_PARSER_CLASSES
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Devices do not send CSRF tokens, csrf_exempt() would hide that the view is async in Django 4.2
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.serial_number = request.META.get("HTTP_SERIAL_NUMBER")
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+            return self.render(data, status=exc.status_code)
+
+    def http_method_not_allowed(self, request, *args, **kwargs):
+        raise MethodNotAllowed(request.method)
+
+    async def check_supervisor(self):
+        if not self.serial_number or not await Supervisor.objects.filter(serial_number=self.serial_number).aexists():
+            raise NotAuthenticated
+
+    def parse(self):
+        if self.request.content_type in ('application/x-www-form-urlencoded', 'multipart/form-data'):
+            return self.request.POST
+        for parser_class in self.parser_classes:
+            if parser_class.media_type == self.request.content_type:
+                return parser_class().parse(io.BytesIO(self.request.body))
+        if not self.request.body:
+            return {}
+        raise UnsupportedMediaType(self.request.content_type)
+
+    def get_renderer(self):
+        accept = self.request.META.get("HTTP_ACCEPT", "")
+        for renderer_class in self.renderer_classes:
+            if renderer_class.format != 'api' and renderer_class.media_type in accept:
+                return renderer_class()
+        return self.renderer_classes[0]()
+
+    def render(self, data, status=status.HTTP_200_OK, headers=None):
+        renderer = self.get_renderer()
+        content = renderer.render(data) if data is not None else b''
+        content_type = f'{renderer.media_type}; charset={renderer.charset}' if renderer.charset else renderer.media_type
+        response = HttpResponse(content, content_type=content_type, status=status, headers=headers)
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+    async def get_options(self):
+        """
+        Cached options of the supervisor, no query is made when they are cached.
+        """
+        options = await sync_to_async(get_supervisor_options)(self.serial_number)
+        if options is None:
+            await self.check_supervisor()
+            raise NotFound
+        return options
+
+
+class SupervisorOptionsView(AsyncIotView):
+    """
+    Serves precomputed options of the supervisor, the device gets 304 if its ETag is still current.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        data, etag = await self.get_options()
+        etag = quote_etag(etag)
+
+        if_none_match = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            return self.render(None, status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        return self.render(data, headers={"ETag": etag})
+
+
+class ServerTimeView(AsyncIotView):
+    async def get(self, request, *args, **kwargs):
+        # Timezone is taken from the cached options, so the poll does not join worker and company
+        data, _ = await self.get_options()
+
+        localized_now = timezone.localtime(timezone.now(), pytz.timezone(data["timezone"]))
+        return self.render({"server_time": localized_now.strftime('%H:%M:%S')})
+
+
+class SupervisorOptionsChangesView(AsyncIotView):
+    """
+    Long-poll endpoint for supervisors: the request is held until options of the device change
+    (response 200) or `timeout` seconds pass (response 304). The device sends ETag of its options
+    in If-None-Match, so a change made while it was not connected is reported at once.
+    A supervisor without assigned worker has no options, so it waits until a worker is assigned.
+    """
+    default_timeout = 30
+    max_timeout = 60
+
+    def get_timeout(self):
+        try:
+            timeout = float(self.request.GET.get("timeout", self.default_timeout))
+        except ValueError:
+            timeout = math.nan
+        if not math.isfinite(timeout):
+            raise ValidationError({"timeout": _("A valid number is required.")})
+        return min(max(timeout, 0), self.max_timeout)
+
+    async def get(self, request, *args, **kwargs):
+        timeout = self.get_timeout()
+        await self.check_supervisor()
+
+        # The waiter is registered before the options are compared, so a change between the two is not missed
+        async with options_broker.subscribe(self.serial_number) as changed:
+            options = await sync_to_async(get_supervisor_options)(self.serial_number)
+            etag = quote_etag(options[1]) if options else None
+            if etag and etag not in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+                return self.render({"changed": True})
+
+            if await wait_for_change(changed, timeout):
+                return self.render({"changed": True})
+
+        return self.render(None, status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag} if etag else None)
+
+
+class SupervisorActivityView(AsyncIotView):
+    """
+    Marks the supervisor active, with a single update query.
+    """
+
+    async def put(self, request, *args, **kwargs):
+        if not self.serial_number:
+            raise NotAuthenticated
+        updated = await Supervisor.objects.filter(serial_number=self.serial_number).aupdate(
+            is_active=True, last_active=timezone.now(),
+        )
+        if not updated:
+            raise NotAuthenticated
+        return self.render({})
+
+    async def patch(self, request, *args, **kwargs):
+        return await self.put(request, *args, **kwargs)
+
+
+class WorkerPresenceLogView(AsyncIotView):
+    async def post(self, request, *args, **kwargs):
+        await self.check_supervisor()
+        serializer = WorkerPresenceLogSerializer(data=self.parse())
+        serializer.is_valid(raise_exception=True)
+
+        supervisor = await Supervisor.objects.only('worker').aget(serial_number=self.serial_number)
+        if not supervisor.worker_id:
+            raise ValidationError({'detail': _('The IoT does not have assigned worker!')})
+        task_id = await TaskAppointment.objects.filter(is_done=False, worker_appointed=supervisor.worker_id) \
+            .values_list('task_appointed', flat=True).afirst()
+        if not task_id:
+            raise ValidationError({'detail': _('The assigned worker does not have task now!')})
+
+        await WorkerLogs.objects.acreate(worker_id=supervisor.worker_id, task_id=task_id, **serializer.validated_data)
+        return self.render(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class OfferCompanyView(viewsets.ModelViewSet, GenericViewSet):
+class OfferCompanyView(SparseFieldsetViewMixin, viewsets.ModelViewSet, GenericViewSet):
     queryset = Offer.objects.all()
     serializer_class = OfferSerializer
     permission_classes = [IsAuthenticated, IsCompany, ]
+    select_related_fields = {
+        'localized_created_at': ['company'],
+        'localized_last_changed': ['company'],
+    }
 
     def destroy(self, request, *args, **kwargs):
         obj = self.get_object()
@@ -0,0 +1,163 @@
+import hashlib
+import hmac
+
+import pytz
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import BasicAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from users.models import UserAccount
+
+BASIC_AUTH_CACHE_TIMEOUT = 5 * 60
+
+# Claims added to the tokens on login and refresh, see users.serializers.set_user_claims
+PRINCIPAL_CLAIMS = ('role', 'company_id', 'timezone')
+
+
+# Seconds a node may accept tokens of an older version after the change, while its cached version is current
+TOKEN_VERSION_CACHE_TIMEOUT = 60
+
+
+def get_token_version_cache_key(user_id):
+    return f'token-version:{user_id}'
+
+
+def get_token_version(user_id):
+    """
+    Current token_version of the account, None if it does not exist. The version is stored on the account,
+    the cache only saves the query of the following requests.
+    """
+    cache_key = get_token_version_cache_key(user_id)
+    version = cache.get(cache_key)
+    if version is None:
+        version = UserAccount.objects.filter(id=user_id).values_list('token_version', flat=True).first()
+        if version is not None:
+            cache.set(cache_key, version, TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def invalidate_token_version(user_id):
+    """
+    Drops the cached version once the transaction commits, so a concurrent read can not cache the old one again.
+    """
+    transaction.on_commit(lambda: cache.delete(get_token_version_cache_key(user_id)))
+
+
+def check_token_not_revoked(token):
+    """
+    Rejects tokens issued before the account was deactivated or its password or role changed,
+    because the claims of the principal are trusted otherwise.
+    """
+    version = get_token_version(token[api_settings.USER_ID_CLAIM])
+    if version is None or token.get('token_version', 0) != version:
+        raise AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+
+
+class Principal(TokenUser):
+    """
+    Authenticated user built from the access token claims, role checks, tenant filtering and localization
+    do not touch the database. The account and its company or worker are loaded lazily on first access,
+    any other attribute of the account falls back to the loaded model.
+    """
+
+    def __str__(self):
+        return str(self.id)
+
+    @cached_property
+    def username(self):
+        return self.account.username
+
+    @cached_property
+    def is_staff(self):
+        return self.account.is_staff
+
+    @cached_property
+    def is_superuser(self):
+        return self.account.is_superuser
+
+    @cached_property
+    def role(self):
+        return self.token['role']
+
+    @cached_property
+    def company_id(self):
+        return self.token['company_id']
+
+    def get_timezone(self):
+        return pytz.timezone(self.token['timezone'])
+
+    @cached_property
+    def account(self):
+        return UserAccount.objects.get(id=self.id)
+
+    @cached_property
+    def company(self):
+        return self.account.company
+
+    @cached_property
+    def worker(self):
+        return self.account.worker
+
+    def __getattr__(self, attr):
+        if attr.startswith('_') or attr == 'token':
+            raise AttributeError(attr)
+        return getattr(self.account, attr)
+
+
+class PrincipalJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that returns Principal instead of loading the user on every request.
+    Tokens issued before the principal claims existed still authenticate with the user model.
+    Instead of the account, only its cached token_version is checked, see check_token_not_revoked.
+    """
+
+    def get_user(self, validated_token):
+        check_token_not_revoked(validated_token)
+        if not all(claim in validated_token for claim in PRINCIPAL_CLAIMS):
+            return super().get_user(validated_token)
+        return Principal(validated_token)
+
+
+def get_basic_auth_cache_key(username, password):
+    digest = hmac.new(settings.SECRET_KEY.encode(), f'{len(username)}:{username}:{password}'.encode(),
+                      hashlib.sha256).hexdigest()
+    return f'basic-auth:{digest}'
+
+
+def get_password_fingerprint(user):
+    return salted_hmac('basic-auth-password', user.password, algorithm='sha256').hexdigest()
+
+
+def invalidate_basic_auth(username, password):
+    cache.delete(get_basic_auth_cache_key(username, password))
+
+
+class CachedBasicAuthentication(BasicAuthentication):
+    """
+    Basic authentication that remembers verified credentials for BASIC_AUTH_CACHE_TIMEOUT seconds,
+    so repeated requests of scripts and integrations do not run the password hasher every time.
+    Only a keyed hash of the credentials is used as the cache key. The entry holds the user id and
+    a fingerprint of the password hash, so it stops matching as soon as the password is changed.
+    """
+
+    def authenticate_credentials(self, userid, password, request=None):
+        cache_key = get_basic_auth_cache_key(userid, password)
+        cached = cache.get(cache_key)
+        if cached:
+            user_id, fingerprint = cached
+            user = UserAccount.objects.filter(id=user_id, is_active=True).first()
+            if user and constant_time_compare(get_password_fingerprint(user), fingerprint):
+                return user, None
+            cache.delete(cache_key)
+
+        user, auth = super().authenticate_credentials(userid, password, request)
+        cache.set(cache_key, (user.id, get_password_fingerprint(user)), BASIC_AUTH_CACHE_TIMEOUT)
+        return user, auth
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_alter_useraccount_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useraccount',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
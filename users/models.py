@@ -1,3 +1,5 @@
+import pytz
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils.translation import gettext_lazy as _
@@ -17,10 +19,31 @@ class UserAccount(AbstractUser):
         max_length=1,
         choices=USER_ROLES,
     )
+    # Tokens carry the version they were issued with, it is increased when the account is deactivated or its
+    # password or role changes, see users.signals
+    token_version = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.username
 
+    @property
+    def company_id(self):
+        """
+        Id of the company the user belongs to: own id of the company or employer id of the worker.
+        """
+        if self.role == 'C':
+            return self.id
+        if self.role == 'W':
+            return self.employer_id if hasattr(self, 'employer_id') else self.worker.employer_id
+        return None
+
+    def get_timezone(self):
+        if self.role == 'C':
+            return self.company.get_timezone()
+        if self.role == 'W':
+            return (self if hasattr(self, 'employer_id') else self.worker).employer.get_timezone()
+        return pytz.timezone(settings.TIME_ZONE)
+
 
 class TechSupportRequest(models.Model):
     STATUSES = [
@@ -8,3 +8,6 @@ class IsAdmin(permissions.BasePermission):
         return False
 
 
+class IsSuperUser(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_superuser)
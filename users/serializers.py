@@ -1,9 +1,13 @@
 from django.contrib.auth.password_validation import validate_password
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 
 from companies.models import Company
+from config.serializers import SparseFieldsetMixin
+from users.authentication import check_token_not_revoked, invalidate_basic_auth
 from users.models import UserAccount, TechSupportRequest
 from workers.models import Worker
 
@@ -14,7 +18,7 @@ class UserAccountSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class CompanyProfileSerializer(serializers.ModelSerializer):
+class CompanyProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     role = serializers.CharField(read_only=True)
 
     class Meta:
@@ -29,7 +33,7 @@ class CompanyProfileSerializer(serializers.ModelSerializer):
         ]
 
 
-class WorkerProfileSerializer(serializers.ModelSerializer):
+class WorkerProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     worker_qualification = serializers.CharField(read_only=True, source="qualification.name")
     worker_salary = serializers.IntegerField(read_only=True, source="salary")
     worker_day_start = serializers.TimeField(read_only=True, source="day_start")
@@ -67,8 +71,7 @@ class ChangePasswordSerializer(serializers.ModelSerializer):
         return attrs
 
     def validate_old_password(self, value):
-        user = self.context['request'].user
-        if not user.check_password(value):
+        if not self.instance.check_password(value):
             raise serializers.ValidationError(_("Old password is not correct"))
         return value
 
@@ -76,11 +79,12 @@ class ChangePasswordSerializer(serializers.ModelSerializer):
 
         instance.set_password(validated_data['password'])
         instance.save()
+        invalidate_basic_auth(instance.username, validated_data['old_password'])
 
         return instance
 
 
-class TechSupportRequestSerializer(serializers.ModelSerializer):
+class TechSupportRequestSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     admin_response = serializers.CharField(read_only=True)
     status = serializers.CharField(read_only=True, source='get_status_display')
     localized_created_at = serializers.SerializerMethodField(read_only=True)
@@ -97,22 +101,25 @@ class TechSupportRequestSerializer(serializers.ModelSerializer):
         ]
 
     def get_localized_created_at(self, obj):
-        if obj.user.role == 'C':
+        # Requests are listed to their author only, so they are localized to the timezone of the requester
+        if obj.user_id == self.context['request'].user.id:
+            localized_datetime = timezone.localtime(obj.time_created, self.context['request'].user.get_timezone())
+        elif obj.user.role == 'C':
             localized_datetime = timezone.localtime(obj.time_created, obj.user.company.get_timezone())
         elif obj.user.role == 'W':
-            localized_datetime = timezone.localtime(obj.time_created, obj.user.worker.emploer.get_timezone())
+            localized_datetime = timezone.localtime(obj.time_created, obj.user.worker.employer.get_timezone())
         else:
             localized_datetime = obj.time_created
 
         return localized_datetime.strftime('%Y-%m-%d %H:%M:%S')
 
     def create(self, validated_data):
-        if TechSupportRequest.objects.filter(user=self.context['request'].user, status='CR').count() >= 3:
+        if TechSupportRequest.objects.filter(user=self.context['request'].user.id, status='CR').count() >= 3:
             raise serializers.ValidationError({'detail': [_('You have too many unread requests!')]})
         return TechSupportRequest.objects.create(
             title=validated_data['title'],
             description=validated_data['description'],
-            user=self.context['request'].user,
+            user_id=self.context['request'].user.id,
         )
 
     def update(self, instance, validated_data):
@@ -132,3 +139,37 @@ class TechSupportRequestSerializer(serializers.ModelSerializer):
         instance.save()
 
         return instance
+
+
+def set_user_claims(token, user):
+    token['role'] = user.role
+    token['company_id'] = user.company_id
+    token['timezone'] = user.get_timezone().zone
+    token['token_version'] = user.token_version
+
+
+class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Issues tokens with the claims of users.authentication.Principal.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        set_user_claims(token, user)
+        return token
+
+
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Renews the principal claims from the account, so refreshed tokens follow role and timezone changes.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        check_token_not_revoked(refresh)
+        user = UserAccount.objects.filter(id=refresh[api_settings.USER_ID_CLAIM], is_active=True).first()
+        if user is None:
+            raise serializers.ValidationError({'refresh': [_('User not found or inactive!')]})
+        set_user_claims(refresh, user)
+        return super().validate({**attrs, 'refresh': str(refresh)})
@@ -1,4 +1,4 @@
-from django.db.models.signals import post_save, post_delete, post_init
+from django.db.models.signals import post_save, post_delete, post_init, pre_save
 from django.dispatch import receiver
 from django.core.mail import send_mail
 from django.urls import reverse
@@ -9,7 +9,13 @@ from django.urls import reverse
 from django_rest_passwordreset.signals import reset_password_token_created
 
 from config import settings
+from companies.models import Company
+from users.authentication import invalidate_token_version
 from users.models import UserAccount
+from workers.models import Worker
+
+# Changes of the account that end access with the tokens issued before them
+TOKEN_REVOKING_FIELDS = ('is_active', 'password', 'role')
 
 
 @receiver(reset_password_token_created)
@@ -25,3 +31,34 @@ def password_reset_token_created(sender, instance, reset_password_token, *args,
         "noreply@somehost.local",
         [reset_password_token.user.email]
     )
+
+
+@receiver(pre_save, sender=UserAccount)
+@receiver(pre_save, sender=Company)
+@receiver(pre_save, sender=Worker)
+def account_credentials_changing(sender, instance=None, raw=False, update_fields=None, **kwargs):
+    instance._token_version_changed = False
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(TOKEN_REVOKING_FIELDS):
+        return
+    previous = UserAccount.objects.filter(pk=instance.pk).values('token_version', *TOKEN_REVOKING_FIELDS).first()
+    if previous is None:
+        return
+    # An instance loaded before the last change must not bring the old version back
+    instance.token_version = previous['token_version']
+    if any(previous[field] != getattr(instance, field) for field in TOKEN_REVOKING_FIELDS):
+        instance.token_version += 1
+        instance._token_version_changed = True
+
+
+@receiver(post_save, sender=UserAccount)
+@receiver(post_save, sender=Company)
+@receiver(post_save, sender=Worker)
+def account_credentials_changed(sender, instance=None, update_fields=None, **kwargs):
+    if not getattr(instance, '_token_version_changed', False):
+        return
+    instance._token_version_changed = False
+    if update_fields is not None and 'token_version' not in update_fields:
+        UserAccount.objects.filter(pk=instance.pk).update(token_version=instance.token_version)
+    invalidate_token_version(instance.pk)
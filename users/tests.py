@@ -1,3 +1,131 @@
-from django.test import TestCase
+import base64
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from rest_framework import authentication
+
+from companies.models import Company
+from config.testing import QueryBudgetTestCase, TenantTestCase
+from users.authentication import get_basic_auth_cache_key
+from users.models import TechSupportRequest
+from users.serializers import UserTokenObtainPairSerializer
+from workers.models import Worker
+
+
+class UserQueryBudgetTests(QueryBudgetTestCase):
+    def test_profile(self):
+        for user in ('company', 'worker'):
+            self.assertQueryBudget(1, '/api/profile/', user=user)
+
+    def test_tech_support_requests(self):
+        for user in ('company', 'worker'):
+            self.assertQueryBudget(1, '/api/user/tech-support/', user=user)
+            self.assertQueryBudget(1, lambda tenant: f'/api/user/tech-support/{TechSupportRequest.objects.filter(user=getattr(tenant, user)).first().id}/',
+                                   user=user)
+
+
+class TokenRevocationTests(TenantTestCase):
+    def get(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return self.client.get('/api/profile/')
+
+    def test_deactivated_user(self):
+        worker = self.tenant.worker
+        token = UserTokenObtainPairSerializer.get_token(worker).access_token
+        self.assertEqual(self.get(token).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            worker.is_active = False
+            worker.save()
+        self.assertEqual(self.get(token).status_code, 401)
+
+    def test_password_change(self):
+        worker = self.tenant.worker
+        refresh = UserTokenObtainPairSerializer.get_token(worker)
+        with self.captureOnCommitCallbacks(execute=True):
+            worker.set_password('An0ther-password')
+            worker.save(update_fields=['password'])
+        self.assertEqual(self.get(refresh.access_token).status_code, 401)
+        response = self.client.post('/api/token/refresh/', {'refresh': str(refresh)})
+        self.assertEqual(response.status_code, 401)
+
+        # Tokens issued right after the change, in the same second as well, are valid
+        refresh = UserTokenObtainPairSerializer.get_token(Worker.objects.get(id=worker.id))
+        self.assertEqual(self.get(refresh.access_token).status_code, 200)
+        response = self.client.post('/api/token/refresh/', {'refresh': str(refresh)})
+        self.assertEqual(self.get(response.json()['access']).status_code, 200)
+
+    def test_revocation_is_stored_on_account(self):
+        company = self.tenant.company
+        token = UserTokenObtainPairSerializer.get_token(company).access_token
+        stale_company = Company.objects.get(id=company.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            company.role = 'A'
+            company.save()
+        # Neither a lost cache entry nor a save of an instance loaded before the change accept the token again
+        cache.clear()
+        self.assertEqual(self.get(token).status_code, 401)
+        stale_company.save()
+        self.assertEqual(self.get(token).status_code, 401)
+
+    def test_other_changes(self):
+        company = self.tenant.company
+        token = UserTokenObtainPairSerializer.get_token(company).access_token
+        company.email = 'changed@example.com'
+        company.save()
+        with self.assertNumQueries(1):
+            company.name = 'Renamed'
+            company.save(update_fields=['name'])
+        with self.assertNumQueries(1):
+            TechSupportRequest.objects.create(title='Request', description='Description', user=company)
+        self.assertEqual(self.get(token).status_code, 200)
+
+
+class CachedBasicAuthenticationTests(TenantTestCase):
+    password = 'Str0ng-pass-1'
+
+    def setUp(self):
+        super().setUp()
+        self.worker = Worker.objects.get(id=self.tenant.worker.id)
+        self.worker.set_password(self.password)
+        self.worker.save()
+
+    def get(self, password=None):
+        credentials = base64.b64encode(f'{self.worker.username}:{password or self.password}'.encode()).decode()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Basic {credentials}')
+        return self.client.get('/api/profile/')
+
+    def test_cache_hit(self):
+        with mock.patch.object(authentication, 'authenticate', wraps=authentication.authenticate) as authenticate:
+            self.assertEqual(self.get().status_code, 200)
+            self.assertEqual(self.get().status_code, 200)
+        # The password is verified by the hasher only once
+        self.assertEqual(authenticate.call_count, 1)
+
+    def test_password_change(self):
+        self.assertEqual(self.get().status_code, 200)
+        response = self.client.put('/api/change_password/', {'old_password': self.password,
+                                                              'password': 'An0ther-pass-2', 'password2': 'An0ther-pass-2'})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertIsNone(cache.get(get_basic_auth_cache_key(self.worker.username, self.password)))
+        self.assertEqual(self.get().status_code, 401)
+        self.assertEqual(self.get('An0ther-pass-2').status_code, 200)
+
+    def test_password_changed_elsewhere(self):
+        self.assertEqual(self.get().status_code, 200)
+        # The cached entry stays, but the fingerprint of the password no longer matches
+        self.worker.set_password('An0ther-pass-2')
+        self.worker.save()
+        self.assertIsNotNone(cache.get(get_basic_auth_cache_key(self.worker.username, self.password)))
+        self.assertEqual(self.get().status_code, 401)
+        self.assertIsNone(cache.get(get_basic_auth_cache_key(self.worker.username, self.password)))
+
+    def test_deactivated_user(self):
+        self.assertEqual(self.get().status_code, 200)
+        self.worker.is_active = False
+        self.worker.save()
+        self.assertEqual(self.get().status_code, 401)
+
+    def test_wrong_password(self):
+        self.assertEqual(self.get('Wr0ng-pass').status_code, 401)
+        self.assertIsNone(cache.get(get_basic_auth_cache_key(self.worker.username, 'Wr0ng-pass')))
@@ -49,7 +49,7 @@ class ProfileView(generics.RetrieveUpdateAPIView):
         if self.request.user.role == 'C':
             return Company
         if self.request.user.role == 'W':
-            return Worker
+            return Worker.objects.select_related('qualification')
 
     def get_serializer_class(self):
         if self.request.user.role == 'C':
@@ -75,5 +75,5 @@ class TechSupportRequestView(viewsets.ModelViewSet, GenericViewSet):
 
     def get_queryset(self):
         qs = super().get_queryset()
-        return qs.filter(user=self.request.user)
+        return qs.filter(user=self.request.user.id)
 
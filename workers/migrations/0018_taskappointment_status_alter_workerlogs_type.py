@@ -13,7 +13,8 @@ class Migration(migrations.Migration):
         migrations.AddField(
             model_name='taskappointment',
             name='status',
-            field=models.CharField(blank=True, default='', null=True),
+            # Was a CharField without max_length, which only PostgreSQL supports, see 0026
+            field=models.TextField(blank=True, default='', null=True),
         ),
         migrations.AlterField(
             model_name='workerlogs',
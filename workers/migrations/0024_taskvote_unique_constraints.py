@@ -0,0 +1,51 @@
+# Generated by Django 4.2 on 2026-10-19 18:14
+
+import logging
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+logger = logging.getLogger(__name__)
+
+
+def remove_duplicate_votes(apps, schema_editor):
+    """
+    The old unique_together allowed a worker to vote for a task or give a score more than once in a voting,
+    only the latest of such votes is kept so the constraints can be created. Removed votes are logged.
+    """
+    TaskVote = apps.get_model('workers', 'TaskVote')
+    for fields in (('worker', 'voting', 'task'), ('worker', 'voting', 'score')):
+        duplicates = TaskVote.objects.values(*fields).annotate(latest_id=Max('id'), count=Count('id')) \
+            .filter(count__gt=1).order_by()
+        removed = []
+        for duplicate in duplicates.iterator():
+            votes = TaskVote.objects.filter(**{field: duplicate[field] for field in fields}) \
+                .exclude(id=duplicate['latest_id'])
+            removed.extend(votes.values_list('id', 'worker_id', 'voting_id', 'task_id', 'score'))
+            votes.delete()
+        if removed:
+            logger.warning("Removed %d duplicate votes of the same (%s), (id, worker, voting, task, score): %s",
+                           len(removed), ', '.join(fields), removed)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workers', '0023_alter_taskvote_voting'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_votes, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='taskvote',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='taskvote',
+            constraint=models.UniqueConstraint(fields=('worker', 'voting', 'task'), name='unique_worker_voting_task'),
+        ),
+        migrations.AddConstraint(
+            model_name='taskvote',
+            constraint=models.UniqueConstraint(fields=('worker', 'voting', 'score'), name='unique_worker_voting_score'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2 on 2026-10-19 18:17
+
+from django.db import migrations, models
+
+
+def fill_voting_tallies(apps, schema_editor):
+    TaskVote = apps.get_model('workers', 'TaskVote')
+    TaskVotingTally = apps.get_model('companies', 'TaskVotingTally')
+
+    votes = list(TaskVote.objects.select_related('worker__qualification'))
+    tallies = {}
+    for vote in votes:
+        vote.weight = vote.worker.qualification.modifier * (vote.worker.productivity or 0)
+        tally = tallies.setdefault((vote.voting_id, vote.task_id), [0, 0.0])
+        tally[0] += vote.score
+        tally[1] += vote.score * vote.weight
+    TaskVote.objects.bulk_update(votes, ['weight'], batch_size=1000)
+    TaskVotingTally.objects.bulk_create([
+        TaskVotingTally(voting_id=voting_id, task_id=task_id, raw_score_sum=raw_score_sum, weighted_score=weighted_score)
+        for (voting_id, task_id), (raw_score_sum, weighted_score) in tallies.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0009_taskvotingtally'),
+        ('workers', '0024_taskvote_unique_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskvote',
+            name='weight',
+            field=models.FloatField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_voting_tallies, migrations.RunPython.noop),
+    ]
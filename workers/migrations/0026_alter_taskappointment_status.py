@@ -0,0 +1,22 @@
+# Generated by Django 4.2 on 2026-10-19 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Unlimited varchar of the status becomes text, the same on PostgreSQL and supported by other databases.
+    Databases migrated before 0018 was changed get the new type here.
+    """
+
+    dependencies = [
+        ('workers', '0025_taskvote_weight'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='taskappointment',
+            name='status',
+            field=models.TextField(blank=True, default='', null=True),
+        ),
+    ]
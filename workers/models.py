@@ -1,6 +1,6 @@
 import datetime
 import pytz
-from django.db import models
+from django.db import connections, models, router
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
@@ -31,7 +31,7 @@ class Worker(UserAccount):
 
         dates_on_task = [time_start + datetime.timedelta(days=i) for i in range(time_diff.days + 1)]
         print(dates_on_task)
-        worker_schedule = WorkerSchedule.objects.get(worker=self)
+        worker_schedule = self.schedule
         for date in dates_on_task:
             if worker_schedule.is_weekend(date):
                 approx_finsh_date += datetime.timedelta(days=1)
@@ -39,6 +39,8 @@ class Worker(UserAccount):
         return approx_finsh_date
 
     def count_remaining_working_hours(self):
+        if hasattr(self, 'week_estimate_hours'):
+            return self.working_hours - self.week_estimate_hours
         today = timezone.now()
         last_monday = today - datetime.timedelta(days=today.weekday())
         appointments = TaskAppointment.objects.filter(worker_appointed=self, time_start__gte=last_monday)
@@ -50,6 +52,31 @@ class Worker(UserAccount):
     def __str__(self):
         return f"{self.first_name} {self.last_name}({self.username})"
 
+    @classmethod
+    def bulk_create(cls, workers, batch_size=1000):
+        """
+        Inserts workers with bulk queries, which QuerySet.bulk_create does not support for multi-table inheritance:
+        account rows first, then worker rows with their ids. Signals are not sent, schedules are not created.
+        """
+        parent_fields = [field for field in UserAccount._meta.concrete_fields if not field.primary_key]
+        accounts = UserAccount.objects.bulk_create([
+            UserAccount(**{field.attname: getattr(worker, field.attname) for field in parent_fields})
+            for worker in workers
+        ], batch_size=batch_size)
+        for worker, account in zip(workers, accounts):
+            worker.id = account.pk
+            worker.useraccount_ptr_id = account.pk
+
+        fields = cls._meta.local_concrete_fields
+        connection = connections[router.db_for_write(cls)]
+        batch_size = min(batch_size, connection.ops.bulk_batch_size(fields, workers) or batch_size)
+        for start in range(0, len(workers), batch_size):
+            cls._base_manager._insert(workers[start:start + batch_size], fields=fields)
+        for worker in workers:
+            worker._state.adding = False
+            worker._state.db = connection.alias
+        return workers
+
 
 class WorkerLogs(models.Model):
     LOG_TYPES = [
@@ -121,7 +148,7 @@ class TaskAppointment(models.Model):
     time_start = models.DateTimeField(auto_now_add=True, null=False)
     time_end = models.DateTimeField(null=True, blank=True)
     deadline = models.DateTimeField(null=False)
-    status = models.CharField(default="", null=True, blank=True)
+    status = models.TextField(default="", null=True, blank=True)
 
     task_appointed = models.OneToOneField(Task, on_delete=models.CASCADE, null=False, related_name='task_appointment')
     worker_appointed = models.ForeignKey(Worker, on_delete=models.CASCADE, null=False)
@@ -149,7 +176,7 @@ class TaskAppointment(models.Model):
             days_on_task = time_end.day - time_start.day
 
             dates_on_task = [time_start + datetime.timedelta(days=i) for i in range(task_timediff.days + 1)]
-            worker_schedule = WorkerSchedule.objects.get(worker=self.worker_appointed)
+            worker_schedule = self.worker_appointed.schedule
             for date in dates_on_task:
                 if worker_schedule.is_weekend(date) and days_on_task != 0:
                     days_on_task -= 1
@@ -204,6 +231,18 @@ class TaskVote(models.Model):
 
     voting = models.ForeignKey(TaskVoting, on_delete=models.CASCADE, null=False, related_name='votes')
     worker = models.ForeignKey(Worker, on_delete=models.CASCADE, null=False)
+    weight = models.FloatField(null=True, editable=False)
 
     class Meta:
-        unique_together = ('worker', 'task', 'voting', 'score')
+        constraints = [
+            models.UniqueConstraint(fields=['worker', 'voting', 'task'], name='unique_worker_voting_task'),
+            models.UniqueConstraint(fields=['worker', 'voting', 'score'], name='unique_worker_voting_score'),
+        ]
+
+    @staticmethod
+    def get_worker_weight(worker):
+        """
+        Weight of the worker vote: qualification modifier * productivity.
+        It is stored on the vote when it is cast and is not recomputed when the worker changes later.
+        """
+        return worker.qualification.modifier * (worker.productivity or 0)
@@ -1,15 +1,17 @@
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.password_validation import validate_password
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from rest_framework import serializers
 from django.utils.translation import gettext_lazy as _
 
-from companies.models import TaskVoting
+from companies.models import TaskVoting, TaskVotingTally
 from companies.serializers import TaskSerializer
+from config.serializers import SparseFieldsetMixin
 from workers.models import TaskAppointment, WorkerLogs, WorkerTaskComment, TaskVote
 
 
-class WorkerTaskCommentSerializer(serializers.ModelSerializer):
+class WorkerTaskCommentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     time_created = serializers.DateTimeField(read_only=True)
     username = serializers.CharField(read_only=True, source='user.username')
 
@@ -26,7 +28,7 @@ class WorkerTaskCommentSerializer(serializers.ModelSerializer):
     def validate(self, data):
         if data.get('task_appointment') and not TaskAppointment.objects.filter(id=data.get('task_appointment').id,
                                                                                worker_appointed=self.context[
-                                                                                   'request'].user.worker):
+                                                                                   'request'].user.id):
             raise serializers.ValidationError({'task_appointment': [
                 _('The task_appointment does not exist or does not belong to your!')
             ]})
@@ -39,7 +41,7 @@ class WorkerTaskCommentSerializer(serializers.ModelSerializer):
                 'task_appointment') != instance.task_appointment:
             errors.update({'task_appointment': [_('You can not change task for comment!')]})
 
-        if self.context['request'].user != instance.user:
+        if self.context['request'].user.id != instance.user_id:
             errors.update({'user': [_('You can not change another people comments!')]})
 
         if errors:
@@ -54,11 +56,11 @@ class WorkerTaskCommentSerializer(serializers.ModelSerializer):
         return WorkerTaskComment.objects.create(
             text=validated_data['text'],
             task_appointment=validated_data['task_appointment'],
-            user=self.context['request'].user
+            user_id=self.context['request'].user.id
         )
 
 
-class TaskDoneSerializer(serializers.ModelSerializer):
+class TaskDoneSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 
     task_title = serializers.CharField(read_only=True, source="task_appointed.title")
     task_description = serializers.CharField(read_only=True, source="task_appointed.description")
@@ -120,7 +122,7 @@ class TaskDoneSerializer(serializers.ModelSerializer):
 
 
 
-class WorkersLogSerializer(serializers.ModelSerializer):
+class WorkersLogSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     localized_datetime = serializers.SerializerMethodField()
 
     class Meta:
@@ -139,7 +141,7 @@ class WorkersLogSerializer(serializers.ModelSerializer):
         return localized_datetime.strftime('%Y-%m-%d %H:%M:%S')
 
 
-class VoteSerializer(serializers.ModelSerializer):
+class VoteSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = TaskVote
         fields = [
@@ -150,15 +152,14 @@ class VoteSerializer(serializers.ModelSerializer):
         ]
 
     def validate(self, data):
-        worker = self.context['request'].user.worker
         errors = {}
-        if data['task'] not in data['voting'].voting_tasks.all():
+        if not data['voting'].voting_tasks.filter(id=data['task'].id).exists():
             errors.update({'task': ['You can not vote for this task in this voting!']})
 
-        if data['voting'].company != worker.employer:
+        if data['voting'].company_id != self.context['request'].user.company_id:
             errors.update({'voting': ['You can not vote in voting other company voting!']})
 
-        if not data['voting'].is_active:
+        if not data['voting'].is_active or data['voting'].deadline <= timezone.now():
             errors.update({'voting': ['Voting already ended!']})
 
         if data['voting'].max_score < data['score'] or data['score'] < data['voting'].min_score:
@@ -170,40 +171,108 @@ class VoteSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
-        worker = self.context['request'].user.worker
-        if TaskVote.objects.filter(task=validated_data['task'],
-                                   voting=validated_data['voting'],
-                                   worker=worker).exists():
-            raise serializers.ValidationError({'worker': ['You have already voted!']})
-        if TaskVote.objects.filter(score=validated_data['score'],
-                                   voting=validated_data['voting'],
-                                   worker=worker).exists():
-            raise serializers.ValidationError({'worker': ['You have already voted with this score!']})
-        return TaskVote.objects.create(
-            task=validated_data["task"],
-            score=validated_data["score"],
-            voting=validated_data["voting"],
-            worker=self.context['request'].user.worker
-        )
+        try:
+            with transaction.atomic():
+                return TaskVote.objects.create(
+                    task=validated_data["task"],
+                    score=validated_data["score"],
+                    voting=validated_data["voting"],
+                    worker_id=self.context['request'].user.id
+                )
+        except IntegrityError:
+            raise self.get_duplicate_vote_error(validated_data)
 
     def update(self, instance, validated_data):
-        worker = self.context['request'].user.worker
         if validated_data.get("task") and instance.task != validated_data.get("task"):
             raise serializers.ValidationError({'task': ['You can not edit task field!']})
         if validated_data.get("voting") and instance.voting != validated_data.get("voting"):
             raise serializers.ValidationError({'task': ['You can not edit voting field!']})
-        if TaskVote.objects.filter(score=validated_data['score'],
-                                   voting=validated_data['voting'],
-                                   worker=worker).exclude(id=instance.id).exists():
-            raise serializers.ValidationError({'worker': ['You have already voted with this score!']})
 
         instance.score = validated_data["score"] or instance.score
-        instance.save()
+        try:
+            with transaction.atomic():
+                instance.save()
+        except IntegrityError:
+            raise serializers.ValidationError({'worker': ['You have already voted with this score!']})
 
         return instance
 
+    def get_duplicate_vote_error(self, validated_data):
+        """
+        Uniqueness of votes is guarded by the database constraints, this only finds out which one was violated.
+        """
+        if TaskVote.objects.filter(task=validated_data['task'],
+                                   voting=validated_data['voting'],
+                                   worker=self.context['request'].user.id).exists():
+            return serializers.ValidationError({'worker': ['You have already voted!']})
+        return serializers.ValidationError({'worker': ['You have already voted with this score!']})
+
+
+class BallotVoteSerializer(serializers.Serializer):
+    task = serializers.IntegerField()
+    score = serializers.IntegerField()
+
+
+class BallotSerializer(serializers.Serializer):
+    """
+    Whole ballot of the worker in the voting, validated in memory and saved in one transaction.
+    Voting is passed in context, its voting_tasks are expected to be prefetched.
+    """
+    votes = BallotVoteSerializer(many=True, allow_empty=False)
+
+    def validate_votes(self, value):
+        voting = self.context['voting']
+        voting_task_ids = {task.id for task in voting.voting_tasks.all()}
+        seen_tasks = set()
+        seen_scores = set()
+        errors = []
+
+        for vote in value:
+            vote_errors = {}
+            if vote['task'] not in voting_task_ids:
+                vote_errors.update({'task': ['You can not vote for this task in this voting!']})
+            elif vote['task'] in seen_tasks:
+                vote_errors.update({'task': ['You have already voted for this task!']})
+            if voting.max_score < vote['score'] or vote['score'] < voting.min_score:
+                vote_errors.update({'score': [f'Your score is not in scoring range! (min: {voting.min_score} max: {voting.max_score})']})
+            elif vote['score'] in seen_scores:
+                vote_errors.update({'score': ['You have already voted with this score!']})
+            seen_tasks.add(vote['task'])
+            seen_scores.add(vote['score'])
+            errors.append(vote_errors)
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        return value
+
+    def validate(self, data):
+        voting = self.context['voting']
+        if not voting.is_active or voting.deadline <= timezone.now():
+            raise serializers.ValidationError({'voting': ['Voting already ended!']})
 
-class GetVotingSerializer(serializers.ModelSerializer):
+        return data
+
+    def create(self, validated_data):
+        voting = self.context['voting']
+        worker = self.context['request'].user.worker
+        weight = TaskVote.get_worker_weight(worker)
+        try:
+            with transaction.atomic():
+                TaskVote.objects.filter(voting=voting, worker=worker.id).delete()
+                votes = TaskVote.objects.bulk_create([
+                    TaskVote(task_id=vote['task'], score=vote['score'], voting=voting, worker_id=worker.id, weight=weight)
+                    for vote in validated_data['votes']
+                ])
+                # bulk_create does not send post_save, so the tally is updated here
+                for vote in votes:
+                    TaskVotingTally.add_vote(voting.id, vote.task_id, vote.score, weight)
+                return votes
+        except IntegrityError:
+            raise serializers.ValidationError({'worker': ['Your ballot was changed by another request, try again!']})
+
+
+class GetVotingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     voting_tasks = serializers.SerializerMethodField(read_only=True)
     voting_winner = serializers.SerializerMethodField(read_only=True)
 
@@ -224,10 +293,14 @@ class GetVotingSerializer(serializers.ModelSerializer):
 
     def get_voting_tasks(self, obj):
         tasks = obj.voting_tasks.all()
+        worker_votes = getattr(obj, 'worker_votes', None)
+        if worker_votes is None:
+            worker_votes = TaskVote.objects.filter(voting=obj, worker=self.context['request'].user.id)
+        user_votes = {vote.task_id: vote for vote in worker_votes}
         result = []
 
         for task in tasks:
-            user_vote = TaskVote.objects.filter(task=task, voting=obj, worker=self.context['request'].user.worker).first()
+            user_vote = user_votes.get(task.id)
             if user_vote:
                 result.append({"id": task.id, "title": task.title, "score": user_vote.score, "user_vote_id": user_vote.id})
             else:
@@ -237,18 +310,8 @@ class GetVotingSerializer(serializers.ModelSerializer):
 
     def get_voting_winner(self, obj):
         if not obj.is_active:
-            tasks = obj.voting_tasks.all()
-            votes = obj.votes.all()
-            winner = ["", 0]
-            for task in tasks:
-                score = 0
-                for vote in votes:
-                    if vote.task == task:
-                        expertness = vote.worker.qualification.modifier * vote.worker.productivity
-                        score += vote.score * expertness
-                if winner[1] < score:
-                    winner = [task.title, score]
-
-            return winner[0]
+            if obj.results_snapshot is not None:
+                return obj.results_snapshot["winner"]
+            return obj.get_voting_results(with_votes=False)["winner"]
 
         return "There are no winner at that time!"
@@ -1,7 +1,8 @@
-from django.db.models.signals import post_save, post_delete, post_init
+from django.db.models.signals import post_save, post_delete, post_init, pre_save
 from django.dispatch import receiver
 
-from workers.models import TaskAppointment, WorkerLogs, Worker, WorkerSchedule
+from companies.models import TaskVotingTally
+from workers.models import TaskAppointment, WorkerLogs, Worker, WorkerSchedule, TaskVote
 
 
 @receiver(post_save, sender=TaskAppointment)
@@ -27,3 +28,28 @@ def task_done_log(sender, instance=None, created=True, **kwargs):
 def worker_created(sender, instance=None, created=True, **kwargs):
     if created:
         WorkerSchedule.objects.create(worker=instance)
+
+
+@receiver(pre_save, sender=TaskVote)
+def task_vote_weight(sender, instance=None, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.weight is None:
+        instance.weight = TaskVote.get_worker_weight(instance.worker)
+    instance._previous_vote = TaskVote.objects.filter(id=instance.id).values(
+        'voting_id', 'task_id', 'score', 'weight').first() if instance.id else None
+
+
+@receiver(post_save, sender=TaskVote)
+def task_vote_tally(sender, instance=None, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_vote', None)
+    if previous:
+        TaskVotingTally.remove_vote(previous['voting_id'], previous['task_id'], previous['score'], previous['weight'] or 0)
+    TaskVotingTally.add_vote(instance.voting_id, instance.task_id, instance.score, instance.weight)
+
+
+@receiver(post_delete, sender=TaskVote)
+def task_vote_deleted_tally(sender, instance=None, **kwargs):
+    TaskVotingTally.remove_vote(instance.voting_id, instance.task_id, instance.score, instance.weight or 0)
@@ -1,3 +1,133 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.db import IntegrityError
+
+from companies.models import TaskVotingTally
+from config.testing import QueryBudgetTestCase, TenantTestCase
+from workers.models import WorkerLogs, WorkerTaskComment, TaskVote
+
+
+class WorkerQueryBudgetTests(QueryBudgetTestCase):
+    def test_tasks(self):
+        self.assertQueryBudget(2, '/api/worker/tasks/', user='worker')
+        self.assertQueryBudget(2, lambda tenant: f'/api/worker/tasks/{tenant.appointments[0].id}/', user='worker')
+
+    def test_logs(self):
+        self.assertQueryBudget(1, '/api/worker/logs/', user='worker')
+        self.assertQueryBudget(1, lambda tenant: f'/api/worker/logs/{WorkerLogs.objects.filter(worker=tenant.worker).first().id}/',
+                               user='worker')
+
+    def test_comments(self):
+        self.assertQueryBudget(1, '/api/worker/comment-task/', user='worker')
+        self.assertQueryBudget(1, lambda tenant: f'/api/worker/comment-task/{WorkerTaskComment.objects.filter(user=tenant.worker).first().id}/',
+                               user='worker')
+        self.assertQueryBudget(1, lambda tenant: f'/api/worker/task/{tenant.appointments[0].id}/comments/', user='worker')
+
+    def test_votes(self):
+        self.assertQueryBudget(1, '/api/worker/vote/', user='worker')
+        self.assertQueryBudget(1, lambda tenant: f'/api/worker/vote/{TaskVote.objects.filter(worker=tenant.worker).first().id}/',
+                               user='worker')
+
+    def test_votings(self):
+        self.assertQueryBudget(3, '/api/worker/voting/', user='worker')
+        self.assertQueryBudget(3, lambda tenant: f'/api/worker/voting/{tenant.votings[0].id}/', user='worker')
+
+
+class BallotTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.worker = self.tenant.worker
+        self.worker.productivity = 1.5
+        self.worker.save(update_fields=['productivity'])
+        self.voting = self.tenant.votings[0]
+        self.task_ids = [task.id for task in self.voting.voting_tasks.order_by('id')]
+        self.authenticate(self.worker)
+
+    def ballot(self, votes, voting=None):
+        return self.client.post(f'/api/worker/voting/{(voting or self.voting).id}/ballot/', {'votes': votes},
+                                format='json')
+
+    def get_tallies(self):
+        return {tally.task_id: (tally.raw_score_sum, tally.weighted_score)
+                for tally in TaskVotingTally.objects.filter(voting=self.voting)}
+
+    def test_invalid_ballot(self):
+        other_task = self.tenant.tasks[0]
+        response = self.ballot([{'task': self.task_ids[0], 'score': 1},
+                                {'task': self.task_ids[0], 'score': 1},
+                                {'task': other_task.id, 'score': self.voting.max_score + 1}])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['votes']
+        self.assertEqual(errors[0], {})
+        self.assertEqual(set(errors[1]), {'task', 'score'})
+        self.assertEqual(set(errors[2]), {'task', 'score'})
+
+        self.assertEqual(self.ballot([]).status_code, 400)
+        closed_voting = self.tenant.votings[1]
+        response = self.ballot([{'task': self.task_ids[0], 'score': 1}], voting=closed_voting)
+        self.assertEqual(response.json(), {'voting': ['Voting already ended!']})
+        # Nothing is changed by rejected ballots
+        self.assertEqual(TaskVote.objects.filter(worker=self.worker, voting=self.voting).count(), len(self.task_ids))
+
+    def test_ballot_replaces_votes(self):
+        previous_votes = {vote.task_id: (vote.score, vote.weight)
+                          for vote in TaskVote.objects.filter(worker=self.worker, voting=self.voting)}
+        tallies = self.get_tallies()
+        ballot = [{'task': self.task_ids[0], 'score': len(self.task_ids)}, {'task': self.task_ids[-1], 'score': 1}]
+
+        response = self.ballot(ballot)
+        self.assertEqual(response.status_code, 201, response.content)
+        votes = TaskVote.objects.filter(worker=self.worker, voting=self.voting)
+        self.assertEqual({(vote.task_id, vote.score) for vote in votes}, {(vote['task'], vote['score']) for vote in ballot})
+        # The weight is taken from the worker when the ballot is cast
+        self.assertEqual({vote.weight for vote in votes}, {TaskVote.get_worker_weight(self.worker)})
+
+        new_scores = {vote['task']: vote['score'] for vote in ballot}
+        weight = TaskVote.get_worker_weight(self.worker)
+        for task_id, (raw_score_sum, weighted_score) in self.get_tallies().items():
+            old_score, old_weight = previous_votes[task_id]
+            new_score = new_scores.get(task_id, 0)
+            self.assertEqual(raw_score_sum, tallies[task_id][0] - old_score + new_score)
+            self.assertAlmostEqual(weighted_score, tallies[task_id][1] - old_score * old_weight + new_score * weight)
+
+    def test_concurrent_ballot(self):
+        with mock.patch.object(TaskVote.objects, 'bulk_create', side_effect=IntegrityError):
+            response = self.ballot([{'task': self.task_ids[0], 'score': 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'worker': ['Your ballot was changed by another request, try again!']})
+        # The deletion of the previous votes is rolled back as well
+        self.assertEqual(TaskVote.objects.filter(worker=self.worker, voting=self.voting).count(), len(self.task_ids))
+
+
+class VotingTallyTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.vote = TaskVote.objects.filter(voting=self.tenant.votings[0], worker=self.tenant.worker).first()
+        self.vote.weight = 2
+        self.vote.save()
+
+    def get_tally(self, task_id):
+        tally = TaskVotingTally.objects.filter(voting=self.vote.voting_id, task=task_id).first()
+        return (tally.raw_score_sum, tally.weighted_score) if tally else None
+
+    def test_updated_vote(self):
+        task_id, score = self.vote.task_id, self.vote.score
+        raw_score_sum, weighted_score = self.get_tally(task_id)
+
+        self.vote.score = 100
+        self.vote.save()
+        self.assertEqual(self.get_tally(task_id), (raw_score_sum - score + 100, weighted_score - score * 2 + 100 * 2))
+
+        # Moved to a task without votes in the voting
+        other_task = self.tenant.tasks[0]
+        self.assertIsNone(self.get_tally(other_task.id))
+        self.vote.task = other_task
+        self.vote.save()
+        self.assertEqual(self.get_tally(task_id), (raw_score_sum - score, weighted_score - score * 2))
+        self.assertEqual(self.get_tally(other_task.id), (100, 100 * 2))
+
+    def test_deleted_vote(self):
+        raw_score_sum, weighted_score = self.get_tally(self.vote.task_id)
+        self.vote.delete()
+        self.assertEqual(self.get_tally(self.vote.task_id),
+                         (raw_score_sum - self.vote.score, weighted_score - self.vote.score * 2))
@@ -1,22 +1,39 @@
+from django.db.models import Prefetch
 from django.shortcuts import render
 from django_filters import DateTimeFromToRangeFilter, DateFilter
 from rest_framework import generics, viewsets, status, mixins
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 from django_filters.rest_framework import DjangoFilterBackend, FilterSet
 
 from companies.models import TaskVoting
 from companies.views import LogFilter, CustomStandartPagination
+from config.views import ReplicaReadViewMixin, SparseFieldsetViewMixin
 from workers.models import TaskAppointment, WorkerLogs, WorkerTaskComment, TaskVote
 from workers.permission import IsWorker
 from workers.serializers import TaskDoneSerializer, WorkersLogSerializer, WorkerTaskCommentSerializer, VoteSerializer, \
-    GetVotingSerializer
+    GetVotingSerializer, BallotSerializer
 
 
-class TaskDoneView(mixins.UpdateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericViewSet):
+class TaskDoneView(SparseFieldsetViewMixin, mixins.UpdateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin,
+                   GenericViewSet):
     queryset = TaskAppointment.objects.all()
     serializer_class = TaskDoneSerializer
     permission_classes = [IsAuthenticated, IsWorker, ]
+    select_related_fields = {
+        'task_title': ['task_appointed'],
+        'task_description': ['task_appointed'],
+        'task_is_done': ['task_appointed'],
+        'task_estimate_hours': ['task_appointed'],
+        'deadline': ['worker_appointed__employer'],
+        'time_start': ['worker_appointed__employer'],
+        'time_end': ['worker_appointed__employer'],
+    }
+    prefetch_related_fields = {
+        'comments': [Prefetch('comments', queryset=WorkerTaskComment.objects.select_related('user'))],
+    }
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['is_done', ]
 
@@ -34,10 +51,14 @@ class WorkerLogFilter(FilterSet):
         fields = ['type', 'datetime', 'date']
 
 
-class WorkersLogView(mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericViewSet):
+class WorkersLogView(ReplicaReadViewMixin, SparseFieldsetViewMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin,
+                     GenericViewSet):
     queryset = WorkerLogs.objects.all()
     serializer_class = WorkersLogSerializer
     permission_classes = [IsAuthenticated, IsWorker, ]
+    select_related_fields = {
+        'localized_datetime': ['worker__employer'],
+    }
     filter_backends = [DjangoFilterBackend]
     filterset_class = WorkerLogFilter
 
@@ -46,20 +67,26 @@ class WorkersLogView(mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericVi
         return qs.filter(worker=self.request.user.id, )
 
 
-class WorkerTaskCommentView(viewsets.ModelViewSet):
+class WorkerTaskCommentView(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = WorkerTaskComment.objects.all()
     serializer_class = WorkerTaskCommentSerializer
     permission_classes = [IsAuthenticated, IsWorker, ]
+    select_related_fields = {
+        'username': ['user'],
+    }
 
     def get_queryset(self):
         qs = super().get_queryset()
         return qs.filter(task_appointment__worker_appointed=self.request.user.id)
 
 
-class GetTasksCommentView(generics.ListAPIView):
+class GetTasksCommentView(SparseFieldsetViewMixin, generics.ListAPIView):
     queryset = WorkerTaskComment.objects.all()
     serializer_class = WorkerTaskCommentSerializer
     permission_classes = [IsAuthenticated, IsWorker, ]
+    select_related_fields = {
+        'username': ['user'],
+    }
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -73,14 +100,33 @@ class VoteView(viewsets.ModelViewSet):
 
     def get_queryset(self):
         qs = super().get_queryset()
-        return qs.filter(worker=self.request.user.worker)
+        return qs.filter(worker=self.request.user.id)
 
 
-class GetVoting(mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericViewSet):
+class GetVoting(SparseFieldsetViewMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericViewSet):
     queryset = TaskVoting.objects.all()
     serializer_class = GetVotingSerializer
     permission_classes = [IsAuthenticated, IsWorker, ]
 
+    def get_prefetch_related_fields(self):
+        return {
+            'voting_tasks': [
+                'voting_tasks',
+                Prefetch('votes', queryset=TaskVote.objects.filter(worker=self.request.user.id), to_attr='worker_votes'),
+            ],
+        }
+
     def get_queryset(self):
         qs = super().get_queryset()
-        return qs.filter(company=self.request.user.worker.employer)
+        return qs.filter(company=self.request.user.company_id)
+
+    @action(detail=True, methods=['post'], serializer_class=BallotSerializer)
+    def ballot(self, request, *args, **kwargs):
+        """
+        Replaces all votes of the worker in the voting with the submitted ballot.
+        """
+        voting = self.get_object()
+        serializer = self.get_serializer(data=request.data, context={**self.get_serializer_context(), 'voting': voting})
+        serializer.is_valid(raise_exception=True)
+        votes = serializer.save()
+        return Response(VoteSerializer(votes, many=True).data, status=status.HTTP_201_CREATED)